@@ -0,0 +1,3 @@
+# ETL for the DSI CO-OP database: extract (Google Sheets and the Google Form), transform
+# (one DataFrame per table) and an incremental load that only writes new and changed rows.
+# Run it from the notebooks directory with: python -m etl
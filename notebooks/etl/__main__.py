@@ -0,0 +1,20 @@
+import argparse
+
+from etl import extract, pipeline
+from etl.institutions import FUZZY_CUTOFF
+
+parser = argparse.ArgumentParser(prog="python -m etl", description="Load the DSI CO-OP sources into Postgres, only new and changed rows.")
+parser.add_argument("--full", action="store_true", help="reload every row instead of only the changed ones")
+parser.add_argument("--offline", action="store_true", help="read the CSVs in pgsql/data instead of Google Sheets")
+parser.add_argument("--refresh", action="store_true", help="check every source for changes, even recently downloaded ones")
+parser.add_argument("--fuzzy", nargs="?", type=float, const=FUZZY_CUTOFF, metavar="CUTOFF",
+                    help=f"match school names that are spelled a little differently (similarity 0-1, default {FUZZY_CUTOFF})")
+parser.add_argument("--report-dir", help="where to write the validation report and the quarantined rows (default: a new directory under .etl_reports)")
+args = parser.parse_args()
+
+report, unmatched = pipeline.run(full=args.full, offline=args.offline, max_age=0 if args.refresh else extract.MAX_AGE,
+                                 fuzzy_cutoff=args.fuzzy, report_dir=args.report_dir)
+print(pipeline.format_report(report))
+if unmatched:
+    print()
+    print(pipeline.format_unmatched(unmatched))
@@ -0,0 +1,113 @@
+import csv
+import tempfile
+from contextlib import contextmanager
+
+from psycopg2 import sql
+
+# DataFrames are sent to COPY in chunks of this many rows, each chunk is spooled to disk past SPOOL_SIZE
+CHUNK_ROWS = 100000
+SPOOL_SIZE = 64 * 1024 * 1024
+
+# Written for missing values, so that empty strings stay empty strings
+NULL = r"\N"
+
+# Dropping indexes and constraints and building them once after the load beats maintaining them
+# row by row when a load touches at least this share of a table (and at least DEFER_MIN_ROWS rows)
+DEFER_FRACTION = 0.2
+DEFER_MIN_ROWS = 10000
+
+# Constraints on the tables, and foreign keys of other tables that point at them
+CONSTRAINTS_QUERY = """SELECT con.conrelid::regclass::text AS table_name, con.conname, con.contype,
+                              pg_get_constraintdef(con.oid) AS definition
+                       FROM pg_constraint AS con
+                       WHERE con.contype IN ('p', 'u', 'f', 'x')
+                         AND (con.conrelid = ANY(%(tables)s::regclass[]) OR con.confrelid = ANY(%(tables)s::regclass[]))
+                       ORDER BY con.contype = 'f' DESC;"""
+
+# Indexes that do not back a primary key, unique or exclusion constraint
+INDEXES_QUERY = """SELECT i.indexrelid::regclass::text AS index_name, pg_get_indexdef(i.indexrelid) AS definition
+                   FROM pg_index AS i
+                   WHERE i.indrelid = ANY(%(tables)s::regclass[])
+                     AND NOT EXISTS (SELECT 1 FROM pg_constraint AS con
+                                     WHERE con.conindid = i.indexrelid AND con.contype IN ('p', 'u', 'x'));"""
+
+ESTIMATED_ROWS_QUERY = "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = %s::regclass;"
+
+
+def stage_name(table_name):
+    return f"stage_{table_name}"
+
+
+def create_stage(cursor, table_name):
+    # A temporary copy of the table's columns, unlogged and dropped at the end of the transaction
+    stage = sql.Identifier(stage_name(table_name))
+    cursor.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {}) ON COMMIT DROP;").format(stage, sql.Identifier(table_name)))
+    cursor.execute(sql.SQL("TRUNCATE {};").format(stage))
+    return stage
+
+
+def copy_frame(cursor, target, frame):
+    # Stream a DataFrame into COPY ... FROM STDIN as CSV, one chunk at a time
+    columns = sql.SQL(", ").join(sql.Identifier(column) for column in frame.columns)
+    statement = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {});").format(target, columns, sql.Literal(NULL))
+    for start in range(0, len(frame), CHUNK_ROWS):
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE, mode="w+", newline="", encoding="utf-8") as buffer:
+            frame.iloc[start:start + CHUNK_ROWS].to_csv(buffer, index=False, header=False, na_rep=NULL)
+            buffer.seek(0)
+            cursor.copy_expert(statement.as_string(cursor), buffer)
+    return len(frame)
+
+
+def copy_file(cursor, target, path):
+    # Stream a CSV file with a header row straight into COPY, the header gives the column order
+    with open(path, newline="", encoding="utf-8") as file:
+        header = next(csv.reader(file))
+        file.seek(0)
+        columns = sql.SQL(", ").join(sql.Identifier(column) for column in header)
+        statement = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true);").format(target, columns)
+        cursor.copy_expert(statement.as_string(cursor), file)
+    return cursor.rowcount
+
+
+def merge(cursor, table, columns, key=None):
+    # Move the staged rows into the table, replacing existing rows with the same key
+    stage = sql.Identifier(stage_name(table))
+    target = sql.Identifier(table)
+    if key is not None:
+        cursor.execute(sql.SQL("DELETE FROM {target} AS t USING {stage} AS s WHERE t.{key} = s.{key};").format(
+            target=target, stage=stage, key=sql.Identifier(key)))
+    column_list = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+    cursor.execute(sql.SQL("INSERT INTO {} ({}) SELECT {} FROM {};").format(target, column_list, column_list, stage))
+    return cursor.rowcount
+
+
+def should_defer(cursor, table_name, rows):
+    cursor.execute(ESTIMATED_ROWS_QUERY, (table_name,))
+    return rows >= DEFER_MIN_ROWS and rows >= DEFER_FRACTION * cursor.fetchone()[0]
+
+
+@contextmanager
+def deferred_indexes(cursor, table_names):
+    # Drop the indexes and constraints of the tables for the duration of a large load and build them
+    # once at the end, in the same transaction so a failed load leaves them untouched
+    tables = {"tables": list(table_names)}
+    # Tables with deferred foreign key checks still pending cannot be altered, run the checks now
+    # (the rows merged so far are complete) and defer the ones to come again
+    cursor.execute("SET CONSTRAINTS ALL IMMEDIATE; SET CONSTRAINTS ALL DEFERRED;")
+    cursor.execute(CONSTRAINTS_QUERY, tables)
+    constraints = cursor.fetchall()
+    cursor.execute(INDEXES_QUERY, tables)
+    indexes = cursor.fetchall()
+
+    # Foreign keys first, they depend on the primary keys they reference
+    for table_name, name, _, _ in constraints:
+        cursor.execute(sql.SQL("ALTER TABLE {} DROP CONSTRAINT {};").format(sql.SQL(table_name), sql.Identifier(name)))
+    for index_name, _ in indexes:
+        cursor.execute(sql.SQL("DROP INDEX {};").format(sql.SQL(index_name)))
+
+    yield
+
+    for _, definition in indexes:
+        cursor.execute(definition)
+    for table_name, name, _, definition in reversed(constraints):
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {};").format(sql.SQL(table_name), sql.Identifier(name), sql.SQL(definition)))
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from etl.schema import ID_COLUMNS, JSON_COLUMNS
+
+# Reference data kept in Google Sheets, one sheet per table
+SHEETS_URL = "https://docs.google.com/spreadsheets/d/1TF6Z4bonD6RiiM8kBYaGLAmi-32G-UO_zzXHA0-_TDc/export?format=csv&gid={gid}"
+SHEETS = {
+    "professor": "818879554",
+    "company": "1061595718",
+    "academy": "633747846",
+    "address_info": "113503764",
+    "officer": "903159677",
+    "cooperative_student_questionnaire": "1813736188",
+    "student_final_project": "1178619880",
+    "comment": "1656861151",
+}
+
+# Google Form responses, one row per student
+FORM_URL = "https://docs.google.com/spreadsheets/d/1deoLLJuhW_Dzn3euI3cQf74Xux21uTjywHvQkcY0hyM/export?format=csv&gid=0"
+FORM_DTYPES = {"รหัสนักศึกษา": str, "โทรศัพท์": str, "รหัสไปรษณีย์": str}
+
+# Downloads are kept by the SHA-256 of their content, urls.json points every URL at its latest download.
+# A download younger than MAX_AGE seconds is used without asking the server again.
+CACHE_DIR = os.environ.get("ETL_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".etl_cache"))
+MAX_AGE = 15 * 60
+TIMEOUT = 30
+WORKERS = 8
+
+# Seed and backup CSVs, one per table with a header row, read in offline mode
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "pgsql", "data")
+DATA_FILES = {
+    "professor": "professor.csv",
+    "company": "company.csv",
+    "academy": "academy.csv",
+    "address_info": "address_info.csv",
+    "officer": "officer.csv",
+    "student_info": "student_info.csv",
+    "student_address": "student_address.csv",
+    "student_u_d": "student_u_d.csv",
+    "student_emergency_contact": "student_emergency.csv",
+    "student_education_history": "student_ed.csv",
+    "student_skills": "student_skills.csv",
+    "cooperative_student_questionnaire": "cooperative.csv",
+    "student_final_project": "student_final_project.csv",
+    "comment": "comment.csv",
+}
+
+# Columns kept as text in the CSVs, so leading zeros survive
+TEXT_COLUMNS = ID_COLUMNS + ["middle_school_id", "high_school_id", "bachelor_university_id", "tel", "fax", "post_no"]
+
+
+def _read_index(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "urls.json"), encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(cache_dir, index):
+    # Replace the index in one step so a concurrent run never reads half of it
+    with tempfile.NamedTemporaryFile("w", dir=cache_dir, delete=False, encoding="utf-8") as file:
+        json.dump(index, file, indent=1)
+    os.replace(file.name, os.path.join(cache_dir, "urls.json"))
+
+
+def _object_path(cache_dir, digest):
+    return os.path.join(cache_dir, "objects", digest[:2], digest + ".csv")
+
+
+def _store(cache_dir, body):
+    digest = hashlib.sha256(body).hexdigest()
+    path = _object_path(cache_dir, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=os.path.dirname(path), delete=False) as file:
+            file.write(body)
+        os.replace(file.name, path)
+    return digest
+
+
+def _fetch(url, entry, cache_dir, max_age):
+    # Returns the cache entry for url: fresh entries as they are, otherwise a conditional download.
+    # A failed download falls back to the cached copy if there is one.
+    if entry and time.time() - entry["checked_at"] < max_age and os.path.exists(_object_path(cache_dir, entry["sha256"])):
+        return entry
+    request = urllib.request.Request(url)
+    if entry and entry.get("etag"):
+        request.add_header("If-None-Match", entry["etag"])
+    if entry and entry.get("last_modified"):
+        request.add_header("If-Modified-Since", entry["last_modified"])
+    try:
+        with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+            body = response.read()
+            headers = response.headers
+        entry = {"sha256": _store(cache_dir, body), "etag": headers.get("ETag"),
+                 "last_modified": headers.get("Last-Modified"), "checked_at": time.time()}
+    except urllib.error.HTTPError as error:
+        if error.code != 304 or not entry:
+            raise
+        entry = dict(entry, checked_at=time.time())
+    except (urllib.error.URLError, OSError) as error:
+        if not entry:
+            raise
+        print(f"{url}: {error}, using the copy downloaded at {time.ctime(entry['checked_at'])}", file=sys.stderr)
+    return entry
+
+
+def fetch_all(urls, cache_dir=CACHE_DIR, max_age=MAX_AGE):
+    # Download the URLs concurrently into the cache, returns the cached file of every URL by name
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _read_index(cache_dir)
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        futures = {name: executor.submit(_fetch, url, index.get(url), cache_dir, max_age) for name, url in urls.items()}
+        entries = {name: future.result() for name, future in futures.items()}
+    index.update({urls[name]: entry for name, entry in entries.items()})
+    _write_index(cache_dir, index)
+    return {name: _object_path(cache_dir, entry["sha256"]) for name, entry in entries.items()}
+
+
+def read_sources(cache_dir=CACHE_DIR, max_age=MAX_AGE):
+    # The sheets by table name and the form responses, downloaded together through the cache
+    urls = {name: SHEETS_URL.format(gid=gid) for name, gid in SHEETS.items()}
+    urls["form"] = FORM_URL
+    return read_downloads(fetch_all(urls, cache_dir, max_age))
+
+
+def read_downloads(paths):
+    # The sheets and the form responses from their CSV files, by the names of read_sources
+    sheets = {name: pd.read_csv(paths[name], dtype={column: str for column in ID_COLUMNS}) for name in SHEETS}
+    return sheets, pd.read_csv(paths["form"], dtype=FORM_DTYPES)
+
+
+def read_offline(data_dir=DATA_DIR):
+    # Every table that has a CSV in data_dir, by table name. There are no form responses offline,
+    # the student tables are read in their final shape instead, with the JSON columns parsed.
+    tables = {}
+    for name, file_name in DATA_FILES.items():
+        path = os.path.join(data_dir, file_name)
+        if not os.path.exists(path):
+            continue
+        frame = pd.read_csv(path, dtype={column: str for column in TEXT_COLUMNS})
+        # character(n) columns come back padded with spaces
+        for column in frame.columns.intersection(ID_COLUMNS):
+            frame[column] = frame[column].str.strip()
+        for column in frame.columns.intersection(JSON_COLUMNS):
+            frame[column] = frame[column].map(json.loads, na_action="ignore").astype(object)
+        tables[name] = frame
+    return tables
+
+
+def read_sheets():
+    return read_sources()[0]
+
+
+def read_form():
+    return read_sources()[1]
@@ -0,0 +1,87 @@
+import difflib
+
+import pandas as pd
+
+from etl.lookups import Lookup
+
+# Parts of a school name that do not tell schools apart: the word "school" (and its abbreviation),
+# white space and punctuation
+NAME_NOISE = r"โรงเรียน|ร\.ร\.|school|[\s.,'\"()\-]"
+
+# Similarity (0-1) a name needs to be taken for a known institution when fuzzy matching is on
+FUZZY_CUTOFF = 0.92
+
+
+def name_key(names):
+    # Normalized form of institution names: Unicode NFKC, case folded, without NAME_NOISE
+    keys = names.astype(object).str.normalize("NFKC").str.casefold().str.replace(NAME_NOISE, "", regex=True)
+    return keys.where(keys != "")
+
+
+def next_ids(academy):
+    # In-memory ID allocation, after the largest academy_id in the table
+    latest_id = int(pd.to_numeric(academy["academy_id"]).max()) if len(academy) else 0
+
+    def allocate(count):
+        nonlocal latest_id
+        ids = list(range(latest_id + 1, latest_id + 1 + count))
+        latest_id += count
+        return ids
+
+    return allocate
+
+
+class Institutions:
+    # Academies indexed by the normalized form of their names, plus known aliases (other spellings
+    # that were matched to an academy before). Names that are not found can be matched fuzzily and
+    # the rest are added as new academies with IDs from allocate(count).
+    def __init__(self, academy, aliases=None, allocate=None, fuzzy_cutoff=None):
+        self.academy = academy.drop_duplicates(subset=["institution_name"]).reset_index(drop=True)
+        self.allocate = allocate or next_ids(self.academy)
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # Normalized names matched fuzzily in this run, to be saved as aliases
+        self.new_aliases = {}
+
+        self.keys = pd.DataFrame({"name_key": name_key(self.academy["institution_name"]), "academy_id": self.academy["academy_id"]})
+        self.lookup = Lookup("academy", self.keys, ["name_key"], "academy_id")
+        if aliases:
+            self._extend(list(aliases), list(aliases.values()))
+
+    def _extend(self, name_keys, academy_ids):
+        # Rebuild the index with more keys, the unmatched counts carry over
+        self.keys = pd.concat([self.keys, pd.DataFrame({"name_key": name_keys, "academy_id": academy_ids})], ignore_index=True)
+        unmatched = self.lookup.unmatched
+        self.lookup = Lookup("academy", self.keys, ["name_key"], "academy_id")
+        self.lookup.unmatched = unmatched
+
+    def _add(self, keys, names):
+        # Resolve the distinct keys that are not in the index yet, fuzzily if enabled, the rest as
+        # new academies named after their first spelling, in order of appearance
+        new = pd.Series(names.to_numpy(), index=keys.to_numpy())
+        new = new[new.index.notna() & ~new.index.duplicated()]
+        new = new[self.lookup.index.get_indexer(new.index) < 0]
+        if self.fuzzy_cutoff is not None and len(new):
+            known = list(self.lookup.index)
+            for key in new.index:
+                found = difflib.get_close_matches(key, known, n=1, cutoff=self.fuzzy_cutoff)
+                if found:
+                    self.new_aliases[key] = self.lookup.values[self.lookup.index.get_loc(found[0])]
+            new = new[~new.index.isin(list(self.new_aliases))]
+        added = [f"{academy_id:09}" for academy_id in self.allocate(len(new))] if len(new) else []
+        if added:
+            self.academy = pd.concat([self.academy, pd.DataFrame({
+                "academy_id": added,
+                "institution_name": new.to_numpy(),
+                "province": None,
+            })], ignore_index=True)
+        aliases = [key for key in self.new_aliases if key not in self.lookup.index]
+        if added or aliases:
+            self._extend(aliases + list(new.index), [self.new_aliases[key] for key in aliases] + added)
+
+    def resolve(self, names, add=False):
+        # academy_id for every name, one indexed lookup. With add=True, names that are not known get
+        # an academy (new or, with fuzzy matching, an existing one) first.
+        keys = name_key(names)
+        if add:
+            self._add(keys, names)
+        return self.lookup.resolve(keys)
@@ -0,0 +1,169 @@
+import json
+import os
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+from etl import bulk, migrate
+from etl.schema import TABLES_BY_NAME
+
+# Connection settings, the PG* environment variables override the defaults used by the notebooks
+DEFAULTS = {
+    "host": ("PGHOST", "172.25.16.1"),
+    "port": ("PGPORT", "5432"),
+    "dbname": ("PGDATABASE", "dsi324_db"),
+    "user": ("PGUSER", "postgres"),
+    "password": ("PGPASSWORD", "1234"),
+}
+
+# One fingerprint per loaded row, kept outside the public schema so the dashboard does not list it
+FINGERPRINTS_DDL = """CREATE SCHEMA IF NOT EXISTS etl;
+                      CREATE TABLE IF NOT EXISTS etl.row_fingerprints (
+                          table_name text NOT NULL,
+                          row_key text NOT NULL,
+                          row_hash text NOT NULL,
+                          loaded_at timestamptz NOT NULL DEFAULT now(),
+                          PRIMARY KEY (table_name, row_key)
+                      );"""
+
+# Academy IDs are handed out by a sequence so concurrent runs never hand out the same ID, and other
+# spellings of academy names that were matched to an academy are remembered
+ACADEMY_DDL = """CREATE SCHEMA IF NOT EXISTS etl;
+                 CREATE SEQUENCE IF NOT EXISTS etl.academy_id_seq;
+                 CREATE TABLE IF NOT EXISTS etl.academy_aliases (
+                     name_key text PRIMARY KEY,
+                     academy_id character(9) NOT NULL
+                 );"""
+
+# Move the sequence past the IDs already in use, then draw from it. The lock keeps another run
+# from moving the sequence back between the two steps.
+ACADEMY_IDS_QUERY = """SELECT pg_advisory_xact_lock(hashtext('etl.academy_id_seq'));
+                       SELECT setval('etl.academy_id_seq', GREATEST(%(floor)s,
+                                     (SELECT last_value FROM etl.academy_id_seq),
+                                     (SELECT COALESCE(max(academy_id::bigint), 0) FROM academy)));
+                       SELECT nextval('etl.academy_id_seq') FROM generate_series(1, %(count)s);"""
+
+ALIASES_QUERY = "SELECT name_key, academy_id FROM etl.academy_aliases;"
+
+SAVE_ALIAS = """INSERT INTO etl.academy_aliases (name_key, academy_id) VALUES (%s, %s)
+                ON CONFLICT (name_key) DO UPDATE SET academy_id = EXCLUDED.academy_id;"""
+
+FINGERPRINTS_QUERY = "SELECT row_key, row_hash FROM etl.row_fingerprints WHERE table_name = %s;"
+
+FINGERPRINTS_STAGE = """CREATE TEMP TABLE IF NOT EXISTS fingerprint_stage (row_key text, row_hash text) ON COMMIT DROP;
+                        TRUNCATE fingerprint_stage;"""
+
+SAVE_FINGERPRINTS = """INSERT INTO etl.row_fingerprints (table_name, row_key, row_hash)
+                       SELECT %s, row_key, row_hash FROM fingerprint_stage
+                       ON CONFLICT (table_name, row_key) DO UPDATE SET row_hash = EXCLUDED.row_hash, loaded_at = now();"""
+
+
+def connect():
+    return psycopg2.connect(**{name: os.environ.get(variable, default) for name, (variable, default) in DEFAULTS.items()})
+
+
+def create_tables(cursor, tables):
+    # The migrations define the tables, the keys and the indexes. Tables they do not know are created
+    # from their columns.
+    cursor.execute(FINGERPRINTS_DDL)
+    cursor.execute(ACADEMY_DDL)
+    migrate.apply(cursor)
+    for table in tables:
+        columns = sql.SQL(", ").join(sql.SQL("{} {}").format(sql.Identifier(name), sql.SQL(data_type))
+                                     for name, data_type in table.columns)
+        cursor.execute(sql.SQL("CREATE TABLE IF NOT EXISTS {} ({});").format(sql.Identifier(table.name), columns))
+
+
+def academy_ids(conn, floor):
+    # allocate(count) for Institutions: the next count values of the academy sequence, above floor
+    # and above every academy_id in the academy table. Committed at once, like any sequence.
+    def allocate(count):
+        with conn, conn.cursor() as cursor:
+            create_tables(cursor, [TABLES_BY_NAME["academy"]])
+            cursor.execute(ACADEMY_IDS_QUERY, {"floor": floor, "count": count})
+            return [academy_id for academy_id, in cursor.fetchall()]
+
+    return allocate
+
+
+def academy_aliases(conn):
+    with conn, conn.cursor() as cursor:
+        cursor.execute(ACADEMY_DDL)
+        cursor.execute(ALIASES_QUERY)
+        return {name_key: academy_id for name_key, academy_id in cursor.fetchall()}
+
+
+def save_academy_aliases(conn, aliases):
+    with conn, conn.cursor() as cursor:
+        cursor.executemany(SAVE_ALIAS, list(aliases.items()))
+
+
+def conform(frame, table):
+    # Target columns in table order, missing values as None and JSON values serialized
+    frame = frame.reindex(columns=[name for name, _ in table.columns])
+    for name, data_type in table.columns:
+        if data_type in ("json", "jsonb"):
+            frame[name] = frame[name].map(lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value)
+    frame = frame.astype(object)
+    return frame.where(frame.notna(), None)
+
+
+def row_hashes(frame):
+    # Content hash of every row, computed column-wise on the text form of the values
+    text = frame.astype(str)
+    return pd.util.hash_pandas_object(text, index=False).map("{:016x}".format)
+
+
+def changed_rows(frame, table, fingerprints):
+    # Rows with a new key or with content that differs from what was loaded last time.
+    # Rows without a key cannot be tracked and are skipped, the last row wins for repeated keys.
+    keys = frame[table.key].map(lambda value: None if value is None else str(value).strip())
+    skipped = int(keys.isna().sum())
+    frame, keys = frame[keys.notna()], keys[keys.notna()]
+    last = ~keys.duplicated(keep="last")
+    frame, keys = frame[last], keys[last]
+    hashes = row_hashes(frame)
+    changed = hashes.values != keys.map(fingerprints).values
+    return frame[changed], keys[changed], hashes[changed], skipped, len(frame)
+
+
+def upsert(cursor, table, frame):
+    # Stage the changed rows with COPY and swap them in for the rows with the same keys. Large loads
+    # build the table's indexes once afterwards instead of updating them row by row.
+    bulk.copy_frame(cursor, bulk.create_stage(cursor, table.name), frame)
+    columns = [name for name, _ in table.columns]
+    if bulk.should_defer(cursor, table.name, len(frame)):
+        with bulk.deferred_indexes(cursor, [table.name]):
+            bulk.merge(cursor, table.name, columns, key=table.key)
+    else:
+        bulk.merge(cursor, table.name, columns, key=table.key)
+
+
+def save_fingerprints(cursor, table, keys, hashes):
+    cursor.execute(FINGERPRINTS_STAGE)
+    bulk.copy_frame(cursor, sql.Identifier("fingerprint_stage"), pd.DataFrame({"row_key": keys.values, "row_hash": hashes.values}))
+    cursor.execute(SAVE_FINGERPRINTS, (table.name,))
+
+
+def load_incremental(conn, tables, frames, full=False):
+    # Load only new and changed rows of every table in one transaction, returns a report per table
+    report = {}
+    with conn, conn.cursor() as cursor:
+        create_tables(cursor, tables)
+        for table in tables:
+            if table.name not in frames:
+                continue
+            frame = conform(frames[table.name], table)
+            fingerprints = {}
+            if not full:
+                cursor.execute(FINGERPRINTS_QUERY, (table.name,))
+                fingerprints = dict(cursor.fetchall())
+            changed, keys, hashes, skipped, total = changed_rows(frame, table, fingerprints)
+            if len(changed):
+                upsert(cursor, table, changed)
+                save_fingerprints(cursor, table, keys, hashes)
+            new = int((~keys.isin(list(fingerprints))).sum())
+            report[table.name] = {"rows": total, "new": new, "changed": len(changed) - new,
+                                  "unchanged": total - len(changed), "skipped": skipped}
+    return report
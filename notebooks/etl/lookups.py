@@ -0,0 +1,52 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+
+class Lookup:
+    # Hash index from the key columns of a reference table to one of its columns. The index is built
+    # once and whole columns are resolved against it at a time. The first row wins for repeated keys.
+    def __init__(self, name, table, keys, value):
+        self.name = name
+        self.keys = list(keys)
+        table = table.dropna(subset=self.keys).drop_duplicates(subset=self.keys)
+        self.index = _index(table[self.keys])
+        self.values = table[value].to_numpy(dtype=object)
+        # Keys that were looked up but not found, with the number of rows that had them
+        self.unmatched = Counter()
+
+    def resolve(self, *columns):
+        # The value for every row of the key columns (one Series per key, sharing an index).
+        # Rows with a missing key resolve to None, rows with a key that is not found too and are counted.
+        keys = pd.concat([column.rename(name) for name, column in zip(self.keys, columns)], axis=1)
+        present = keys.notna().all(axis=1).to_numpy()
+        positions = self.index.get_indexer(_index(keys))
+        found = present & (positions >= 0)
+
+        missed = keys[present & ~found]
+        if len(missed):
+            counts = missed.value_counts() if len(self.keys) > 1 else missed[self.keys[0]].value_counts()
+            self.unmatched.update(counts.to_dict())
+        return pd.Series(np.where(found, self.values.take(positions), None), index=keys.index, dtype=object)
+
+    def report(self):
+        return {"keys": len(self.unmatched), "rows": sum(self.unmatched.values()),
+                "examples": [key for key, _ in self.unmatched.most_common(5)]}
+
+
+def _index(frame):
+    return pd.MultiIndex.from_frame(frame) if frame.shape[1] > 1 else pd.Index(frame.iloc[:, 0])
+
+
+def professors(professor):
+    return Lookup("professor", professor, ["professor_lastname"], "professor_id")
+
+
+def addresses(address_info):
+    return Lookup("address", address_info, ["sub_district", "district", "province"], "address_id")
+
+
+def unmatched_report(lookups):
+    # Unmatched keys by lookup, only for lookups that missed something
+    return {lookup.name: lookup.report() for lookup in lookups if lookup.unmatched}
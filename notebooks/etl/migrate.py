@@ -0,0 +1,98 @@
+import argparse
+import os
+
+# Versioned DDL, applied in file name order. Every file runs once per database and is recorded
+# in etl.schema_migrations.
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "pgsql", "migrations")
+
+MIGRATIONS_DDL = """CREATE SCHEMA IF NOT EXISTS etl;
+                    CREATE TABLE IF NOT EXISTS etl.schema_migrations (
+                        version text PRIMARY KEY,
+                        applied_at timestamptz NOT NULL DEFAULT now()
+                    );"""
+
+# Only one run applies migrations at a time, the others wait and then find nothing left to do
+LOCK = "SELECT pg_advisory_xact_lock(hashtext('etl.schema_migrations'));"
+
+# Join paths of the dashboard: the joins All Data generates from the foreign keys (run with a row
+# limit), the Visualization rollup, the skills search and the global search
+EXPLAIN_QUERIES = {
+    "student_info + professor": """SELECT * FROM student_info
+                                   INNER JOIN professor ON student_info.professor_id = professor.professor_id
+                                   LIMIT 1000""",
+    "student_info + student_address + address_info": """SELECT * FROM student_info
+                                                         INNER JOIN student_address ON student_address.student_id = student_info.student_id
+                                                         INNER JOIN address_info ON student_address.address_id = address_info.address_id
+                                                         LIMIT 1000""",
+    "student_education_history + academy": """SELECT * FROM student_education_history
+                                               INNER JOIN academy ON student_education_history.high_school_id = academy.academy_id
+                                               LIMIT 1000""",
+    "company + cooperative_student_questionnaire": """SELECT * FROM company
+                                                      INNER JOIN cooperative_student_questionnaire
+                                                          ON cooperative_student_questionnaire.company_id = company.company_id
+                                                      WHERE company.company_id = (SELECT min(company_id) FROM company)""",
+    "interns per company (Visualization)": """SELECT s.finish_year, cc.company_id, cc.company_name, count(*) AS interns
+                                              FROM cooperative_student_questionnaire AS c
+                                              INNER JOIN company AS cc ON cc.company_id = c.company_id
+                                              INNER JOIN student_final_project AS s ON s.student_id = c.student_id
+                                              WHERE s.finish_year = (SELECT max(finish_year) FROM student_final_project)
+                                              GROUP BY s.finish_year, cc.company_id, cc.company_name""",
+    "skills search": """SELECT sk.student_id, si.first_name, si.last_name
+                        FROM student_skills AS sk
+                        LEFT JOIN student_info AS si ON si.student_id = sk.student_id
+                        WHERE sk.language_skills @> ANY(ARRAY['[{"language": "ภาษาเยอรมัน", "reading": "2"}]'::jsonb])
+                        LIMIT 100""",
+    "global search": """SELECT student_id, first_name, last_name FROM student_info
+                        WHERE to_tsvector('simple', search_text(student_id::text, first_name::text, last_name::text, email::text))
+                              @@ to_tsquery('simple', 'ใจ:*')
+                        LIMIT 500""",
+}
+
+
+def migrations(directory=MIGRATIONS_DIR):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".sql"))
+
+
+def apply(cursor, directory=MIGRATIONS_DIR):
+    # Run the migrations this database has not seen yet, in the caller's transaction. Returns their names.
+    cursor.execute(MIGRATIONS_DDL)
+    cursor.execute(LOCK)
+    cursor.execute("SELECT version FROM etl.schema_migrations;")
+    done = {version for version, in cursor.fetchall()}
+    applied = []
+    for name in migrations(directory):
+        if name in done:
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8") as file:
+            cursor.execute(file.read())
+        cursor.execute("INSERT INTO etl.schema_migrations (version) VALUES (%s);", (name,))
+        applied.append(name)
+    return applied
+
+
+def explain(cursor, queries=EXPLAIN_QUERIES):
+    # EXPLAIN (ANALYZE) of every query, by name
+    plans = {}
+    for name, query in queries.items():
+        cursor.execute("EXPLAIN (ANALYZE, COSTS OFF, TIMING OFF, SUMMARY OFF) " + query)
+        plans[name] = "\n".join(line for line, in cursor.fetchall())
+    return plans
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m etl.migrate", description="Apply the migrations in pgsql/migrations.")
+    parser.add_argument("--explain", action="store_true", help="print the plans of the dashboard's join queries afterwards")
+    args = parser.parse_args()
+
+    from etl import load
+    conn = load.connect()
+    try:
+        with conn, conn.cursor() as cursor:
+            applied = apply(cursor)
+        print("applied: " + (", ".join(applied) or "nothing, the database is up to date"))
+        if args.explain:
+            with conn, conn.cursor() as cursor:
+                for name, plan in explain(cursor).items():
+                    print(f"\n-- {name}\n{plan}")
+    finally:
+        conn.close()
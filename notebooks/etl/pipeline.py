@@ -0,0 +1,59 @@
+import pandas as pd
+
+from etl import extract, load, transform, validate
+from etl.institutions import Institutions
+from etl.schema import TABLES
+
+
+def match_institutions(conn, sheets, form, fuzzy_cutoff=None):
+    # The institutions the form's school names are matched against, with the aliases and academy
+    # IDs already in the database. None without the form.
+    if form is None:
+        return None
+    academy = sheets["academy"]
+    floor = int(pd.to_numeric(academy["academy_id"]).max()) if len(academy) else 0
+    return Institutions(academy, load.academy_aliases(conn), load.academy_ids(conn, floor), fuzzy_cutoff)
+
+
+def run(full=False, offline=False, max_age=extract.MAX_AGE, fuzzy_cutoff=None, report_dir=None):
+    # Extract the sheets and the form, rebuild every table in memory and load only what changed.
+    # full=True ignores the stored fingerprints and reloads every row, offline=True reads the CSVs
+    # in pgsql/data instead of the network. fuzzy_cutoff (0-1) turns on fuzzy matching of school
+    # names. Rows that fail validation are held back and written to report_dir with the validation
+    # report (default: a new directory under .etl_reports). Returns the load report and the lookup
+    # keys that were not found.
+    if offline:
+        sheets, form = extract.read_offline(), None
+    else:
+        sheets, form = extract.read_sources(max_age=max_age)
+    unmatched = {}
+    conn = load.connect()
+    try:
+        institutions = match_institutions(conn, sheets, form, fuzzy_cutoff)
+        frames = transform.transform(sheets, form, unmatched, institutions)
+        validation = validate.validate(frames)
+        validate.write_report(validation, report_dir)
+        report = load.load_incremental(conn, TABLES, validation.tables, full=full)
+        for name, counts in report.items():
+            counts["quarantined"] = len(validation.quarantine.get(name, ()))
+        if institutions is not None and institutions.new_aliases:
+            load.save_academy_aliases(conn, institutions.new_aliases)
+        return report, unmatched
+    finally:
+        conn.close()
+
+
+def format_report(report):
+    lines = [f"{'table':<36}{'rows':>8}{'new':>8}{'changed':>9}{'unchanged':>11}{'skipped':>9}{'quarantined':>13}"]
+    for name, counts in report.items():
+        lines.append(f"{name:<36}{counts['rows']:>8}{counts['new']:>8}{counts['changed']:>9}{counts['unchanged']:>11}{counts['skipped']:>9}"
+                     f"{counts.get('quarantined', 0):>13}")
+    return "\n".join(lines)
+
+
+def format_unmatched(unmatched):
+    lines = []
+    for name, counts in unmatched.items():
+        examples = ", ".join(" / ".join(map(str, key)) if isinstance(key, tuple) else str(key) for key in counts["examples"])
+        lines.append(f"{name}: {counts['keys']} unmatched keys in {counts['rows']} rows, e.g. {examples}")
+    return "\n".join(lines)
@@ -0,0 +1,155 @@
+from collections import namedtuple
+
+# Target tables in load order, with the column each row is identified by (the primary key) and
+# the column types. The tables themselves are defined by the migrations in pgsql/migrations.
+Table = namedtuple("Table", ["name", "key", "columns"])
+
+TABLES = [
+    Table("professor", "professor_id", [
+        ("professor_id", "character(10)"),
+        ("professor_firstname", "character varying(255)"),
+        ("professor_lastname", "character varying(255)"),
+        ("email", "character varying(100)"),
+    ]),
+    Table("company", "company_id", [
+        ("company_id", "character(10)"),
+        ("company_name", "character varying(255)"),
+        ("province", "character varying(255)"),
+    ]),
+    Table("academy", "academy_id", [
+        ("academy_id", "character(9)"),
+        ("institution_name", "character varying(255)"),
+        ("province", "character varying(255)"),
+    ]),
+    Table("address_info", "address_id", [
+        ("address_id", "character(6)"),
+        ("sub_district", "character varying(50)"),
+        ("district", "character varying(50)"),
+        ("province", "character varying(50)"),
+        ("post_no", "character(5)"),
+    ]),
+    Table("officer", "officer_id", [
+        ("officer_id", "character(10)"),
+        ("offfirst_name", "character varying(255)"),
+        ("offlast_name", "character varying(255)"),
+        ("officer_email", "character varying(100)"),
+    ]),
+    Table("student_info", "student_id", [
+        ("student_id", "character(10)"),
+        ("first_name", "character varying(255)"),
+        ("last_name", "character varying(255)"),
+        ("academic_year", "integer"),
+        ("tel", "character(10)"),
+        ("email", "character varying(100)"),
+        ("gpax", "numeric(3,2)"),
+        ("professor_id", "character(10)"),
+    ]),
+    Table("student_address", "student_id", [
+        ("student_id", "character(10)"),
+        ("address_id", "character(6)"),
+        ("address", "character varying(255)"),
+    ]),
+    Table("student_u_d", "student_id", [
+        ("student_id", "character(10)"),
+        ("u_d", "character varying(255)"),
+    ]),
+    Table("student_emergency_contact", "student_id", [
+        ("student_id", "character(10)"),
+        ("first_name", "character varying(255)"),
+        ("last_name", "character varying(255)"),
+        ("address_id", "character(6)"),
+        ("address", "character varying(255)"),
+        ("relationship", "character varying(255)"),
+        ("workplace", "character varying(255)"),
+        ("tel", "character(10)"),
+        ("fax", "character(10)"),
+    ]),
+    Table("student_education_history", "student_id", [
+        ("student_id", "character(10)"),
+        ("middle_school_id", "character(9)"),
+        ("high_school_id", "character(9)"),
+        ("bachelor_university_id", "character(9)"),
+        ("middle_school_end_year", "integer"),
+        ("high_school_end_year", "integer"),
+        ("bachelor_end_year", "integer"),
+        ("middle_school_gpax", "numeric(3,2)"),
+        ("high_school_gpax", "numeric(3,2)"),
+        ("bachelor_gpax", "numeric(3,2)"),
+    ]),
+    Table("student_skills", "student_id", [
+        ("student_id", "character(10)"),
+        ("technical_skills", "character varying(255)"),
+        ("sp_muskills", "character varying(255)"),
+        ("other_skills", "character varying(255)"),
+        ("language_skills", "jsonb"),
+        ("workshop", "jsonb"),
+        ("work_exp", "jsonb"),
+        ("award", "jsonb"),
+    ]),
+    Table("cooperative_student_questionnaire", "student_id", [
+        ("student_id", "character(10)"),
+        ("company_id", "character(10)"),
+        ("rvfirst_name", "character varying(255)"),
+        ("rvlast_name", "character varying(255)"),
+        ("position", "character varying(255)"),
+        ("quantity_work", "double precision"),
+        ("quality_work", "double precision"),
+        ("acad_ability", "double precision"),
+        ("ability_apply", "double precision"),
+        ("prac_ability", "double precision"),
+        ("judge_decision", "double precision"),
+        ("organ_planning", "double precision"),
+        ("commu_skills", "double precision"),
+        ("foreign_cultural", "double precision"),
+        ("suitability_job", "double precision"),
+        ("respon_depen", "double precision"),
+        ("interest_work", "double precision"),
+        ("initiative", "double precision"),
+        ("supervision_response", "double precision"),
+        ("personality", "double precision"),
+        ("interpersonal_skills", "double precision"),
+        ("discipline_adapt", "double precision"),
+        ("ethics_morality", "double precision"),
+        ("strength", "character varying(255)"),
+        ("need_improvement", "character varying(255)"),
+        ("further_offer", "character(10)"),
+        ("comments", "character varying(255)"),
+    ]),
+    Table("student_final_project", "student_id", [
+        ("student_id", "character(10)"),
+        ("project_title", "character varying(255)"),
+        ("professor_id", "character(10)"),
+        ("finish_year", "character varying(255)"),
+        ("abstract", "text"),
+        ("total_pages", "integer"),
+        ("passed", "boolean"),
+    ]),
+    Table("comment", "comment_id", [
+        ("comment_id", "character(10)"),
+        ("company_id", "character(10)"),
+        ("origina_benefits", "integer"),
+        ("employer_create", "integer"),
+        ("organiza_select", "integer"),
+        ("organiza_collab", "integer"),
+        ("supervision_bene", "integer"),
+        ("supervision_adequate", "integer"),
+        ("teacher_supervisor", "integer"),
+        ("cooper_service", "integer"),
+    ]),
+]
+
+TABLES_BY_NAME = {table.name: table for table in TABLES}
+
+# Questionnaire ratings, 1-5
+SCORE_COLUMNS = [
+    "quantity_work", "quality_work", "acad_ability", "ability_apply",
+    "prac_ability", "judge_decision", "organ_planning", "commu_skills",
+    "foreign_cultural", "suitability_job", "respon_depen", "interest_work",
+    "initiative", "supervision_response", "personality", "interpersonal_skills",
+    "discipline_adapt", "ethics_morality",
+]
+
+# Identifier columns, read as text so leading zeros and long numbers survive
+ID_COLUMNS = ["professor_id", "company_id", "academy_id", "address_id", "officer_id", "student_id", "comment_id"]
+
+JSON_COLUMNS = ["language_skills", "workshop", "work_exp", "award"]
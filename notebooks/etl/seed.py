@@ -0,0 +1,74 @@
+import argparse
+import os
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+from psycopg2 import sql
+
+from etl import bulk, load
+from etl.extract import DATA_DIR, DATA_FILES, TEXT_COLUMNS
+from etl.schema import TABLES
+
+
+def _stage_csv(cursor, table, path):
+    # COPY the file as it is. A file COPY rejects (e.g. a value with an unquoted line break) is parsed
+    # with pandas instead and the rows without a key are left out. Returns (rows, skipped).
+    stage = bulk.create_stage(cursor, table.name)
+    cursor.execute("SAVEPOINT stage_csv;")
+    try:
+        rows = bulk.copy_file(cursor, stage, path)
+        cursor.execute("RELEASE SAVEPOINT stage_csv;")
+        return rows, 0
+    except psycopg2.DataError:
+        cursor.execute("ROLLBACK TO SAVEPOINT stage_csv;")
+    frame = pd.read_csv(path, dtype={column: str for column in TEXT_COLUMNS})
+    keep = frame[table.key].notna()
+    frame = load.conform(frame[keep], table)
+    return bulk.copy_frame(cursor, stage, frame), int((~keep).sum())
+
+
+@contextmanager
+def replacing(cursor, tables):
+    # Empty the tables for a load that replaces them. Indexes and constraints are dropped for the load
+    # and built once at the end, foreign keys of other tables that point at these are checked again
+    # against the new rows then.
+    load.create_tables(cursor, tables)
+    names = [table.name for table in tables]
+    with bulk.deferred_indexes(cursor, names):
+        cursor.execute(sql.SQL("TRUNCATE {};").format(sql.SQL(", ").join(sql.Identifier(name) for name in names)))
+        yield
+    # The incremental load starts over for these tables
+    cursor.execute("DELETE FROM etl.row_fingerprints WHERE table_name = ANY(%s);", (names,))
+    for name in names:
+        cursor.execute(sql.SQL("ANALYZE {};").format(sql.Identifier(name)))
+
+
+def seed(conn, data_dir=DATA_DIR):
+    # Replace the contents of every table that has a file in data_dir, in one transaction
+    tables = [table for table in TABLES if os.path.exists(os.path.join(data_dir, DATA_FILES[table.name]))]
+    report = {}
+    with conn, conn.cursor() as cursor, replacing(cursor, tables):
+        for table in tables:
+            started = time.perf_counter()
+            rows, skipped = _stage_csv(cursor, table, os.path.join(data_dir, DATA_FILES[table.name]))
+            bulk.merge(cursor, table.name, [name for name, _ in table.columns])
+            report[table.name] = {"rows": rows, "skipped": skipped, "seconds": time.perf_counter() - started}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m etl.seed", description="Replace the tables with the CSVs in a data directory, using COPY.")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="directory with one CSV per table (default: pgsql/data)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    conn = load.connect()
+    try:
+        report = seed(conn, args.data_dir)
+    finally:
+        conn.close()
+    for name, counts in report.items():
+        print(f"{name:<36}{counts['rows']:>10} rows{counts['skipped']:>6} skipped{counts['seconds']:>8.2f}s")
+    print(f"{'total':<36}{sum(counts['rows'] for counts in report.values()):>10} rows in {time.perf_counter() - started:.2f}s")
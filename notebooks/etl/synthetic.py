@@ -0,0 +1,363 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from psycopg2 import sql
+
+from etl import bulk, load, seed
+from etl.extract import DATA_DIR, DATA_FILES
+from etl.extract import SHEETS
+from etl.schema import ID_COLUMNS, JSON_COLUMNS, TABLES, TABLES_BY_NAME
+from etl.transform import AWARD_SLOTS, LANGUAGE_SLOTS, WORK_EXP_SLOTS, WORKSHOP_SLOTS
+
+# Synthetic data in the shape of the bundled tables, at scale times their size. Every generated row
+# is a bundled row with new identifiers, foreign keys that point at generated rows and names and
+# skill lists drawn anew, so the distributions and the Thai text stay those of the real data.
+
+# Students are generated CHUNK_STUDENTS at a time, each chunk from a random generator of its own, so
+# a seed gives the same rows whatever the output
+CHUNK_STUDENTS = 100000
+
+# Distinct skill lists to draw from, per JSON column
+SKILL_LISTS = 10000
+
+# Tables scaled by repeating the bundled rows, the key numbered on from the first bundled key.
+# address_info is real geography and is kept as it is.
+REFERENCE_TABLES = ["professor", "company", "academy", "officer", "comment"]
+
+# Names that get the copy number appended from the second copy on, so they stay distinct. School
+# names are cut at the first space when they come from the form, so theirs is appended without one.
+NUMBERED_COLUMNS = {"company": ("company_name", " "), "academy": ("institution_name", "")}
+
+# Columns drawn independently from the bundled values of the column, for every row
+DRAWN_COLUMNS = {
+    "professor": ["professor_firstname", "professor_lastname"],
+    "officer": ["offfirst_name", "offlast_name"],
+    "student_info": ["first_name", "last_name"],
+    "student_emergency_contact": ["first_name", "last_name", "workplace"],
+    "cooperative_student_questionnaire": ["rvfirst_name", "rvlast_name"],
+}
+
+# Foreign keys, (table, column) -> referenced table
+REFERENCES = {
+    ("comment", "company_id"): "company",
+    ("student_info", "professor_id"): "professor",
+    ("student_final_project", "professor_id"): "professor",
+    ("cooperative_student_questionnaire", "company_id"): "company",
+    ("student_address", "address_id"): "address_info",
+    ("student_emergency_contact", "address_id"): "address_info",
+    ("student_education_history", "middle_school_id"): "academy",
+    ("student_education_history", "high_school_id"): "academy",
+    ("student_education_history", "bachelor_university_id"): "academy",
+}
+
+STUDENT_TABLES = [table.name for table in TABLES if table.key == "student_id"]
+
+# Form questions of the skill items, by item field. The form numbers repeated questions with a
+# suffix per slot (the suffixes of transform), the work experience periods have their own names.
+LANGUAGE_QUESTIONS = {"language": "ภาษา", "reading": "ทักษะการอ่าน", "writing": "ทักษะการเขียน",
+                      "speaking": "ทักษะการพูด", "listening": "ทักษะการฟัง"}
+WORKSHOP_QUESTIONS = {"workshop_topic": "หัวข้อฝึกอบรม", "organizer": "หน่วยงานที่ให้การฝึกอบรม", "period": "ช่วงเวลา"}
+WORK_EXP_QUESTIONS = {"organization": "องค์กร/กิจกรรม", "responsibility": "ความรับผิดชอบ", "note": "หมายเหตุ"}
+AWARD_QUESTIONS = {"award": "รางวัลที่ได้รับ", "awarded_by": "หน่วยงานที่มอบให้", "awarded_date": "วันที่ได้รับ"}
+
+# Answers the form stores as numbers
+NUMBER_FIELDS = ["reading", "writing", "speaking", "listening", "awarded_date"]
+
+
+def read_templates(data_dir=DATA_DIR):
+    # The bundled tables as text, keys without padding and one row per key
+    templates = {}
+    for table in TABLES:
+        frame = pd.read_csv(os.path.join(data_dir, DATA_FILES[table.name]), dtype=str)
+        for column in frame.columns.intersection(ID_COLUMNS):
+            frame[column] = frame[column].str.strip()
+        templates[table.name] = frame.dropna(subset=[table.key]).drop_duplicates(subset=[table.key], keep="last").reset_index(drop=True)
+    return templates
+
+
+def _ids(first, count):
+    # count keys numbered on from first, as wide as first
+    return pd.Series(np.arange(int(first), int(first) + count)).astype(str).str.zfill(len(first)).to_numpy(dtype=object)
+
+
+def _draw(rng, column, count):
+    # count values drawn from the values of a bundled column
+    values = column.to_numpy(dtype=object)
+    return values[rng.integers(len(values), size=count)]
+
+
+def _remap(values, template_ids, ids, position):
+    # Point foreign keys at the generated rows: a bundled key refers to one of the copies of its row,
+    # chosen by position (0-1), rows that are not in the bundled table to any row
+    positions = pd.Index(template_ids).get_indexer(values)
+    copies = (len(ids) - positions + len(template_ids) - 1) // len(template_ids)
+    rows = positions + len(template_ids) * np.floor(position * np.maximum(copies, 1)).astype(int)
+    lost = (positions < 0) | (copies <= 0)
+    rows[lost] = np.floor(position[lost] * len(ids)).astype(int)
+    return np.where(pd.isna(values), None, ids[rows])
+
+
+def _phones(rng, phones):
+    # Random numbers behind the prefixes of the bundled numbers
+    numbers = phones.str[:2].to_numpy(dtype=object) + pd.Series(rng.integers(10 ** 8, size=len(phones))).astype(str).str.zfill(8).to_numpy(dtype=object)
+    return np.where(phones.isna(), None, numbers)
+
+
+def skill_lists(rng, column, count=SKILL_LISTS):
+    # count JSON arrays recombined from the items of the bundled arrays, as many items as the bundled
+    # arrays have. An item repeats in a list at most once by its first field (the language, topic, ...).
+    arrays = [json.loads(value) for value in column.dropna()]
+    if column.name == "workshop":
+        # Workshops are numbered in list order, {"workshop1": {...}}
+        arrays = [[next(iter(item.values())) for item in items] for items in arrays]
+    items = [item for items in arrays for item in items]
+    lengths = rng.choice([len(items) for items in arrays], size=count)
+    lists = []
+    for length in lengths:
+        chosen = [items[i] for i in rng.choice(len(items), size=min(length, len(items)), replace=False)]
+        chosen = list({next(iter(item.values())): item for item in chosen}.values())
+        if column.name == "workshop":
+            chosen = [{f"workshop{i}": item} for i, item in enumerate(chosen, 1)]
+        lists.append(json.dumps(chosen, ensure_ascii=False))
+    return np.array(lists, dtype=object)
+
+
+def references(rng, templates, scale):
+    # The reference tables at scale, by name. Row i is a copy of bundled row i modulo the bundled count.
+    tables = {"address_info": templates["address_info"]}
+    for name in REFERENCE_TABLES:
+        template = templates[name]
+        key = TABLES_BY_NAME[name].key
+        count = max(1, round(len(template) * scale))
+        rows, copies = np.arange(count) % len(template), np.arange(count) // len(template)
+        frame = template.iloc[rows].reset_index(drop=True)
+        frame[key] = _ids(template[key].iloc[0], count)
+        if name in NUMBERED_COLUMNS:
+            column, separator = NUMBERED_COLUMNS[name]
+            frame[column] = frame[column].where(copies == 0, frame[column] + separator + pd.Series(copies + 1).astype(str))
+        # People are only repeated in name from the second copy on
+        for column in DRAWN_COLUMNS.get(name, []):
+            frame[column] = np.where(copies == 0, frame[column], _draw(rng, template[column], count))
+        for (table, column), referenced in REFERENCES.items():
+            if table == name:
+                frame[column] = _remap(frame[column].to_numpy(dtype=object), templates[referenced][TABLES_BY_NAME[referenced].key],
+                                       tables[referenced][TABLES_BY_NAME[referenced].key].to_numpy(dtype=object), rng.random(count))
+        tables[name] = frame
+    return tables
+
+
+def students(rng, templates, tables, skills, start, count):
+    # The student tables for students start to start + count, by name. Every student is a bundled
+    # student (all of its rows) with a new ID. One draw per student picks the copies its foreign keys
+    # point at, so a student's school, adviser and company come from the same copy of the world.
+    info = templates["student_info"]
+    chosen = rng.integers(len(info), size=count)
+    position = rng.random(count)
+    student_ids = info["student_id"].str[:2].to_numpy(dtype=object)[chosen] + \
+        pd.Series(np.arange(start + 1, start + count + 1)).astype(str).str.zfill(8).to_numpy(dtype=object)
+    frames = {}
+    for name in STUDENT_TABLES:
+        template = templates[name].set_index("student_id").reindex(info["student_id"])
+        # Students without a row in the bundled table get none either
+        present = template.notna().any(axis=1).to_numpy()[chosen]
+        frame = template.iloc[chosen[present]].reset_index(drop=True)
+        frame.insert(0, "student_id", student_ids[present])
+        for column in DRAWN_COLUMNS.get(name, []):
+            frame[column] = _draw(rng, templates[name][column], len(frame))
+        for (table, column), referenced in REFERENCES.items():
+            if table == name:
+                frame[column] = _remap(frame[column].to_numpy(dtype=object), templates[referenced][TABLES_BY_NAME[referenced].key],
+                                       tables[referenced][TABLES_BY_NAME[referenced].key].to_numpy(dtype=object), position[present])
+        if "tel" in frame.columns:
+            frame["tel"] = _phones(rng, frame["tel"])
+        for column in frame.columns.intersection(JSON_COLUMNS):
+            frame[column] = np.where(frame[column].notna(), skills[column][rng.integers(len(skills[column]), size=len(frame))], None)
+        frames[name] = frame
+    return frames
+
+
+def generate(scale, seed=0, data_dir=DATA_DIR):
+    # (table name, frame) pairs: the reference tables, then the student tables chunk by chunk.
+    # Students are scale times the bundled students, reference tables scale times their rows.
+    templates = read_templates(data_dir)
+    rng = np.random.default_rng([seed, 0])
+    tables = references(rng, templates, scale)
+    skills = {column: skill_lists(rng, templates["student_skills"][column]) for column in JSON_COLUMNS}
+    yield from tables.items()
+    total = max(1, round(len(templates["student_info"]) * scale))
+    for chunk, start in enumerate(range(0, total, CHUNK_STUDENTS), 1):
+        yield from students(np.random.default_rng([seed, chunk]), templates, tables, skills, start, min(CHUNK_STUDENTS, total - start)).items()
+
+
+def collect(frames):
+    # The (table name, frame) pairs of generate as one frame per table
+    chunks = {}
+    for name, frame in frames:
+        chunks.setdefault(name, []).append(frame)
+    return {name: pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0] for name, parts in chunks.items()}
+
+
+def _slots(column, count):
+    # The items of a JSON column as one frame of item fields per list position, aligned with the column
+    items = column.map(json.loads, na_action="ignore").explode().dropna()
+    if column.name == "workshop":
+        items = items.map(lambda item: next(iter(item.values())))
+    fields = pd.DataFrame(items.tolist(), index=items.index)
+    position = items.groupby(level=0).cumcount().to_numpy()
+    return [fields[position == slot].reindex(column.index) for slot in range(count)]
+
+
+def _questions(slots, questions, suffixes):
+    answers = {}
+    for fields, suffix in zip(slots, suffixes):
+        for field, question in questions.items():
+            values = fields[field] if field in fields.columns else pd.Series(None, index=fields.index, dtype=object)
+            answers[question + suffix] = pd.to_numeric(values, errors="coerce") if field in NUMBER_FIELDS else values
+    return answers
+
+
+def form_responses(tables):
+    # The student tables turned back into Google Form responses, one row per student of student_info,
+    # with the questions transform reads. The reference tables are the sheets next to it.
+    info = tables["student_info"].reset_index(drop=True)
+    students = info["student_id"]
+
+    def aligned(name):
+        return tables[name].set_index("student_id").reindex(students).reset_index(drop=True)
+
+    address, contact = aligned("student_address"), aligned("student_emergency_contact")
+    history, skills = aligned("student_education_history"), aligned("student_skills")
+    places = tables["address_info"].set_index("address_id").reindex(address["address_id"].str.strip()).reset_index(drop=True)
+    professor = tables["professor"].set_index("professor_id")
+    # Advisers are entered as first and last name without the academic title
+    advisers = professor["professor_firstname"].str.split(".").str[-1].str.split().str[-1] + " " + professor["professor_lastname"]
+    schools = tables["academy"].set_index("academy_id")["institution_name"]
+    contact_title = contact["first_name"].str.split(" ", n=1)
+
+    form = {
+        "Timestamp": time.strftime("%m/%d/%Y %H:%M:%S"),
+        "รหัสนักศึกษา": students,
+        "ชื่อ-นามสกุล": info["first_name"] + " " + info["last_name"],
+        "ชั้นปีที่": pd.to_numeric(info["academic_year"]),
+        "โทรศัพท์": info["tel"],
+        "E-mail": info["email"],
+        "เกรดเฉลี่ยรวม": pd.to_numeric(info["gpax"]),
+        "อาจารย์ที่ปรึกษา( ชื่อนาม - สกุล ไม่ใส่คำนำหน้า  )": info["professor_id"].map(advisers),
+        "ที่อยู่ที่สามารถติดต่อได้ เลขที่": address["address"],
+        "ถนน": None,
+        "แขวง / ตำบล": places["sub_district"],
+        "เขต / อำเภอ": places["district"],
+        "จังหวัด": places["province"],
+        "โรคประจำตัว (ไม่มีใส่ \" - \")": aligned("student_u_d")["u_d"],
+        "คำนำหน้า": contact_title.str[0],
+        "ชื่อ-สกุล": contact_title.str[1] + " " + contact["last_name"].str.strip(),
+        "ความเกี่ยวข้อง": contact["relationship"],
+        "สถานที่ทำงาน": contact["workplace"],
+        "ที่อยู่ที่สามารถติดต่อได้ เลขที่.1": contact["address"],
+        "โทรสาร": contact["fax"],
+        "ชื่อสถานศึกษาระดับมัธยมศึกษาตอนต้น": history["middle_school_id"].map(schools),
+        "ชื่อสถานศึกษาระดับมัธยมศึกษาตอนปลาย": history["high_school_id"].map(schools),
+        "ชื่อสถานศึกษาระดับปริญญาตรี": history["bachelor_university_id"].map(schools),
+    }
+    for suffix, level in [("", "middle_school"), (".1", "high_school"), (".2", "bachelor")]:
+        form["ปีที่จบ" + suffix] = pd.to_numeric(history[f"{level}_end_year"])
+        form["เกรดเฉลี่ย" + suffix] = pd.to_numeric(history[f"{level}_gpax"])
+    form["ความสามารถด้านคอมพิวเตอร์"] = skills["technical_skills"]
+    form["ความสามารถด้านกีฬา/ดนตรี"] = skills["sp_muskills"]
+    form["ความสามารถอื่นๆ"] = skills["other_skills"]
+    form.update(_questions(_slots(skills["language_skills"], len(LANGUAGE_SLOTS)), LANGUAGE_QUESTIONS, LANGUAGE_SLOTS))
+    form.update(_questions(_slots(skills["workshop"], len(WORKSHOP_SLOTS)), WORKSHOP_QUESTIONS, WORKSHOP_SLOTS))
+    work_exp = _slots(skills["work_exp"], len(WORK_EXP_SLOTS))
+    for fields, (period, suffix) in zip(work_exp, WORK_EXP_SLOTS):
+        form[period] = fields["period"] if "period" in fields.columns else None
+        form.update(_questions([fields], WORK_EXP_QUESTIONS, [suffix]))
+    form.update(_questions(_slots(skills["award"], len(AWARD_SLOTS)), AWARD_QUESTIONS, AWARD_SLOTS))
+    return pd.DataFrame(form)
+
+
+def sheets(tables):
+    # The reference tables as the sheets read_sources returns
+    return {name: tables[name] for name in SHEETS}
+
+
+def _typed(frame, table):
+    # Text columns as strings, the others in their column type, the same for every chunk
+    types = dict(table.columns)
+    frame = frame.copy()
+    for column in frame.columns:
+        data_type = types[column]
+        if data_type == "integer":
+            frame[column] = pd.to_numeric(frame[column]).astype("Int64")
+        elif data_type.startswith("numeric") or data_type == "double precision":
+            frame[column] = pd.to_numeric(frame[column]).astype("Float64")
+        elif data_type == "boolean":
+            frame[column] = frame[column].str.lower().map({"true": True, "t": True, "false": False, "f": False}).astype("boolean")
+        else:
+            frame[column] = frame[column].astype("string")
+    return frame
+
+
+def write_csv(frames, out_dir):
+    # One CSV per table, named as in pgsql/data so etl.seed and the offline mode read them
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for name, frame in frames:
+        frame.to_csv(os.path.join(out_dir, DATA_FILES[name]), mode="a" if name in counts else "w", header=name not in counts, index=False)
+        counts[name] = counts.get(name, 0) + len(frame)
+    return counts
+
+
+def write_parquet(frames, out_dir):
+    # One Parquet file per table, a row group per chunk
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(out_dir, exist_ok=True)
+    writers, counts = {}, {}
+    try:
+        for name, frame in frames:
+            table = pa.Table.from_pandas(_typed(frame, TABLES_BY_NAME[name]), preserve_index=False)
+            if name not in writers:
+                writers[name] = pq.ParquetWriter(os.path.join(out_dir, name + ".parquet"), table.schema)
+            writers[name].write_table(table.cast(writers[name].schema))
+            counts[name] = counts.get(name, 0) + len(frame)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
+
+
+def load_tables(conn, frames):
+    # Replace the contents of every table with the frames, COPY straight into the emptied tables
+    counts = {}
+    with conn, conn.cursor() as cursor, seed.replacing(cursor, TABLES):
+        for name, frame in frames:
+            counts[name] = counts.get(name, 0) + bulk.copy_frame(cursor, sql.Identifier(name), frame)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m etl.synthetic", description="Generate the 14 tables at a multiple of the bundled data.")
+    parser.add_argument("--scale", type=float, default=1.0, help="size as a multiple of pgsql/data, e.g. 10000 for 1.2 million students")
+    parser.add_argument("--seed", type=int, default=0, help="random seed, the same seed and scale give the same data")
+    parser.add_argument("--out", help="write files to this directory instead of loading Postgres")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="file format with --out (default: csv)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    frames = generate(args.scale, args.seed)
+    if args.out:
+        counts = (write_parquet if args.format == "parquet" else write_csv)(frames, args.out)
+    else:
+        conn = load.connect()
+        try:
+            counts = load_tables(conn, frames)
+        finally:
+            conn.close()
+    for name, rows in counts.items():
+        print(f"{name:<36}{rows:>10} rows")
+    print(f"{'total':<36}{sum(counts.values()):>10} rows in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,234 @@
+import pandas as pd
+
+from etl import lookups
+from etl.institutions import Institutions
+from etl.schema import SCORE_COLUMNS
+
+# Final project results as entered in the sheet
+PASSED = {"ผ่าน": True, "ไม่ผ่าน": False, "true": True, "false": False}
+
+
+def student_info(form, professors):
+    info = pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'name': form['ชื่อ-นามสกุล'],
+        'academic_year': form['ชั้นปีที่'],
+        'tel': form['โทรศัพท์'],
+        'email': form['E-mail'],
+        'gpax': form['เกรดเฉลี่ยรวม'],
+        'professor_name': form['อาจารย์ที่ปรึกษา( ชื่อนาม - สกุล ไม่ใส่คำนำหน้า  )'],
+    })
+
+    # Split 'name' into 'first_name' and 'last_name'
+    info[['first_name', 'last_name']] = info['name'].str.split(' ', n=1, expand=True)
+
+    # Ensure tel values are 10 characters
+    info['tel'] = info['tel'].astype(str).str.zfill(10)
+
+    # Find professor_id based on the professor's last name
+    info['professor_id'] = professors.resolve(info['professor_name'].str.split().str[1])
+    info['academic_year'] = info['academic_year'].astype(int)
+    return info[['student_id', 'first_name', 'last_name', 'academic_year', 'tel', 'email', 'gpax', 'professor_id']]
+
+
+def student_address(form, addresses):
+    address = pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'address_1': form['แขวง / ตำบล'],
+        'address_2': form['เขต / อำเภอ'],
+        'address_3': form['จังหวัด'],
+        'address': form['ที่อยู่ที่สามารถติดต่อได้ เลขที่'],
+    })
+    address['address_id'] = addresses.resolve(address['address_1'], address['address_2'], address['address_3'])
+    return address[['student_id', 'address_id', 'address']]
+
+
+def student_u_d(form):
+    return pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'u_d': form['โรคประจำตัว (ไม่มีใส่ " - ")'],
+    })
+
+
+def student_emergency_contact(form, addresses):
+    contact = pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'name_title': form['คำนำหน้า'],
+        'name': form['ชื่อ-สกุล'],
+        'relationship': form['ความเกี่ยวข้อง'],
+        'workplace': form['สถานที่ทำงาน'],
+        'address_1': form['แขวง / ตำบล'],
+        'address_2': form['เขต / อำเภอ'],
+        'address_3': form['จังหวัด'],
+        'address': form['ที่อยู่ที่สามารถติดต่อได้ เลขที่.1'],
+        'tel': form['โทรศัพท์'],
+        'fax': form['โทรสาร'],
+    })
+
+    # Split 'name' into 'first_name' and 'last_name', the title goes in front of the first name
+    contact[['first_name', 'last_name']] = contact['name'].str.split(' ', n=1, expand=True)
+    contact['first_name'] = contact['name_title'] + ' ' + contact['first_name']
+
+    contact['address_id'] = addresses.resolve(contact['address_1'], contact['address_2'], contact['address_3'])
+    contact = contact[['student_id', 'first_name', 'last_name', 'address_id', 'address', 'relationship', 'workplace', 'tel', 'fax']].copy()
+
+    # Ensure tel values are 10 characters
+    contact['tel'] = contact['tel'].astype(str).str.zfill(10)
+    return contact
+
+
+def student_education_history(form, institutions):
+    # Schools not known yet are added to institutions.academy
+    history = pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'middle_school_id': form['ชื่อสถานศึกษาระดับมัธยมศึกษาตอนต้น'],
+        'high_school_id': form['ชื่อสถานศึกษาระดับมัธยมศึกษาตอนปลาย'],
+        'bachelor_university_id': form['ชื่อสถานศึกษาระดับปริญญาตรี'],
+        'middle_school_end_year': form['ปีที่จบ'],
+        'high_school_end_year': form['ปีที่จบ.1'],
+        'bachelor_end_year': form['ปีที่จบ.2'],
+        'middle_school_gpax': form['เกรดเฉลี่ย'],
+        'high_school_gpax': form['เกรดเฉลี่ย.1'],
+        'bachelor_gpax': form['เกรดเฉลี่ย.2'],
+    })
+
+    # Keep the first word of the school names and remove English from them
+    schools = pd.concat([history['middle_school_id'], history['high_school_id']], ignore_index=True)
+    schools = schools.str.split().str[0].str.replace(r'[a-zA-Z]+', '', regex=True)
+
+    # Schools not in the academy table yet get a new academy_id, in order of appearance
+    school_ids = institutions.resolve(schools, add=True)
+    history['middle_school_id'] = school_ids.iloc[:len(history)].to_numpy()
+    history['high_school_id'] = school_ids.iloc[len(history):].to_numpy()
+    history['bachelor_university_id'] = institutions.resolve(history['bachelor_university_id'])
+    return history
+
+
+# Repeated groups of form columns, by the suffix pandas gives the repeated headers
+LANGUAGE_SLOTS = ['', '.1', '.2']
+WORKSHOP_SLOTS = ['', '.1', '.2', '.3']
+WORK_EXP_SLOTS = [('ช่วงเวลา.4', ''), ('ช่วงเวลา.5', '.1')]
+AWARD_SLOTS = ['', '.1', '.2']
+
+
+def _records(fields, keep):
+    # One dict per row from field name -> column with missing values as None, None for rows not kept
+    names = list(fields)
+    columns = [column.astype(object).where(column.notna(), None).to_numpy() for column in fields.values()]
+    return [dict(zip(names, values)) if kept else None for kept, values in zip(keep.to_numpy(), zip(*columns))]
+
+
+def _number_text(column):
+    # Whole numbers as text, missing values as '0'
+    return pd.to_numeric(column).fillna(0).astype(int).astype(str)
+
+
+def _json_arrays(slots):
+    # The records of every row in slot order, None for rows where no slot was kept
+    return [[record for record in row if record is not None] or None for row in zip(*slots)]
+
+
+def _language_slot(form, suffix):
+    language = form['ภาษา' + suffix].fillna('').astype(object)
+    language = language.where((language == '') | language.str.contains('ภาษา', regex=False), 'ภาษา' + language)
+    return _records({
+        'language': language,
+        'reading': _number_text(form['ทักษะการอ่าน' + suffix]),
+        'writing': _number_text(form['ทักษะการเขียน' + suffix]),
+        'speaking': _number_text(form['ทักษะการพูด' + suffix]),
+        'listening': _number_text(form['ทักษะการฟัง' + suffix]),
+    }, language != '')
+
+
+def _workshop_slot(form, suffix):
+    topic = form['หัวข้อฝึกอบรม' + suffix]
+    return _records({
+        'workshop_topic': topic,
+        'organizer': form['หน่วยงานที่ให้การฝึกอบรม' + suffix],
+        'period': form['ช่วงเวลา' + suffix],
+    }, topic.notna())
+
+
+def _work_exp_slot(form, period, suffix):
+    fields = {
+        'period': form[period],
+        'organization': form['องค์กร/กิจกรรม' + suffix],
+        'responsibility': form['ความรับผิดชอบ' + suffix],
+        'note': form['หมายเหตุ' + suffix],
+    }
+    return _records(fields, pd.DataFrame(fields).notna().any(axis=1))
+
+
+def _award_slot(form, suffix):
+    fields = {
+        'award': form['รางวัลที่ได้รับ' + suffix],
+        'awarded_by': form['หน่วยงานที่มอบให้' + suffix],
+        'awarded_date': _number_text(form['วันที่ได้รับ' + suffix]),
+    }
+    keep = fields['award'].notna() | fields['awarded_by'].notna() | (fields['awarded_date'] != '0')
+    return _records(fields, keep)
+
+
+def student_skills(form):
+    # Skills with languages, workshops, work experience and awards as JSON arrays of the filled-in
+    # entries, built column by column for all students at once
+    workshops = _json_arrays([_workshop_slot(form, suffix) for suffix in WORKSHOP_SLOTS])
+    skills = pd.DataFrame({
+        'student_id': form['รหัสนักศึกษา'],
+        'technical_skills': form['ความสามารถด้านคอมพิวเตอร์'],
+        'sp_muskills': form['ความสามารถด้านกีฬา/ดนตรี'],
+        'other_skills': form['ความสามารถอื่นๆ'],
+    }).astype(object)
+    skills = skills.where(skills.notna(), None)
+    skills['language_skills'] = _json_arrays([_language_slot(form, suffix) for suffix in LANGUAGE_SLOTS])
+    # Workshops are numbered from 1 in the order they were entered
+    skills['workshop'] = [[{f'workshop{i}': item} for i, item in enumerate(items, 1)] if items else None for items in workshops]
+    skills['work_exp'] = _json_arrays([_work_exp_slot(form, period, suffix) for period, suffix in WORK_EXP_SLOTS])
+    skills['award'] = _json_arrays([_award_slot(form, suffix) for suffix in AWARD_SLOTS])
+    return skills.reset_index(drop=True)
+
+
+def student_final_project(final_project):
+    final_project = final_project.copy()
+    final_project['finish_year'] = final_project['finish_year'].astype(str)
+    final_project['passed'] = final_project['passed'].astype(str).str.strip().str.lower().map(PASSED)
+    return final_project
+
+
+def cooperative_student_questionnaire(cooperative):
+    # Missing ratings count as 0, other missing answers as '-'. A missing student_id stays missing,
+    # the loader skips rows without a key.
+    cooperative = cooperative.copy()
+    cooperative[SCORE_COLUMNS] = cooperative[SCORE_COLUMNS].fillna(0)
+    filled = cooperative.notna()
+    filled['student_id'] = True
+    return cooperative.astype(object).where(filled, '-')
+
+
+def transform(sheets, form, unmatched=None, institutions=None):
+    # Every target table, by name. Without form responses (offline mode) the student tables are
+    # expected among the sheets in their final shape. Pass a dict as unmatched to get the lookup
+    # keys that were not found. New academies get IDs after the largest one in the sheet unless
+    # institutions (an Institutions index over the academy sheet) says otherwise.
+    tables = {name: frame.copy() for name, frame in sheets.items()}
+    used = []
+    if form is not None:
+        form = form.drop(columns=['Timestamp'], errors='ignore')
+        professors = lookups.professors(tables['professor'])
+        addresses = lookups.addresses(tables['address_info'])
+
+        tables['student_info'] = student_info(form, professors)
+        tables['student_address'] = student_address(form, addresses)
+        tables['student_u_d'] = student_u_d(form)
+        tables['student_emergency_contact'] = student_emergency_contact(form, addresses)
+        if institutions is None:
+            institutions = Institutions(tables['academy'])
+        tables['student_education_history'] = student_education_history(form, institutions)
+        tables['academy'] = institutions.academy
+        tables['student_skills'] = student_skills(form)
+        used = [professors, addresses, institutions.lookup]
+    tables['student_final_project'] = student_final_project(tables['student_final_project'])
+    tables['cooperative_student_questionnaire'] = cooperative_student_questionnaire(tables['cooperative_student_questionnaire'])
+    if unmatched is not None:
+        unmatched.update(lookups.unmatched_report(used))
+    return tables
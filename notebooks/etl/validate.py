@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from etl.schema import SCORE_COLUMNS, TABLES, TABLES_BY_NAME
+
+# A check returns the rows of a column that break the rule. Rows that break a rule with
+# quarantine=True are held back from the load, the others are only reported.
+Rule = namedtuple("Rule", ["table", "column", "name", "check", "quarantine"])
+
+# The result of a validation run: the tables to load, one row per broken rule and row, and the
+# rows held back by table
+Validation = namedtuple("Validation", ["tables", "violations", "quarantine"])
+
+# Identifier formats, by column name
+ID_FORMATS = {
+    "student_id": r"\d{10}",
+    "professor_id": r"\d{10}",
+    "company_id": r"\d{10}",
+    "officer_id": r"\d{10}",
+    "comment_id": r"\d{10}",
+    "academy_id": r"\d{9}",
+    "address_id": r"\d{6}",
+}
+
+# Reports and quarantined rows of every run are written to a directory of their own under REPORT_DIR
+REPORT_DIR = os.environ.get("ETL_REPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".etl_reports"))
+
+
+def _text(column):
+    # Values compared as text without padding, the way character(n) columns compare in Postgres
+    return column.astype(str).str.strip()
+
+
+def bad_format(pattern):
+    def check(column, tables):
+        return column.notna() & ~_text(column).str.fullmatch(pattern).fillna(False).astype(bool)
+    return check
+
+
+def out_of_range(low, high, allowed=()):
+    def check(column, tables):
+        numbers = pd.to_numeric(column, errors="coerce")
+        return column.notna() & ~(numbers.between(low, high) | numbers.isin(allowed))
+    return check
+
+
+def missing_reference(table, key):
+    # Values that are not a key of the (already validated) referenced table. Skipped when that
+    # table is not loaded in this run.
+    def check(column, tables):
+        if table not in tables:
+            return pd.Series(False, index=column.index)
+        return column.notna() & ~_text(column).isin(_text(tables[table][key]))
+    return check
+
+
+def missing_key(column, tables):
+    return column.isna()
+
+
+def duplicate_key(column, tables):
+    # Every row but the last of a repeated key, the loader keeps the last one
+    return column.notna() & column.duplicated(keep="last")
+
+
+RULES = [
+    Rule(table.name, table.key, name, check, True)
+    for table in TABLES
+    for name, check in [("missing_key", missing_key), ("duplicate_key", duplicate_key)]
+] + [
+    Rule(table.name, column, "id_format", bad_format(ID_FORMATS[column]), column == table.key)
+    for table in TABLES for column, _ in table.columns if column in ID_FORMATS
+] + [
+    Rule("student_info", "tel", "phone_format", bad_format(r"\d{10}"), False),
+    Rule("student_emergency_contact", "tel", "phone_format", bad_format(r"\d{10}"), False),
+    Rule("student_emergency_contact", "fax", "phone_format", bad_format(r"\d{10}|-\s*"), False),
+    Rule("student_info", "gpax", "gpax_range", out_of_range(0, 4), True),
+] + [
+    Rule("student_education_history", column, "gpax_range", out_of_range(0, 4), True)
+    for column in ["middle_school_gpax", "high_school_gpax", "bachelor_gpax"]
+] + [
+    # 0 stands for a rating that was left empty
+    Rule("cooperative_student_questionnaire", column, "score_range", out_of_range(1, 5, allowed=[0]), True)
+    for column in SCORE_COLUMNS
+] + [
+    Rule("comment", column, "score_range", out_of_range(1, 5), True)
+    for column, data_type in TABLES_BY_NAME["comment"].columns if data_type == "integer"
+] + [
+    Rule(table.name, "student_id", "foreign_key", missing_reference("student_info", "student_id"), True)
+    for table in TABLES if table.key == "student_id" and table.name != "student_info"
+] + [
+    Rule(table, column, "foreign_key", missing_reference(referenced, key), True)
+    for table, column, referenced, key in [
+        ("student_info", "professor_id", "professor", "professor_id"),
+        ("student_final_project", "professor_id", "professor", "professor_id"),
+        ("cooperative_student_questionnaire", "company_id", "company", "company_id"),
+        ("comment", "company_id", "company", "company_id"),
+        ("student_address", "address_id", "address_info", "address_id"),
+        ("student_emergency_contact", "address_id", "address_info", "address_id"),
+        ("student_education_history", "middle_school_id", "academy", "academy_id"),
+        ("student_education_history", "high_school_id", "academy", "academy_id"),
+        ("student_education_history", "bachelor_university_id", "academy", "academy_id"),
+    ]
+]
+
+
+def validate(frames, rules=RULES):
+    # Check every table column by column, in load order so that foreign keys are checked against
+    # the rows of the referenced table that passed. Tables without rules pass through as they are.
+    tables, found, quarantine = {}, [], {}
+    for name in [table.name for table in TABLES if table.name in frames] + [name for name in frames if name not in TABLES_BY_NAME]:
+        frame = frames[name].reset_index(drop=True)
+        key = TABLES_BY_NAME[name].key if name in TABLES_BY_NAME else None
+        broken = []
+        for rule in rules:
+            if rule.table != name or rule.column not in frame.columns:
+                continue
+            rows = np.flatnonzero(rule.check(frame[rule.column], tables).to_numpy())
+            if len(rows):
+                broken.append(pd.DataFrame({
+                    "table": name,
+                    "rule": rule.name,
+                    "column": rule.column,
+                    "row": rows,
+                    "key": frame[key].iloc[rows].to_numpy() if key in frame.columns else None,
+                    "value": frame[rule.column].iloc[rows].astype(str).to_numpy(),
+                    "quarantined": rule.quarantine,
+                }))
+        found += broken
+        held = pd.concat(broken, ignore_index=True) if broken else None
+        held = held[held["quarantined"]] if held is not None else []
+        if len(held):
+            labels = (held["rule"] + ":" + held["column"]).groupby(held["row"]).agg(", ".join)
+            quarantine[name] = frame.iloc[labels.index].assign(broken_rules=labels.to_numpy())
+            tables[name] = frame.drop(index=labels.index)
+        else:
+            tables[name] = frame
+    columns = ["table", "rule", "column", "row", "key", "value", "quarantined"]
+    violations = pd.concat(found, ignore_index=True) if found else pd.DataFrame(columns=columns)
+    return Validation(tables, violations, quarantine)
+
+
+def summary(validation):
+    # Rows held back and rule violations by table
+    counts = validation.violations.groupby(["table", "rule"]).size()
+    return {name: {"quarantined": len(validation.quarantine.get(name, ())),
+                   "violations": {rule: int(count) for (table, rule), count in counts.items() if table == name}}
+            for name in validation.violations["table"].unique()}
+
+
+def write_report(validation, directory=None):
+    # report.json (the summary), violations.parquet and one parquet file per table with quarantined rows
+    directory = directory or os.path.join(REPORT_DIR, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "report.json"), "w", encoding="utf-8") as file:
+        json.dump({"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "tables": summary(validation)}, file, ensure_ascii=False, indent=1)
+    validation.violations.astype({"key": str, "value": str}).to_parquet(os.path.join(directory, "violations.parquet"), index=False)
+    for name, frame in validation.quarantine.items():
+        frame.astype(str).to_parquet(os.path.join(directory, f"quarantine_{name}.parquet"), index=False)
+    return directory
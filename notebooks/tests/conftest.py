@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The etl package lives next to the notebook, the way python -m etl runs it from notebooks/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
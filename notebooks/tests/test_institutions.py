@@ -0,0 +1,62 @@
+import pandas as pd
+
+from etl import institutions
+from etl.institutions import Institutions
+
+ACADEMY = pd.DataFrame({
+    "academy_id": ["000000001", "000000002", "000000003"],
+    "institution_name": ["โรงเรียนเตรียมอุดมศึกษา", "Bangkok Christian College", "มหาวิทยาลัยธรรมศาสตร์"],
+    "province": ["กรุงเทพมหานคร", "กรุงเทพมหานคร", "ปทุมธานี"],
+})
+
+
+def test_name_key():
+    names = pd.Series(["โรงเรียนเตรียมอุดมศึกษา", "ร.ร. เตรียมอุดมศึกษา", "  เตรียม อุดมศึกษา ", "Bangkok  Christian-College School",
+                       "ＢＡＮＧＫＯＫ Christian College", "โรงเรียน", None])
+    keys = institutions.name_key(names)
+    assert keys[:3].tolist() == ["เตรียมอุดมศึกษา"] * 3
+    assert keys[3:5].tolist() == ["bangkokchristiancollege"] * 2
+    assert keys[5:].isna().all()
+
+
+def test_resolve_spellings():
+    known = Institutions(ACADEMY)
+    resolved = known.resolve(pd.Series(["ร.ร.เตรียมอุดมศึกษา", "BANGKOK CHRISTIAN COLLEGE", "Unknown School", None]))
+    assert resolved.tolist() == ["000000001", "000000002", None, None]
+    assert known.lookup.unmatched == {"unknown": 1}
+
+
+def test_new_institutions():
+    # Names that are not known become academies with IDs after the largest one, once per spelling
+    known = Institutions(ACADEMY)
+    resolved = known.resolve(pd.Series(["โรงเรียนสวนกุหลาบ", "Suankularb", "ร.ร.สวนกุหลาบ", "มหาวิทยาลัยธรรมศาสตร์"]), add=True)
+    assert resolved.tolist() == ["000000004", "000000005", "000000004", "000000003"]
+    assert known.academy["academy_id"].tolist()[3:] == ["000000004", "000000005"]
+    assert known.academy["institution_name"].tolist()[3:] == ["โรงเรียนสวนกุหลาบ", "Suankularb"]
+    assert not known.new_aliases
+
+
+def test_allocator():
+    ids = iter([[100, 101]])
+    known = Institutions(ACADEMY, allocate=lambda count: next(ids)[:count])
+    assert known.resolve(pd.Series(["a", "b", "a"]), add=True).tolist() == ["000000100", "000000101", "000000100"]
+
+
+def test_known_aliases():
+    known = Institutions(ACADEMY, aliases={"tu": "000000003"})
+    assert known.resolve(pd.Series(["TU"])).tolist() == ["000000003"]
+
+
+def test_fuzzy_match():
+    # A misspelling close enough to a known name is taken for it and kept as an alias, one that is
+    # not becomes a new academy
+    known = Institutions(ACADEMY, fuzzy_cutoff=institutions.FUZZY_CUTOFF)
+    resolved = known.resolve(pd.Series(["โรงเรียนเตรียมอุดมศีกษา", "Bangkok Christian Colege", "Bangkok Patana"]), add=True)
+    assert resolved.tolist() == ["000000001", "000000002", "000000004"]
+    assert known.new_aliases == {"เตรียมอุดมศีกษา": "000000001", "bangkokchristiancolege": "000000002"}
+
+
+def test_fuzzy_off():
+    known = Institutions(ACADEMY)
+    assert known.resolve(pd.Series(["Bangkok Christian Colege"]), add=True).tolist() == ["000000004"]
+    assert not known.new_aliases
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from etl import lookups
+from etl.lookups import Lookup
+
+PROFESSOR = pd.DataFrame({
+    "professor_id": ["0000000001", "0000000002", "0000000003"],
+    "professor_lastname": ["Smith", "Jones", "Smith"],
+})
+
+ADDRESS_INFO = pd.DataFrame({
+    "address_id": ["000001", "000002"],
+    "sub_district": ["Khlong Nueng", "Khlong Nueng"],
+    "district": ["Khlong Luang", "Khlong Luang"],
+    "province": ["Pathum Thani", "Bangkok"],
+})
+
+
+def test_resolve_keeps_the_index():
+    lookup = lookups.professors(PROFESSOR)
+    names = pd.Series(["Jones", "Smith"], index=[10, 20])
+    assert lookup.resolve(names).to_dict() == {10: "0000000002", 20: "0000000001"}
+
+
+def test_first_row_wins():
+    lookup = lookups.professors(PROFESSOR)
+    assert lookup.resolve(pd.Series(["Smith"])).tolist() == ["0000000001"]
+
+
+def test_unmatched_keys():
+    # Keys that are not found resolve to None and are counted by row, missing keys are not counted
+    lookup = lookups.professors(PROFESSOR)
+    resolved = lookup.resolve(pd.Series(["Brown", "Jones", None, "Brown", "White"]))
+    assert resolved.tolist() == [None, "0000000002", None, None, None]
+    assert lookup.unmatched == {"Brown": 2, "White": 1}
+    assert lookup.report() == {"keys": 2, "rows": 3, "examples": ["Brown", "White"]}
+
+
+def test_unmatched_accumulates():
+    lookup = lookups.professors(PROFESSOR)
+    lookup.resolve(pd.Series(["Brown"]))
+    lookup.resolve(pd.Series(["Brown", "Green"]))
+    assert lookup.unmatched == {"Brown": 2, "Green": 1}
+
+
+def test_composite_keys():
+    lookup = lookups.addresses(ADDRESS_INFO)
+    resolved = lookup.resolve(pd.Series(["Khlong Nueng", "Khlong Nueng", "Khlong Nueng"]),
+                              pd.Series(["Khlong Luang", "Khlong Luang", None]),
+                              pd.Series(["Bangkok", "Nonthaburi", "Bangkok"]))
+    assert resolved.tolist() == ["000002", None, None]
+    assert lookup.unmatched == {("Khlong Nueng", "Khlong Luang", "Nonthaburi"): 1}
+
+
+def test_missing_keys_in_the_reference_table():
+    table = pd.DataFrame({"name": [None, "a"], "value": [1, 2]})
+    lookup = Lookup("test", table, ["name"], "value")
+    assert lookup.resolve(pd.Series(["a", None])).tolist() == [2, None]
+    assert not lookup.unmatched
+
+
+def test_unmatched_report():
+    found, missed = lookups.professors(PROFESSOR), lookups.addresses(ADDRESS_INFO)
+    found.resolve(pd.Series(["Smith"]))
+    missed.resolve(pd.Series(["x"]), pd.Series(["y"]), pd.Series(["z"]))
+    assert lookups.unmatched_report([found, missed]) == {"address": {"keys": 1, "rows": 1, "examples": [("x", "y", "z")]}}
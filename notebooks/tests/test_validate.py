@@ -0,0 +1,79 @@
+import pandas as pd
+
+from etl import validate
+
+
+def frames():
+    return {
+        "professor": pd.DataFrame({"professor_id": ["0000000001", "12"], "professor_lastname": ["Smith", "Jones"]}),
+        "student_info": pd.DataFrame({
+            "student_id": ["6400000001", "6400000002", "6400000003", "6400000004", "6400000005", "6400000005", None],
+            "tel": ["0812345678", "081-234", "0812345678", "0812345678", "0812345678", "0812345678", None],
+            "gpax": [3.5, 3.0, 4.5, 2.0, 2.5, 2.75, 3.0],
+            "professor_id": ["0000000001", "0000000001", "0000000001", "12", "0000000001", "0000000001", None],
+        }),
+        "student_skills": pd.DataFrame({"student_id": ["6400000001", "6400000003", "6400000002"]}),
+    }
+
+
+def test_checks():
+    column = pd.Series(["0812345678", " 0812345678 ", "081234567", None])
+    assert validate.bad_format(r"\d{10}")(column, {}).tolist() == [False, False, True, False]
+    scores = pd.Series([0, 1, 5, 6, "x", None])
+    assert validate.out_of_range(1, 5, allowed=[0])(scores, {}).tolist() == [False, False, False, True, True, False]
+    keys = pd.Series(["1", "1", "2", None])
+    assert validate.duplicate_key(keys, {}).tolist() == [True, False, False, False]
+    check = validate.missing_reference("professor", "professor_id")
+    references = pd.Series(["0000000001", "0000000002", None])
+    assert check(references, {}).tolist() == [False, False, False]
+    assert check(references, {"professor": frames()["professor"]}).tolist() == [False, True, False]
+
+
+def test_rules():
+    rules = {(rule.table, rule.column, rule.name): rule.quarantine for rule in validate.RULES}
+    assert rules[("student_info", "student_id", "id_format")]
+    assert not rules[("student_info", "professor_id", "id_format")]
+    assert not rules[("student_info", "tel", "phone_format")]
+    assert rules[("student_info", "gpax", "gpax_range")]
+    assert rules[("student_skills", "student_id", "foreign_key")]
+    assert rules[("student_education_history", "high_school_id", "foreign_key")]
+
+
+def test_quarantine_split():
+    result = validate.validate(frames())
+    assert result.tables["professor"]["professor_id"].tolist() == ["0000000001"]
+    # The phone format is only reported, the last of a repeated key is kept
+    assert result.tables["student_info"]["student_id"].tolist() == ["6400000001", "6400000002", "6400000005"]
+    assert result.tables["student_info"]["gpax"].tolist() == [3.5, 3.0, 2.75]
+    held = result.quarantine["student_info"]
+    assert held.index.tolist() == [2, 3, 4, 6]
+    # Only the rules that hold rows back are listed, the format of professor_id is reported
+    assert held["broken_rules"].tolist() == ["gpax_range:gpax", "foreign_key:professor_id", "duplicate_key:student_id",
+                                            "missing_key:student_id"]
+    # References are checked against the rows that passed, not the rows that were read
+    assert result.tables["student_skills"]["student_id"].tolist() == ["6400000001", "6400000002"]
+    assert result.quarantine["student_skills"]["broken_rules"].tolist() == ["foreign_key:student_id"]
+
+
+def test_violations():
+    result = validate.validate(frames())
+    phone = result.violations[result.violations["rule"] == "phone_format"]
+    assert phone[["table", "row", "key", "value", "quarantined"]].values.tolist() == [["student_info", 1, "6400000002", "081-234", False]]
+    assert validate.summary(result)["student_info"] == {
+        "quarantined": 4,
+        "violations": {"duplicate_key": 1, "foreign_key": 1, "gpax_range": 1, "id_format": 1, "missing_key": 1, "phone_format": 1}}
+
+
+def test_clean_tables_pass_through():
+    tables = {"professor": frames()["professor"].iloc[:1], "unknown": pd.DataFrame({"a": [1]})}
+    result = validate.validate(tables)
+    assert result.violations.empty and not result.quarantine
+    assert list(result.tables) == ["professor", "unknown"]
+
+
+def test_write_report(tmp_path):
+    result = validate.validate(frames())
+    directory = validate.write_report(result, str(tmp_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["quarantine_professor.parquet", "quarantine_student_info.parquet",
+                                                               "quarantine_student_skills.parquet", "report.json", "violations.parquet"]
+    assert len(pd.read_parquet(f"{directory}/violations.parquet")) == len(result.violations)
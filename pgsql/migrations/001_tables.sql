@@ -0,0 +1,161 @@
+-- The 14 tables of the DSI CO-OP database. Tables that already exist (created by earlier
+-- versions of the pipeline with to_sql) are left as they are, 002 adds their keys.
+
+CREATE TABLE IF NOT EXISTS professor (
+    professor_id character(10),
+    professor_firstname character varying(255),
+    professor_lastname character varying(255),
+    email character varying(100),
+    CONSTRAINT professor_pkey PRIMARY KEY (professor_id)
+);
+
+CREATE TABLE IF NOT EXISTS company (
+    company_id character(10),
+    company_name character varying(255),
+    province character varying(255),
+    CONSTRAINT company_pkey PRIMARY KEY (company_id)
+);
+
+CREATE TABLE IF NOT EXISTS academy (
+    academy_id character(9),
+    institution_name character varying(255),
+    province character varying(255),
+    CONSTRAINT academy_pkey PRIMARY KEY (academy_id)
+);
+
+CREATE TABLE IF NOT EXISTS address_info (
+    address_id character(6),
+    sub_district character varying(50),
+    district character varying(50),
+    province character varying(50),
+    post_no character(5),
+    CONSTRAINT address_info_pkey PRIMARY KEY (address_id)
+);
+
+CREATE TABLE IF NOT EXISTS officer (
+    officer_id character(10),
+    offfirst_name character varying(255),
+    offlast_name character varying(255),
+    officer_email character varying(100),
+    CONSTRAINT officer_pkey PRIMARY KEY (officer_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_info (
+    student_id character(10),
+    first_name character varying(255),
+    last_name character varying(255),
+    academic_year integer,
+    tel character(10),
+    email character varying(100),
+    gpax numeric(3,2),
+    professor_id character(10),
+    CONSTRAINT student_info_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_address (
+    student_id character(10),
+    address_id character(6),
+    address character varying(255),
+    CONSTRAINT student_address_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_u_d (
+    student_id character(10),
+    u_d character varying(255),
+    CONSTRAINT student_u_d_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_emergency_contact (
+    student_id character(10),
+    first_name character varying(255),
+    last_name character varying(255),
+    address_id character(6),
+    address character varying(255),
+    relationship character varying(255),
+    workplace character varying(255),
+    tel character(10),
+    fax character(10),
+    CONSTRAINT student_emergency_contact_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_education_history (
+    student_id character(10),
+    middle_school_id character(9),
+    high_school_id character(9),
+    bachelor_university_id character(9),
+    middle_school_end_year integer,
+    high_school_end_year integer,
+    bachelor_end_year integer,
+    middle_school_gpax numeric(3,2),
+    high_school_gpax numeric(3,2),
+    bachelor_gpax numeric(3,2),
+    CONSTRAINT student_education_history_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_skills (
+    student_id character(10),
+    technical_skills character varying(255),
+    sp_muskills character varying(255),
+    other_skills character varying(255),
+    language_skills jsonb,
+    workshop jsonb,
+    work_exp jsonb,
+    award jsonb,
+    CONSTRAINT student_skills_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS cooperative_student_questionnaire (
+    student_id character(10),
+    company_id character(10),
+    rvfirst_name character varying(255),
+    rvlast_name character varying(255),
+    position character varying(255),
+    quantity_work double precision,
+    quality_work double precision,
+    acad_ability double precision,
+    ability_apply double precision,
+    prac_ability double precision,
+    judge_decision double precision,
+    organ_planning double precision,
+    commu_skills double precision,
+    foreign_cultural double precision,
+    suitability_job double precision,
+    respon_depen double precision,
+    interest_work double precision,
+    initiative double precision,
+    supervision_response double precision,
+    personality double precision,
+    interpersonal_skills double precision,
+    discipline_adapt double precision,
+    ethics_morality double precision,
+    strength character varying(255),
+    need_improvement character varying(255),
+    further_offer character(10),
+    comments character varying(255),
+    CONSTRAINT cooperative_student_questionnaire_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS student_final_project (
+    student_id character(10),
+    project_title character varying(255),
+    professor_id character(10),
+    finish_year character varying(255),
+    abstract text,
+    total_pages integer,
+    passed boolean,
+    CONSTRAINT student_final_project_pkey PRIMARY KEY (student_id)
+);
+
+CREATE TABLE IF NOT EXISTS comment (
+    comment_id character(10),
+    company_id character(10),
+    origina_benefits integer,
+    employer_create integer,
+    organiza_select integer,
+    organiza_collab integer,
+    supervision_bene integer,
+    supervision_adequate integer,
+    teacher_supervisor integer,
+    cooper_service integer,
+    CONSTRAINT comment_pkey PRIMARY KEY (comment_id)
+);
@@ -0,0 +1,81 @@
+-- Primary keys for tables that were created without them, the key and referencing ID columns
+-- in the types of 001 and the student_skills JSON columns as jsonb.
+--
+-- Tables created by to_sql have text and bigint ID columns. A foreign key needs the referencing
+-- column in the type of the key it references (003), so every column along a key is retyped.
+
+DO $$
+DECLARE
+    item text[];
+BEGIN
+    FOREACH item SLICE 1 IN ARRAY ARRAY[
+        ['professor', 'professor_id', 'character(10)'],
+        ['company', 'company_id', 'character(10)'],
+        ['academy', 'academy_id', 'character(9)'],
+        ['address_info', 'address_id', 'character(6)'],
+        ['student_info', 'student_id', 'character(10)'],
+        ['student_info', 'professor_id', 'character(10)'],
+        ['student_address', 'student_id', 'character(10)'],
+        ['student_address', 'address_id', 'character(6)'],
+        ['student_u_d', 'student_id', 'character(10)'],
+        ['student_emergency_contact', 'student_id', 'character(10)'],
+        ['student_emergency_contact', 'address_id', 'character(6)'],
+        ['student_education_history', 'student_id', 'character(10)'],
+        ['student_education_history', 'middle_school_id', 'character(9)'],
+        ['student_education_history', 'high_school_id', 'character(9)'],
+        ['student_education_history', 'bachelor_university_id', 'character(9)'],
+        ['student_skills', 'student_id', 'character(10)'],
+        ['cooperative_student_questionnaire', 'student_id', 'character(10)'],
+        ['cooperative_student_questionnaire', 'company_id', 'character(10)'],
+        ['student_final_project', 'student_id', 'character(10)'],
+        ['student_final_project', 'professor_id', 'character(10)'],
+        ['comment', 'company_id', 'character(10)']
+    ] LOOP
+        IF EXISTS (SELECT 1 FROM pg_attribute
+                   WHERE attrelid = format('public.%I', item[1])::regclass AND attname = item[2]
+                     AND NOT attisdropped AND format_type(atttypid, atttypmod) <> item[3]) THEN
+            EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE %s USING %I::text::%s',
+                           item[1], item[2], item[3], item[2], item[3]);
+        END IF;
+    END LOOP;
+END $$;
+
+DO $$
+DECLARE
+    col text;
+BEGIN
+    FOREACH col IN ARRAY ARRAY['language_skills', 'workshop', 'work_exp', 'award'] LOOP
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = 'public' AND table_name = 'student_skills'
+                     AND column_name = col AND data_type = 'json') THEN
+            EXECUTE format('ALTER TABLE student_skills ALTER COLUMN %I TYPE jsonb USING %I::jsonb', col, col);
+        END IF;
+    END LOOP;
+END $$;
+
+DO $$
+DECLARE
+    item text[];
+BEGIN
+    FOREACH item SLICE 1 IN ARRAY ARRAY[
+        ['professor', 'professor_id'],
+        ['company', 'company_id'],
+        ['academy', 'academy_id'],
+        ['address_info', 'address_id'],
+        ['officer', 'officer_id'],
+        ['student_info', 'student_id'],
+        ['student_address', 'student_id'],
+        ['student_u_d', 'student_id'],
+        ['student_emergency_contact', 'student_id'],
+        ['student_education_history', 'student_id'],
+        ['student_skills', 'student_id'],
+        ['cooperative_student_questionnaire', 'student_id'],
+        ['student_final_project', 'student_id'],
+        ['comment', 'comment_id']
+    ] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                       WHERE conrelid = format('public.%I', item[1])::regclass AND contype = 'p') THEN
+            EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I PRIMARY KEY (%I)', item[1], item[1] || '_pkey', item[2]);
+        END IF;
+    END LOOP;
+END $$;
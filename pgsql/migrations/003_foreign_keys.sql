@@ -0,0 +1,39 @@
+-- Foreign keys along the join paths of the dashboard. They are checked at commit
+-- (DEFERRABLE INITIALLY DEFERRED) because the loader replaces changed rows with a delete and an
+-- insert in one transaction. Rows that already break a key are left alone: the key is added
+-- NOT VALID, so it holds for new rows, and validated only when the existing rows allow it.
+
+DO $$
+DECLARE
+    item text[];
+BEGIN
+    FOREACH item SLICE 1 IN ARRAY ARRAY[
+        ['student_info', 'professor_id', 'professor', 'professor_id', 'student_info_professor_id_fkey'],
+        ['student_address', 'student_id', 'student_info', 'student_id', 'student_address_student_id_fkey'],
+        ['student_address', 'address_id', 'address_info', 'address_id', 'student_address_address_id_fkey'],
+        ['student_u_d', 'student_id', 'student_info', 'student_id', 'student_u_d_student_id_fkey'],
+        ['student_emergency_contact', 'student_id', 'student_info', 'student_id', 'student_emergency_contact_student_id_fkey'],
+        ['student_emergency_contact', 'address_id', 'address_info', 'address_id', 'student_emergency_contact_address_id_fkey'],
+        ['student_education_history', 'student_id', 'student_info', 'student_id', 'student_education_history_student_id_fkey'],
+        ['student_education_history', 'middle_school_id', 'academy', 'academy_id', 'student_education_history_middle_school_id_fkey'],
+        ['student_education_history', 'high_school_id', 'academy', 'academy_id', 'student_education_history_high_school_id_fkey'],
+        ['student_education_history', 'bachelor_university_id', 'academy', 'academy_id', 'student_education_history_bachelor_university_id_fkey'],
+        ['student_skills', 'student_id', 'student_info', 'student_id', 'student_skills_student_id_fkey'],
+        ['cooperative_student_questionnaire', 'student_id', 'student_info', 'student_id', 'cooperative_student_questionnaire_student_id_fkey'],
+        ['cooperative_student_questionnaire', 'company_id', 'company', 'company_id', 'cooperative_student_questionnaire_company_id_fkey'],
+        ['student_final_project', 'student_id', 'student_info', 'student_id', 'student_final_project_student_id_fkey'],
+        ['student_final_project', 'professor_id', 'professor', 'professor_id', 'student_final_project_professor_id_fkey'],
+        ['comment', 'company_id', 'company', 'company_id', 'comment_company_id_fkey']
+    ] LOOP
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                       WHERE conrelid = format('public.%I', item[1])::regclass AND conname = item[5]) THEN
+            EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (%I) REFERENCES %I (%I) DEFERRABLE INITIALLY DEFERRED NOT VALID',
+                           item[1], item[5], item[2], item[3], item[4]);
+        END IF;
+        BEGIN
+            EXECUTE format('ALTER TABLE %I VALIDATE CONSTRAINT %I', item[1], item[5]);
+        EXCEPTION WHEN foreign_key_violation THEN
+            RAISE NOTICE '% has rows that break %, the key only holds for new rows', item[1], item[5];
+        END;
+    END LOOP;
+END $$;
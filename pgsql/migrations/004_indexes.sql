@@ -0,0 +1,19 @@
+-- Indexes on the foreign key columns, so the joins of the dashboard (All Data, Visualization,
+-- the skills search) and deletes of referenced rows do not scan the referencing tables, and
+-- GIN indexes for containment (@>) searches in the student_skills JSON columns.
+
+CREATE INDEX IF NOT EXISTS student_info_professor_id_idx ON student_info (professor_id);
+CREATE INDEX IF NOT EXISTS student_address_address_id_idx ON student_address (address_id);
+CREATE INDEX IF NOT EXISTS student_emergency_contact_address_id_idx ON student_emergency_contact (address_id);
+CREATE INDEX IF NOT EXISTS student_education_history_middle_school_id_idx ON student_education_history (middle_school_id);
+CREATE INDEX IF NOT EXISTS student_education_history_high_school_id_idx ON student_education_history (high_school_id);
+CREATE INDEX IF NOT EXISTS student_education_history_bachelor_university_id_idx ON student_education_history (bachelor_university_id);
+CREATE INDEX IF NOT EXISTS cooperative_student_questionnaire_company_id_idx ON cooperative_student_questionnaire (company_id);
+CREATE INDEX IF NOT EXISTS student_final_project_professor_id_idx ON student_final_project (professor_id);
+CREATE INDEX IF NOT EXISTS student_final_project_finish_year_idx ON student_final_project (finish_year);
+CREATE INDEX IF NOT EXISTS comment_company_id_idx ON comment (company_id);
+
+CREATE INDEX IF NOT EXISTS student_skills_language_skills_gin ON student_skills USING gin (language_skills jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS student_skills_workshop_gin ON student_skills USING gin (workshop jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS student_skills_work_exp_gin ON student_skills USING gin (work_exp jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS student_skills_award_gin ON student_skills USING gin (award jsonb_path_ops);
@@ -0,0 +1,54 @@
+-- Indexes for the global search of the dashboard (streamlit/search.py) over student names,
+-- emails and IDs, company names, professor names and emails and institution names.
+--
+-- search_text() is the normal form both the indexed columns and the search terms go through:
+-- lower case, emails split at the @, Thai digits as Arabic ones, zero-width characters and
+-- soft hyphens removed, the Thai spellings that look the same typed one way (sara am as
+-- nikhahit + sara aa, a tone mark typed before the upper vowel, a doubled tone mark) and the
+-- common prefixes of institutions, companies and academic titles split off the word they are
+-- written against, since Thai has no spaces between words. It is IMMUTABLE so that expression
+-- indexes can use it.
+
+CREATE OR REPLACE FUNCTION search_text(VARIADIC parts text[]) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT btrim(regexp_replace(regexp_replace(regexp_replace(regexp_replace(regexp_replace(
+        translate(lower(array_to_string(parts, ' ')), U&'@\0E50\0E51\0E52\0E53\0E54\0E55\0E56\0E57\0E58\0E59\200B\200C\200D\2060\FEFF\00AD', ' 0123456789'),
+        '\u0E4D\u0E32', U&'\0E33', 'g'),
+        '([\u0E48-\u0E4B])([\u0E31\u0E34-\u0E37\u0E47])', '\2\1', 'g'),
+        '([\u0E48-\u0E4C])\1+', '\1', 'g'),
+        '(ผู้ช่วยศาสตราจารย์|รองศาสตราจารย์|ศาสตราจารย์|อาจารย์|มหาวิทยาลัย|วิทยาลัย|โรงเรียน|บริษัท)', '\1 ', 'g'),
+        '[[:space:]]+', ' ', 'g'))
+$$;
+
+-- Full-text indexes, the search looks words up by prefix. The 'simple' configuration keeps
+-- every word as it is, without stemming or stop words.
+CREATE INDEX IF NOT EXISTS student_info_search_fts ON student_info
+    USING gin (to_tsvector('simple', search_text(student_id::text, first_name::text, last_name::text, email::text)));
+CREATE INDEX IF NOT EXISTS company_search_fts ON company
+    USING gin (to_tsvector('simple', search_text(company_name::text)));
+CREATE INDEX IF NOT EXISTS professor_search_fts ON professor
+    USING gin (to_tsvector('simple', search_text(professor_firstname::text, professor_lastname::text, email::text)));
+CREATE INDEX IF NOT EXISTS academy_search_fts ON academy
+    USING gin (to_tsvector('simple', search_text(institution_name::text)));
+
+-- Trigram indexes find a term anywhere inside a word, which a Thai name written without spaces
+-- needs. pg_trgm ships with the contrib package, the search gets by with prefixes when the
+-- extension cannot be installed here.
+DO $$
+BEGIN
+    BEGIN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXCEPTION WHEN undefined_file OR insufficient_privilege OR feature_not_supported THEN
+        RAISE NOTICE 'pg_trgm is not available, the search uses the full-text indexes only';
+    END;
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS student_info_search_trgm ON student_info
+            USING gin (search_text(student_id::text, first_name::text, last_name::text, email::text) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS company_search_trgm ON company
+            USING gin (search_text(company_name::text) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS professor_search_trgm ON professor
+            USING gin (search_text(professor_firstname::text, professor_lastname::text, email::text) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS academy_search_trgm ON academy
+            USING gin (search_text(institution_name::text) gin_trgm_ops);
+    END IF;
+END $$;
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import pyarrow.parquet as pq
+import streamlit as st
+
+import exports
+import frames
+import instrumentation
+
+# DuckDB is optional, without it the analytics mode is not offered
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# What a query in analytics mode can raise besides the errors of the Postgres export
+ERRORS = (ValueError, duckdb.Error) if duckdb is not None else (ValueError,)
+
+# Analytics mode runs ad-hoc SQL on DuckDB copies of the tables instead of on Postgres. Every
+# table is exported once per signature (see snapshots.py) as a Parquet file under ANALYTICS_DIR,
+# which other app processes and restarts reuse, and loaded into an in-memory DuckDB database.
+# Changed tables are exported again before the next query runs on them.
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".analytics"))
+
+# Queries can read the loaded tables only: no files, no Python objects, no settings changes
+LOCKDOWN = """SET enable_external_access = false;
+              SET python_enable_replacements = false;
+              SET lock_configuration = true;"""
+
+
+def available():
+    return duckdb is not None
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _snapshot_name(table_name, signature):
+    digest = hashlib.md5(json.dumps(signature).encode("utf-8")).hexdigest()[:16]
+    return f"{table_name}-{digest}.parquet"
+
+
+def snapshot_file(table_name, signature, directory=ANALYTICS_DIR):
+    # The Parquet export of a table at a signature, made when it does not exist yet. Files of
+    # older signatures of the table are removed.
+    os.makedirs(directory, exist_ok=True)
+    name = _snapshot_name(table_name, signature)
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with exports.export(exports.table_query(table_name), "Parquet") as data, open(partial, "wb") as file:
+            shutil.copyfileobj(data, file, exports.BLOCK_SIZE)
+        os.replace(partial, path)
+    pattern = re.compile(re.escape(table_name) + r"-[0-9a-f]{16}\.parquet")
+    for other in os.listdir(directory):
+        if other != name and pattern.fullmatch(other):
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+    return path
+
+
+class Engine:
+    def __init__(self, directory=ANALYTICS_DIR):
+        self.directory = directory
+        self.conn = duckdb.connect(":memory:")
+        self.conn.execute(LOCKDOWN)
+        # Signature of every loaded table, by name
+        self.versions = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, signatures, tables=None):
+        # Load the tables (all by default) whose signature moved on and drop the ones that are gone.
+        # Returns the names of the tables that were loaded.
+        loaded = []
+        with self._lock:
+            for table_name, signature in sorted(signatures.items()):
+                if tables is not None and table_name not in tables or self.versions.get(table_name) == signature:
+                    continue
+                table = pq.read_table(snapshot_file(table_name, signature, self.directory))
+                self.conn.register("snapshot", table)
+                try:
+                    self.conn.execute(f"CREATE OR REPLACE TABLE {_quote(table_name)} AS SELECT * FROM snapshot;")
+                finally:
+                    self.conn.unregister("snapshot")
+                self.versions[table_name] = signature
+                loaded.append(table_name)
+            for table_name in set(self.versions) - set(signatures):
+                self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)};")
+                del self.versions[table_name]
+        return loaded
+
+    def cursor(self):
+        # A connection of its own for each query, queries run in parallel with each other and with refresh
+        return self.conn.cursor()
+
+
+@st.cache_resource
+def get_engine():
+    # One DuckDB database for the whole Streamlit process
+    return Engine()
+
+
+def check_query(cursor, query):
+    # A single SELECT (or WITH, VALUES, TABLE, ...) statement, anything else is refused
+    statements = cursor.extract_statements(query)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Analytics mode runs a single read-only query (SELECT, WITH, VALUES or TABLE).")
+
+
+def run(cursor, query, row_cap):
+    # Returns (DataFrame of up to row_cap rows, whether there were more)
+    parts = exports.statements(query)
+    if len(parts) != 1:
+        raise ValueError("Analytics mode runs a single read-only query (SELECT, WITH, VALUES or TABLE).")
+    query = parts[0]
+    check_query(cursor, query)
+    event = instrumentation.start_query(query)
+    event["source"] = "analytics (DuckDB)"
+    started = time.perf_counter()
+    try:
+        # The newline ends a -- comment at the end of the query
+        frame = cursor.execute(f"SELECT * FROM ({query}\n) AS analytics_query LIMIT {int(row_cap) + 1};").df()
+    except Exception as e:
+        event["error"] = type(e).__name__
+        raise
+    finally:
+        event["seconds"] = time.perf_counter() - started
+    truncated = len(frame) > row_cap
+    frame = frame.iloc[:row_cap]
+    event["rows"] = len(frame)
+    sample = frame.iloc[::max(1, len(frame) // instrumentation.SAMPLE_ROWS)]
+    event["bytes"] = int(instrumentation.estimate_bytes(sample.values.tolist()) * len(frame) / max(len(sample), 1))
+    return frames.compact(frame), truncated
+
+
+def show_toggle(key="analytics_mode"):
+    # Off by default and not offered without DuckDB
+    if not available():
+        return False
+    return st.toggle("Analytics mode", key=key,
+                     help="Run the custom query and the join on DuckDB copies of the tables instead of on Postgres. "
+                          "The copies are refreshed when a table changes, a few seconds after its writes commit.")
@@ -1,14 +1,29 @@
+import importlib
+
 import streamlit as st
-import pandas as pd
-import psycopg2
-import toml
 from streamlit_option_menu import option_menu
-import about as about
-import visualization as visualization
-import allData as all_data
-import masterData as master_data
-import tranData as tran_data
-import refData as ref_data
+
+import instrumentation
+
+# Page modules are imported the first time their page is opened, so pandas, psycopg2,
+# pyarrow and plotly are not loaded until a page needs them (see import_times.py)
+DATA_PAGES = {
+    "All Data": "allData",
+    "Master Data": "masterData",
+    "Transaction Activity Data": "tranData",
+    "Reference Data": "refData",
+}
+PAGES = {
+    "Visualization": "visualization",
+    "Questionnaires": "questionnaires",
+    "Performance": "performance",
+    "About": "about",
+}
+
+def show_page(label, module_name, function="app", *args):
+    # Queries are attributed to the page that ran them, see the Performance page
+    with instrumentation.page(label):
+        getattr(importlib.import_module(module_name), function)(*args)
 
 st.set_page_config(
     page_title="Your App Name",
@@ -16,23 +31,25 @@ st.set_page_config(
 
 selected = option_menu(
     menu_title=None,
-    options=["Data", "Visualization", "About"],
-    icons=["database", "bar-chart", "people-fill"],
+    options=["Data", "Visualization", "Questionnaires", "Performance", "About"],
+    icons=["database", "bar-chart", "clipboard-data", "speedometer2", "people-fill"],
     default_index=0,
     orientation="horizontal"
 )
 
+# Global search over students, professors, companies and institutions, shown above the page
+terms = st.sidebar.text_input("Search", placeholder="Name, email, ID, company or school",
+                              help="Thai or English, matches words starting with the terms")
+if terms.strip():
+    with st.expander("Search results", expanded=True):
+        show_page("Search", "search", "show_results", terms)
+
 if selected == "Data":
-    data_option = st.selectbox("Select the types of data you want to explore.", ["All Data", "Master Data", "Transaction Activity Data", "Reference Data"])
-    if data_option == "All Data":
-        all_data.app()
-    elif data_option == "Master Data":
-        master_data.app()
-    elif data_option == "Transaction Activity Data":
-        tran_data.app()
-    elif data_option == "Reference Data":
-        ref_data.app()
-elif selected == "Visualization":
-    visualization.app()
-elif selected == "About":
-    about.app()
\ No newline at end of file
+    data_option = st.selectbox("Select the types of data you want to explore.", list(DATA_PAGES))
+    show_page(data_option, DATA_PAGES[data_option])
+else:
+    show_page(selected, PAGES[selected])
+
+# What the session keeps in memory between reruns, see the Performance page. The pages have
+# loaded pandas by now.
+importlib.import_module("frames").track_session()
@@ -0,0 +1,306 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Times the dashboard's data paths and the ETL stages on synthetic data at several scales and
+# writes the results to a JSON file per run, to compare against the run of another commit.
+# The tables of the benchmark database are replaced, point --secrets at a database of its own:
+#   python benchmark.py --secrets bench_secrets.toml [--scales 1 100 1000] [--repeat 3]
+#   python benchmark.py --compare benchmarks/OLD.json benchmarks/NEW.json
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "notebooks"))
+
+BENCHMARK_DIR = os.environ.get("BENCHMARK_DIR", os.path.join(HERE, "benchmarks"))
+DEFAULT_SCALES = [1, 100, 1000]
+DEFAULT_REPEAT = 3
+
+# A case is reported as slower or faster when its median moved by more than this factor
+THRESHOLD = 1.2
+
+# Joins of the All Data page, each run with the page's row limit and exported whole as CSV
+JOIN_CASES = [
+    ["student_info", "professor"],
+    ["student_info", "student_address", "address_info"],
+    ["student_education_history", "academy"],
+    ["company", "cooperative_student_questionnaire"],
+    ["student_info", "student_skills", "student_final_project"],
+]
+
+# Tables exported in every download format, the widest one and the one with JSON columns
+EXPORT_TABLES = ["cooperative_student_questionnaire", "student_skills"]
+
+
+def measure(run, repeat):
+    # Wall time of repeat runs, then one more run under tracemalloc for the peak of Python
+    # allocations (numpy and pandas buffers included, Arrow and libpq buffers are not)
+    seconds = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        result = run()
+        seconds.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dict(size(result), seconds=[round(value, 6) for value in seconds], median=round(statistics.median(seconds), 6),
+                min=round(min(seconds), 6), peak_mb=round(peak / 2 ** 20, 3))
+
+
+def size(result):
+    # Rows of a DataFrame (and the memory it holds) or of a dict of them, counts that a case
+    # reports itself as they are
+    if hasattr(result, "columns"):
+        return {"rows": len(result), "frame_mb": round(result.memory_usage(deep=True).sum() / 2 ** 20, 3)}
+    if isinstance(result, dict) and all(isinstance(value, int) for value in result.values()):
+        return result
+    if isinstance(result, dict):
+        return {"rows": sum(len(frame) for frame in result.values() if hasattr(frame, "columns"))}
+    return {}
+
+
+def _export_size(query, download_format):
+    import exports
+
+    with exports.export(query, download_format) as out:
+        out.seek(0, os.SEEK_END)
+        return {"bytes": out.tell()}
+
+
+def dashboard_cases():
+    # (group, name, run) for the queries the pages issue, uncached: the st.cache_data functions are
+    # called through __wrapped__ so every run reaches Postgres
+    import cube
+    import database
+    import exports
+    import joins
+    import pagination
+    import rollups
+    import search
+    import snapshots
+
+    cases = [("pages", "table catalog", snapshots.table_catalog.__wrapped__)]
+    signatures = snapshots.table_signatures()
+    for table_name in snapshots.table_catalog()["table_name"]:
+        columns, key_columns = pagination.table_layout.__wrapped__(table_name)
+        key_columns = tuple(key_columns) or (pagination.CTID_KEY,)
+        sortable = [row.column_name for row in columns.itertuples()
+                    if row.data_type not in pagination.UNSORTABLE_TYPES and row.column_name not in key_columns]
+        signature = signatures.get(table_name)
+        cases.append(("pages", f"first page: {table_name}", lambda table_name=table_name, signature=signature, key_columns=key_columns:
+                      pagination.fetch_page.__wrapped__(table_name, signature, key_columns, 50, None, False, (), None)))
+        if sortable:
+            cases.append(("pages", f"sorted page: {table_name}.{sortable[-1]}", lambda table_name=table_name, signature=signature, key_columns=key_columns, column=sortable[-1]:
+                          pagination.fetch_page.__wrapped__(table_name, signature, key_columns, 50, column, True, (), None)))
+        # Show Info reads the whole table
+        cases.append(("pages", f"show info: {table_name}", lambda table_name=table_name, signature=signature:
+                      snapshots._snapshot.__wrapped__(table_name, signature)))
+
+    columns, relationships = joins.load_schema()
+    cases.append(("joins", "load schema", joins.load_schema.__wrapped__))
+    for tables in JOIN_CASES:
+        steps, _ = joins.plan_join(tables, relationships)
+        query = joins.build_join_query(steps, tables, columns)
+        join_sql = joins.query_text(query)
+        cases.append(("joins", " + ".join(tables), lambda join_sql=join_sql: joins.run_join(join_sql, joins.DEFAULT_ROW_LIMIT)))
+        cases.append(("exports", "CSV: " + " + ".join(tables), lambda query=query: _export_size(query, "CSV")))
+
+    for table_name in EXPORT_TABLES:
+        for download_format in exports.FORMATS:
+            cases.append(("exports", f"{download_format}: {table_name}", lambda table_name=table_name, download_format=download_format:
+                          _export_size(exports.table_query(table_name), download_format)))
+
+    # A new stamp makes every run refresh the rollup. The reads go through the cached maintenance
+    # check, which has run once for the current signature by then.
+    signature = rollups.source_signature()
+    cases.append(("visualization", "rollup refresh", lambda: rollups._ensure_rollup.__wrapped__(("benchmark", time.time_ns()))))
+    cases.append(("visualization", "rollup query", lambda: database.read_sql(rollups.ROLLUP_QUERY)))
+    years = rollups.finish_years.__wrapped__(signature)
+    year = years[0] if years else None
+    cases.append(("visualization", "finish years", lambda: rollups.finish_years.__wrapped__(signature)))
+    cases.append(("visualization", "interns per company", lambda: rollups.interns_per_company.__wrapped__(signature, year)))
+
+    # The questionnaire cube the same way, then drill-downs from the top and the profile of all ratings
+    signature = cube.source_signature()
+    cube._source(signature)
+    cases.append(("questionnaires", "cube refresh", lambda: cube._ensure_cube.__wrapped__(("benchmark", time.time_ns()))))
+    for dimension in cube.DIMENSIONS:
+        cases.append(("questionnaires", f"breakdown: {dimension}", lambda dimension=dimension: cube.breakdown.__wrapped__(signature, (), dimension)))
+    cases.append(("questionnaires", "profile", lambda: cube.profile.__wrapped__(signature, ())))
+
+    # The global search by a whole name, a two-letter prefix, a student ID and an email
+    signature = search.source_signature()
+    student = database.read_sql("SELECT student_id, first_name, email FROM student_info ORDER BY student_id LIMIT 1;")
+    for name, column, length in [("name", "first_name", None), ("prefix", "first_name", 2), ("student id", "student_id", None), ("email", "email", None)]:
+        terms = str(student.at[0, column])[:length] if len(student) else "benchmark"
+        cases.append(("search", name, lambda terms=terms: search.search.__wrapped__(signature, terms)))
+    return cases
+
+
+def etl_cases(tables, work_dir):
+    # (group, name, run) for the stages of pipeline.ipynb on the generated data turned back into
+    # sheets and form responses, read from CSV files the way downloads are
+    from etl import extract, load, synthetic, transform, validate
+    from etl.institutions import Institutions
+    from etl.schema import TABLES
+
+    paths = {}
+    for name, frame in dict(synthetic.sheets(tables), form=synthetic.form_responses(tables)).items():
+        paths[name] = os.path.join(work_dir, name + ".csv")
+        frame.to_csv(paths[name], index=False)
+    sheets, form = extract.read_downloads(paths)
+    frames = transform.transform(sheets, form, {}, Institutions(sheets["academy"]))
+    checked = validate.validate(frames).tables
+
+    def read():
+        sheets, form = extract.read_downloads(paths)
+        return dict(sheets, form=form)
+
+    def load_tables(full):
+        conn = load.connect()
+        try:
+            report = load.load_incremental(conn, TABLES, checked, full=full)
+            return {"rows written": sum(counts["new"] + counts["changed"] for counts in report.values())}
+        finally:
+            conn.close()
+
+    return [
+        ("etl", "extract", read),
+        ("etl", "transform", lambda: transform.transform(sheets, form, {}, Institutions(sheets["academy"]))),
+        ("etl", "validate", lambda: validate.validate(frames).tables),
+        ("etl", "load (every row)", lambda: load_tables(True)),
+        ("etl", "load (nothing changed)", lambda: load_tables(False)),
+    ]
+
+
+def run_scale(scale, seed, repeat, groups):
+    import snapshots
+    from etl import load, synthetic
+
+    started = time.perf_counter()
+    frames = list(synthetic.generate(scale, seed))
+    conn = load.connect()
+    try:
+        synthetic.load_tables(conn, frames)
+    finally:
+        conn.close()
+    tables = synthetic.collect(frames)
+    del frames
+    results = {"students": len(tables["student_info"]), "rows": sum(len(frame) for frame in tables.values()),
+               "setup_seconds": round(time.perf_counter() - started, 3), "cases": {}}
+    # The tables were replaced, forget the cached signatures and catalog
+    snapshots.table_signatures.clear()
+    snapshots.view_signatures.clear()
+    snapshots.table_catalog.clear()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        cases = []
+        if "dashboard" in groups:
+            cases += dashboard_cases()
+        if "etl" in groups:
+            cases += etl_cases(tables, work_dir)
+        for group, name, run in cases:
+            result = measure(run, repeat)
+            results["cases"][f"{group}/{name}"] = result
+            print(f"{scale:>8g} {group + '/' + name:<70}{result['median']:>10.3f}s{result['peak_mb']:>10.1f} MB", flush=True)
+    return results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, cwd=HERE, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _server_version():
+    import database
+
+    return database.read_sql("SHOW server_version;").iloc[0, 0]
+
+
+def benchmark(args):
+    import streamlit.logger
+
+    import database
+
+    # The dashboard and the ETL both connect to the benchmark database
+    database.SECRETS_PATH = args.secrets
+    settings = database.load_settings()
+    os.environ.update(PGHOST=str(settings["host"]), PGPORT=str(settings["port"]), PGDATABASE=str(settings["dbname"]),
+                      PGUSER=str(settings["user"]), PGPASSWORD=str(settings["password"]))
+    # Streamlit warns about the missing runtime on every cached function outside `streamlit run`
+    streamlit.logger.set_log_level("error")
+
+    commit = _git("rev-parse", "HEAD")
+    results = {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "postgres": _server_version(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "scales": {},
+    }
+    for scale in args.scales:
+        results["scales"][f"{scale:g}"] = run_scale(scale, args.seed, args.repeat, args.groups)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    path = os.path.join(args.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{(commit or 'unknown')[:10]}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=1)
+    print(f"results written to {path}")
+
+
+def compare(old_path, new_path, threshold=THRESHOLD):
+    # Median of every case in both runs, returns the number of cases that got slower
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)
+    print(f"{'scale':>8} {'case':<70}{'old':>10}{'new':>10}{'ratio':>8}")
+    slower = 0
+    for scale, results in new["scales"].items():
+        for name, result in results["cases"].items():
+            before = old["scales"].get(scale, {}).get("cases", {}).get(name)
+            if before is None:
+                continue
+            ratio = result["median"] / before["median"] if before["median"] else float("inf")
+            flag = "  slower" if ratio > threshold else "  faster" if ratio < 1 / threshold else ""
+            slower += ratio > threshold
+            print(f"{scale:>8} {name:<70}{before['median']:>10.3f}{result['median']:>10.3f}{ratio:>8.2f}{flag}")
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard queries and the ETL stages on synthetic data.")
+    parser.add_argument("--secrets", help="secrets.toml of the benchmark database, its tables are replaced")
+    parser.add_argument("--scales", type=float, nargs="+", default=DEFAULT_SCALES, help=f"data sizes as multiples of pgsql/data (default: {DEFAULT_SCALES})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help=f"timed runs per case (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument("--groups", nargs="+", choices=["dashboard", "etl"], default=["dashboard", "etl"], help="what to benchmark")
+    parser.add_argument("--out-dir", default=BENCHMARK_DIR, help="where to write the results (default: streamlit/benchmarks)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    if not args.secrets:
+        parser.error("--secrets is required to run the benchmarks")
+    benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
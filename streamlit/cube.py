@@ -0,0 +1,201 @@
+from collections import namedtuple
+
+import pandas as pd
+from psycopg2 import sql
+
+import database
+import instrumentation
+import rollups
+import snapshots
+
+# Counts, sums and score distributions of the 18 ratings of cooperative_student_questionnaire,
+# pre-aggregated over company, finish year, professor and province in a materialized view. A
+# drill-down reads one grouping set of the cube through its key instead of joining the
+# questionnaires. The view is maintained like the interns_per_company rollup.
+CUBE_NAME = "questionnaire_cube"
+SOURCE_TABLES = ("cooperative_student_questionnaire", "company", "student_final_project", "student_info", "professor")
+
+# Rating columns with their labels, in questionnaire order
+RATINGS = {
+    "quantity_work": "Quantity of work",
+    "quality_work": "Quality of work",
+    "acad_ability": "Academic ability",
+    "ability_apply": "Ability to apply knowledge",
+    "prac_ability": "Practical ability",
+    "judge_decision": "Judgement and decision making",
+    "organ_planning": "Organisation and planning",
+    "commu_skills": "Communication skills",
+    "foreign_cultural": "Foreign language and culture",
+    "suitability_job": "Suitability for the job",
+    "respon_depen": "Responsibility and dependability",
+    "interest_work": "Interest in the work",
+    "initiative": "Initiative",
+    "supervision_response": "Response to supervision",
+    "personality": "Personality",
+    "interpersonal_skills": "Interpersonal skills",
+    "discipline_adapt": "Discipline and adaptability",
+    "ethics_morality": "Ethics and morality",
+}
+SCORES = range(1, 6)
+
+# A dimension is grouped by its key column, the label column comes along. The province of a
+# company is the company's, so grouping by company also groups by province.
+Dimension = namedtuple("Dimension", ["name", "label", "key", "label_column", "expression", "label_expression"])
+
+DIMENSIONS = {
+    dimension.name: dimension for dimension in [
+        Dimension("province", "Province", "province", "province", "cc.province", "cc.province"),
+        Dimension("company", "Company", "company_id", "company_name", "c.company_id", "cc.company_name"),
+        Dimension("finish_year", "Finish year", "finish_year", "finish_year", "s.finish_year", "s.finish_year"),
+        Dimension("professor", "Professor", "professor_id", "professor_name", "si.professor_id",
+                  "concat_ws(' ', p.professor_firstname, p.professor_lastname)"),
+    ]
+}
+
+# The grouping sets kept in the cube: places down to the company and professors, each also by
+# finish year. Companies by professor are left out, they are close to one row per student.
+GROUPING_SETS = [
+    frozenset(dimensions) for places in [(), ("province",), ("province", "company"), ("professor",)]
+    for dimensions in [places, places + ("finish_year",)]
+]
+
+CUBE_KEY = ("rolled_up",) + tuple(dimension.key for dimension in DIMENSIONS.values())
+
+
+def _grouping_set(dimensions):
+    # The key and label expressions of a grouping set, for GROUP BY GROUPING SETS
+    columns = []
+    for dimension in DIMENSIONS.values():
+        if dimension.name in dimensions:
+            columns.append(dimension.expression)
+            if dimension.label_expression != dimension.expression:
+                columns.append(dimension.label_expression)
+    return "(" + ", ".join(columns) + ")"
+
+
+def rolled_up(dimensions):
+    # GROUPING() of the dimension keys: one bit per dimension left out, the first one highest
+    return sum(1 << position for position, name in enumerate(reversed(list(DIMENSIONS))) if name not in dimensions)
+
+
+def _cube_query():
+    keys = ", ".join(dimension.expression for dimension in DIMENSIONS.values())
+    dimensions = ", ".join(
+        f"{dimension.expression} AS {dimension.key}" + (
+            f", {dimension.label_expression} AS {dimension.label_column}" if dimension.label_column != dimension.key else "")
+        for dimension in DIMENSIONS.values())
+    # A score is counted when it rounds to 1-5, 0 stands for a rating that was left empty
+    measures = ",\n".join(
+        f"sum(c.{rating}) FILTER (WHERE round(c.{rating}) BETWEEN 1 AND 5) AS {rating}_sum,\n" +
+        ",\n".join(f"(count(*) FILTER (WHERE round(c.{rating}) = {score}))::integer AS {rating}_{score}" for score in SCORES)
+        for rating in RATINGS)
+    return f"""SELECT GROUPING({keys}) AS rolled_up,
+                      {dimensions},
+                      count(*)::integer AS responses,
+                      {measures}
+               FROM cooperative_student_questionnaire AS c
+               INNER JOIN company AS cc ON cc.company_id = c.company_id
+               LEFT JOIN student_final_project AS s ON s.student_id = c.student_id
+               LEFT JOIN student_info AS si ON si.student_id = c.student_id
+               LEFT JOIN professor AS p ON p.professor_id = si.professor_id
+               GROUP BY GROUPING SETS ({", ".join(_grouping_set(dimensions) for dimensions in GROUPING_SETS)})"""
+
+
+CUBE_QUERY = _cube_query()
+
+
+def source_signature():
+    # Signatures of the tables behind the cube, it is refreshed only when one of them changes
+    signatures = snapshots.table_signatures()
+    return tuple(signatures.get(table) for table in SOURCE_TABLES)
+
+
+@instrumentation.cache_resource(max_entries=16, show_spinner=False)
+def _ensure_cube(signature, view_signature=None):
+    # Keyed by the view's signature too, as rollups._ensure_rollup
+    return rollups.maintain(CUBE_NAME, CUBE_QUERY, CUBE_KEY, signature)
+
+
+def _source(signature):
+    if _ensure_cube(signature, snapshots.view_signatures().get(CUBE_NAME)):
+        return sql.Identifier(CUBE_NAME)
+    return sql.SQL("({}) AS cube").format(sql.SQL(CUBE_QUERY))
+
+
+def grouping(dimensions):
+    # The dimensions as they are grouped in the cube, None when the cube does not keep them together
+    dimensions = set(dimensions) | ({"province"} if "company" in dimensions else set())
+    return frozenset(dimensions) if frozenset(dimensions) in GROUPING_SETS else None
+
+
+def _grouping_of(dimensions):
+    # grouping() for a query, the page only offers the combinations the cube keeps
+    unknown = set(dimensions) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown dimension: {', '.join(sorted(unknown))}.")
+    grouped = grouping(dimensions)
+    if grouped is None:
+        raise ValueError(f"The questionnaire cube does not break down by {' and '.join(sorted(dimensions))} together.")
+    return grouped
+
+
+def _cell(dimensions, filters):
+    # Conditions selecting one grouping set and the filtered values. Rolled up keys are NULL, with
+    # IS NULL conditions on them the whole key is used.
+    conditions = [sql.SQL("rolled_up = %s")]
+    params = [rolled_up(dimensions)]
+    for dimension in DIMENSIONS.values():
+        column = sql.Identifier(dimension.key)
+        if dimension.name not in dimensions or dimension.name in filters and filters[dimension.name] is None:
+            conditions.append(sql.SQL("{} IS NULL").format(column))
+        elif dimension.name in filters:
+            conditions.append(sql.SQL("{} = %s").format(column))
+            params.append(filters[dimension.name])
+    return sql.SQL(" AND ").join(conditions), params
+
+
+def _measures(ratings):
+    # Responses, rated answers, mean and distribution of one rating or of several added together
+    def total(suffix):
+        return sql.SQL(" + ").join(sql.SQL("COALESCE({}, 0)").format(sql.Identifier(f"{rating}_{suffix}")) for rating in ratings)
+    rated = sql.SQL(" + ").join(total(score) for score in SCORES)
+    return sql.SQL(", ").join(
+        [sql.SQL("responses"),
+         sql.SQL("({})::bigint AS rated").format(rated),
+         sql.SQL("round(({})::numeric / NULLIF({}, 0), 2)::float8 AS mean").format(total("sum"), rated)] +
+        [sql.SQL("({})::bigint AS {}").format(total(score), sql.Identifier(f"score_{score}")) for score in SCORES])
+
+
+@instrumentation.cache_data(max_entries=256, show_spinner=False)
+def breakdown(signature, filters, dimension, rating=None, limit=50):
+    # One row per value of the dimension inside the filtered cell, the values with the most
+    # responses first. rating=None adds all ratings together. filters is a tuple of (name, value).
+    # Raises ValueError for dimensions the cube does not group together.
+    filters = dict(filters)
+    dimensions = _grouping_of(set(filters) | {dimension})
+    conditions, params = _cell(dimensions, filters)
+    key = DIMENSIONS[dimension]
+    # The measures are worked out for the rows shown only
+    query = sql.SQL("""SELECT {key} AS value, {label} AS label, {measures},
+                              (SELECT count(*) FROM {source} WHERE {conditions}) AS total_values
+                       FROM (SELECT * FROM {source} WHERE {conditions} ORDER BY responses DESC, {label} LIMIT %s) AS cell
+                       ORDER BY responses DESC, {label};""").format(
+        key=sql.Identifier(key.key), label=sql.Identifier(key.label_column),
+        measures=_measures([rating] if rating else list(RATINGS)),
+        source=_source(signature), conditions=conditions)
+    return database.read_sql(query, params + params + [limit])
+
+
+@instrumentation.cache_data(max_entries=256, show_spinner=False)
+def profile(signature, filters):
+    # Every rating of the filtered cell, one row each
+    filters = dict(filters)
+    conditions, params = _cell(_grouping_of(filters), filters)
+    cell = database.read_sql(sql.SQL("SELECT * FROM {} WHERE {};").format(_source(signature), conditions), params)
+    rows = []
+    for rating, label in RATINGS.items():
+        scores = [int(cell[f"{rating}_{score}"].sum()) for score in SCORES]
+        total = cell[f"{rating}_sum"].sum()
+        rows.append(dict(rating=label, responses=int(cell["responses"].sum()), rated=sum(scores), mean=round(total / sum(scores), 2) if sum(scores) else None,
+                         **{f"score_{score}": count for score, count in zip(SCORES, scores)}))
+    return pd.DataFrame(rows)
@@ -0,0 +1,199 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import streamlit as st
+import toml
+from psycopg2 import sql
+
+import instrumentation
+
+SECRETS_PATH = ".streamlit/secrets.toml"
+
+# Pool defaults, each one can be overridden in secrets.toml
+DEFAULT_POOL_SIZE = 10
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_PING_AFTER = 30
+
+
+def load_settings():
+    # Load secrets from the secrets.toml file, either under [postgres] or at the top level
+    secrets = toml.load(SECRETS_PATH)
+    return secrets.get("postgres", secrets)
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    # Records every statement with its latency, rows and result size for the Performance page.
+    # Rows fetched later (from a server-side cursor) add their time and size to the statement.
+    _event = None
+
+    def _start(self, query):
+        return instrumentation.start_query(query.as_string(self) if isinstance(query, sql.Composable) else str(query))
+
+    def execute(self, query, vars=None):
+        event = self._event = self._start(query)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        except Exception as e:
+            event["error"] = type(e).__name__
+            raise
+        finally:
+            event["seconds"] += time.perf_counter() - started
+            event["rows"] = max(self.rowcount, 0)
+
+    def copy_expert(self, query, file, size=8192):
+        event = self._start(query)
+        counting = instrumentation.CountingFile(file)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(query, counting, size)
+        except Exception as e:
+            event["error"] = type(e).__name__
+            raise
+        finally:
+            event["seconds"] += time.perf_counter() - started
+            event["rows"] = max(self.rowcount, 0)
+            event["bytes"] = counting.bytes
+
+    def _fetched(self, rows, started):
+        event = self._event
+        if event is not None:
+            event["seconds"] += time.perf_counter() - started
+            event["bytes"] += instrumentation.estimate_bytes(rows)
+            if self.name is not None:
+                event["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        return self._fetched(super().fetchall(), started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        return self._fetched(super().fetchmany(self.arraysize if size is None else size), started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched([] if row is None else [row], started)
+        return row
+
+
+class ConnectionPool:
+    def __init__(self, params, maxconn=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT, ping_after=DEFAULT_PING_AFTER):
+        self.params = params
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        # Idle connections with the time they were last returned, newest first
+        self._idle = queue.LifoQueue()
+        # One slot per connection, so the pool never opens more than maxconn
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def _connect(self):
+        return psycopg2.connect(**self.params, cursor_factory=InstrumentedCursor)
+
+    def _is_alive(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        # The connection sat idle for a while, check the server is still there
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def checkout(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(f"no free database connection after {self.timeout}s (pool size {self.maxconn})")
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if self._is_alive(conn, last_used):
+                    return conn
+                # Dropped connection, throw it away and try the next one
+                self._discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, conn):
+        try:
+            if conn.closed or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                self._discard(conn)
+                return
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._idle.put((conn, time.monotonic()))
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+@st.cache_resource
+def get_pool():
+    # One pool for the whole Streamlit process, shared by every session and page
+    settings = load_settings()
+    params = dict(dbname=settings["dbname"],
+                  user=settings["user"],
+                  password=settings["password"],
+                  host=settings["host"],
+                  port=int(settings["port"]),
+                  connect_timeout=10,
+                  application_name="dsi-coop-connect")
+    return ConnectionPool(params,
+                          maxconn=int(settings.get("pool_size", DEFAULT_POOL_SIZE)),
+                          timeout=float(settings.get("pool_timeout", DEFAULT_POOL_TIMEOUT)),
+                          ping_after=float(settings.get("pool_ping_after", DEFAULT_PING_AFTER)))
+
+
+@contextmanager
+def get_connection():
+    pool = get_pool()
+    conn = pool.checkout()
+    try:
+        yield conn
+    finally:
+        pool.checkin(conn)
+
+
+def read_sql(query, params=None):
+    # Run a read query on a pooled connection, retrying once if the connection dropped mid-query
+    for attempt in range(2):
+        with get_connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    return pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description])
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                if attempt or not conn.closed:
+                    raise
+
@@ -0,0 +1,280 @@
+import csv
+import io
+import json
+import re
+import tempfile
+from xml.sax.saxutils import escape
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import streamlit as st
+from psycopg2 import sql
+
+import database
+
+# Download formats: file extension and mime type
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "XML": ("xml", "text/xml"),
+    "JSON": ("json", "application/json"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Exports stay in memory up to this size and spill to a temporary file beyond it
+SPOOL_SIZE = 16 * 1024 * 1024
+
+# Size of the CSV blocks converted at a time for Parquet, Arrow, JSON and XML
+BLOCK_SIZE = 4 * 1024 * 1024
+
+# Postgres type oids with a native Arrow type, everything else is exported as text
+ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1700: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp("us"),
+}
+JSON_TYPES = {114, 3802}
+
+# What a semicolon can sit in without ending a statement: comments, string constants (E'' ones
+# with backslash escapes), quoted identifiers and dollar quotes. A lone quote is unterminated.
+SQL_TOKENS = re.compile(r"""--[^\n]*|/\*|(?<!\w)[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|"(?:[^"]|"")*"|(?<![\w$])\$(?:[A-Za-z_]\w*)?\$|;|['"]""", re.S)
+COMMENT_TOKENS = re.compile(r"/\*|\*/")
+
+
+def table_query(table_name):
+    return sql.SQL("SELECT * FROM {}").format(sql.Identifier(table_name))
+
+
+def _comment_end(text, position):
+    # Block comments nest in Postgres
+    depth = 1
+    while depth:
+        match = COMMENT_TOKENS.search(text, position)
+        if match is None:
+            raise ValueError("The query has an unterminated /* comment.")
+        depth += 1 if match.group() == "/*" else -1
+        position = match.end()
+    return position
+
+
+def tokens(text):
+    # The pieces of an SQL text in order, as (kind, text): "code", "comment", "quoted" (string
+    # constants, quoted identifiers and dollar quotes, as written) and ";" for a semicolon
+    position = 0
+    while True:
+        match = SQL_TOKENS.search(text, position)
+        end = match.start() if match else len(text)
+        if end > position:
+            yield "code", text[position:end]
+        if match is None:
+            return
+        token = match.group()
+        position = match.end()
+        if token == ";":
+            yield ";", token
+        elif token in ("'", '"'):
+            raise ValueError(f"The query has an unterminated {token} quote.")
+        elif token == "/*":
+            position = _comment_end(text, position)
+            yield "comment", text[match.start():position]
+        elif token.startswith("--"):
+            yield "comment", token
+        elif token.startswith("$"):
+            end = text.find(token, position)
+            if end < 0:
+                raise ValueError(f"The query has an unterminated {token} quote.")
+            position = end + len(token)
+            yield "quoted", text[match.start():position]
+        else:
+            yield "quoted", token
+
+
+def statements(text):
+    # The statements of an SQL text, split at the semicolons outside of quotes and comments and
+    # without them. Comments inside a statement are kept, parts that are only comments are left out.
+    parts, current, code = [], [], False
+    for kind, piece in tokens(text):
+        if kind == ";":
+            if code:
+                parts.append("".join(current).strip())
+            current, code = [], False
+            continue
+        current.append(piece)
+        code = code or kind == "quoted" or kind == "code" and bool(piece.strip())
+    if code:
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _unique_names(names):
+    # Joins can return the same column name twice, Arrow and XML need them to be distinct
+    seen = {}
+    unique = []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        unique.append(name if count == 0 else f"{name}_{count}")
+    return unique
+
+
+def _copy_to_spool(query):
+    # Stream the result out of Postgres as CSV, without building a DataFrame
+    with database.get_connection() as conn, conn.cursor() as cursor:
+        # The newlines end a -- comment at the end of the query
+        cursor.execute(sql.SQL("SELECT * FROM ({}\n) AS export LIMIT 0;").format(query))
+        columns = [(desc.name, desc.type_code) for desc in cursor.description]
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        cursor.copy_expert(sql.SQL("COPY ({}\n) TO STDOUT WITH (FORMAT csv, ENCODING 'UTF8');").format(query).as_string(conn), spool)
+    spool.seek(0)
+    return columns, spool
+
+
+def _record_batches(columns, spool):
+    # Read the COPY output block by block with the column types Postgres reported
+    names = _unique_names([name for name, _ in columns])
+    column_types = {name: ARROW_TYPES.get(type_code, pa.string()) for name, (_, type_code) in zip(names, columns)}
+    json_columns = [name for name, (_, type_code) in zip(names, columns) if type_code in JSON_TYPES]
+    empty = not spool.read(1)
+    spool.seek(0)
+    if empty:
+        # No rows: Arrow cannot read an empty CSV, the files are written with the schema alone
+        return pa.schema([(name, column_types[name]) for name in names]), [], json_columns
+    reader = pa_csv.open_csv(
+        spool,
+        read_options=pa_csv.ReadOptions(column_names=names, block_size=BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=column_types,
+            true_values=["t"],
+            false_values=["f"],
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    return reader.schema, reader, json_columns
+
+
+def _write_csv(columns, spool, out):
+    header = io.StringIO()
+    csv.writer(header).writerow([name for name, _ in columns])
+    out.write(header.getvalue().encode("utf-8"))
+    while True:
+        block = spool.read(BLOCK_SIZE)
+        if not block:
+            break
+        out.write(block)
+
+
+def _write_parquet(schema, batches, json_columns, out):
+    with pq.ParquetWriter(out, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def _write_arrow(schema, batches, json_columns, out):
+    with pa.ipc.new_file(out, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def _write_json(schema, batches, json_columns, out):
+    # An array of records, JSON columns are embedded as JSON instead of as text
+    out.write(b"[")
+    first = True
+    for batch in batches:
+        for record in batch.to_pylist():
+            for name in json_columns:
+                if record[name] is not None:
+                    record[name] = json.loads(record[name])
+            out.write((b"" if first else b",\n") + json.dumps(record, ensure_ascii=False, default=str).encode("utf-8"))
+            first = False
+    out.write(b"]")
+
+
+def _write_xml(schema, batches, json_columns, out):
+    # Same layout as DataFrame.to_xml: <data><row><column>value</column>...</row></data>
+    tags = [re.sub(r"[^\w.-]", "_", name) for name in schema.names]
+    tags = [tag if re.match(r"[^\W\d]", tag) else f"_{tag}" for tag in tags]
+    out.write(b"<?xml version='1.0' encoding='utf-8'?>\n<data>\n")
+    for batch in batches:
+        for record in batch.to_pylist():
+            row = "".join(f"    <{tag}/>\n" if value is None else f"    <{tag}>{escape(str(value))}</{tag}>\n"
+                          for tag, value in zip(tags, record.values()))
+            out.write(f"  <row>\n{row}  </row>\n".encode("utf-8"))
+    out.write(b"</data>\n")
+
+
+# Writers of record batches, CSV is copied from the COPY output as it is
+WRITERS = {
+    "XML": _write_xml,
+    "JSON": _write_json,
+    "Parquet": _write_parquet,
+    "Arrow": _write_arrow,
+}
+
+
+def export(query, download_format):
+    # Returns a file positioned at the start, memory use is bounded by SPOOL_SIZE and BLOCK_SIZE
+    columns, spool = _copy_to_spool(query)
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    with spool:
+        if download_format == "CSV":
+            _write_csv(columns, spool, out)
+        else:
+            WRITERS[download_format](*_record_batches(columns, spool), out)
+    out.seek(0)
+    return out
+
+
+def export_frame(frame, download_format):
+    # A result that was already fetched, such as the one of the Custom SQL Query panel, in the same
+    # formats without running its query again
+    names = _unique_names([str(column) for column in frame.columns])
+    frame = frame.set_axis(names, axis=1)
+    json_columns = [name for name in names if frame[name].map(lambda value: isinstance(value, (dict, list))).any()]
+    frame = frame.astype({name: object for name in json_columns})
+    for name in json_columns:
+        frame[name] = frame[name].map(lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value)
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    if download_format == "CSV":
+        # Categorical columns are written as their values
+        table = pa.table([column.cast(column.type.value_type) if pa.types.is_dictionary(column.type) else column for column in table.columns],
+                         names=table.column_names)
+        pa_csv.write_csv(table, out)
+    else:
+        WRITERS[download_format](table.schema, table.to_batches(), json_columns, out)
+    out.seek(0)
+    return out
+
+
+def download_section(query, file_name, key):
+    _download(lambda download_format: export(query, download_format), file_name, key)
+
+
+def download_frame_section(frame, file_name, key):
+    _download(lambda download_format: export_frame(frame, download_format), file_name, key)
+
+
+def _download(run_export, file_name, key):
+    download_format = st.radio("Select a format:", list(FORMATS), key=key)
+    extension, mime = FORMATS[download_format]
+
+    # The export only runs when asked for, not on every rerun
+    if st.button(f"Prepare {download_format}", key=f"{key}_prepare"):
+        try:
+            with st.spinner(f"Exporting {file_name}.{extension}..."):
+                with run_export(download_format) as data:
+                    payload = data.read()
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+            return
+        st.download_button(label=f"Download {file_name}.{extension}", data=payload,
+                           file_name=f"{file_name}.{extension}", mime=mime, key=f"{key}_download")
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Tables and query results are kept as compact DataFrames: text repeated across the rows
+# (provinces, districts, relationships, pass/fail) as categoricals, IDs and scores as the
+# smallest integer type that holds them and other text as Arrow-backed strings instead of one
+# Python object per value. The values are unchanged, only their representation.
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_RATIO = 0.5
+
+# Digit strings that read back the same as integers: no leading zero (a phone number keeps its
+# 0) and at most 15 digits, which go through float64 exactly when the column has missing values
+INTEGER_TEXT = r"0|[1-9][0-9]{0,14}"
+
+# Decimals with more significant digits than a float64 holds stay Decimal objects
+FLOAT_DIGITS = 15
+
+# A session that has not rendered a page for this many seconds is no longer counted
+SESSION_TTL = 30 * 60
+
+INTEGER_TYPES = [np.int8, np.int16, np.int32, np.int64]
+
+_sessions = {}
+_compacted = {"frames": 0, "before": 0, "after": 0}
+_lock = threading.Lock()
+
+
+def memory_bytes(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def _integer_type(values, nullable):
+    # The smallest integer type for the values, nullable (Int8, ...) when some are missing
+    low, high = values.min(), values.max()
+    for integer_type in INTEGER_TYPES:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            name = np.dtype(integer_type).name
+            return name.capitalize() if nullable else name
+    return None
+
+
+def _as_integers(values, numbers):
+    # numbers are the non-missing values as numbers, None when they do not fit an integer type
+    if not len(numbers) or not (numbers % 1 == 0).all():
+        return None
+    integer_type = _integer_type(numbers, values.isna().any())
+    if integer_type is None:
+        return None
+    return pd.to_numeric(values).astype(integer_type)
+
+
+def _text(values, present):
+    if present.str.fullmatch(INTEGER_TEXT).all():
+        integers = _as_integers(values, pd.to_numeric(present))
+        if integers is not None:
+            return integers
+    if present.nunique() <= CATEGORY_RATIO * len(present):
+        return values.astype("category")
+    # Text read by pandas 3 is Arrow-backed already
+    return values if isinstance(values.dtype, pd.StringDtype) else values.astype("string[pyarrow]")
+
+
+def _decimals(values, present):
+    if present.map(lambda value: len(value.as_tuple().digits)).max() > FLOAT_DIGITS:
+        return values
+    floats = values.astype("float64")
+    integers = _as_integers(floats, floats.dropna())
+    return floats if integers is None else integers
+
+
+def compact_column(values):
+    # The column in its compact form, or as it is when there is none
+    present = values.dropna()
+    if present.empty:
+        return values
+    if isinstance(values.dtype, pd.StringDtype):
+        return _text(values, present.astype(str))
+    if values.dtype == object:
+        # Python objects as psycopg2 returns them: str, Decimal for numeric, bool with NULLs, dict for JSON, ...
+        kind = pd.api.types.infer_dtype(present, skipna=True)
+        if kind == "string":
+            return _text(values, present)
+        if kind == "decimal":
+            return _decimals(values, present)
+        if kind == "boolean":
+            return values.astype("boolean")
+        return values
+    if pd.api.types.is_integer_dtype(values.dtype) or pd.api.types.is_float_dtype(values.dtype):
+        integers = _as_integers(values, present)
+        return values if integers is None else integers
+    return values
+
+
+def compact(frame):
+    # Applied where a table or a query result is loaded, before it is cached or kept in the session
+    before = memory_bytes(frame)
+    frame = pd.DataFrame({column: compact_column(frame.iloc[:, position])
+                          for position, column in enumerate(frame.columns)}, index=frame.index) if frame.columns.is_unique else frame
+    after = memory_bytes(frame)
+    with _lock:
+        _compacted["frames"] += 1
+        _compacted["before"] += before
+        _compacted["after"] += after
+    return frame
+
+
+def compacted():
+    # Frames compacted by this process and their total size before and after
+    with _lock:
+        return dict(_compacted)
+
+
+def _held_frames(value, seen, depth=3):
+    # DataFrames reachable from a session state value: inside tuples, lists, dicts and the
+    # attributes of objects such as the query jobs
+    if id(value) in seen:
+        return
+    seen.add(id(value))
+    if isinstance(value, pd.DataFrame):
+        yield value
+    elif depth and isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _held_frames(item, seen, depth - 1)
+    elif depth and isinstance(value, dict):
+        for item in value.values():
+            yield from _held_frames(item, seen, depth - 1)
+    elif depth and hasattr(value, "__dict__") and not isinstance(value, type):
+        for item in vars(value).values():
+            yield from _held_frames(item, seen, depth - 1)
+
+
+def track_session():
+    # Record the DataFrames the current session keeps between reruns, called after every run
+    session_id = st.session_state.setdefault("frames_session_id", uuid.uuid4().hex[:8])
+    seen = set()
+    held = [frame for key in list(st.session_state.keys()) for frame in _held_frames(st.session_state[key], seen)]
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = {"session": session_id, "seen": now, "frames": len(held),
+                                 "rows": sum(len(frame) for frame in held),
+                                 "bytes": sum(memory_bytes(frame) for frame in held)}
+        for other in [other for other, entry in _sessions.items() if now - entry["seen"] > SESSION_TTL]:
+            del _sessions[other]
+
+
+def sessions():
+    # Sessions seen within SESSION_TTL with what they hold, the most memory first
+    now = time.time()
+    with _lock:
+        active = [dict(entry) for entry in _sessions.values() if now - entry["seen"] <= SESSION_TTL]
+    return sorted(active, key=lambda entry: entry["bytes"], reverse=True)
+
+
+def process_rss():
+    # Resident memory of the app process in bytes, None where /proc is not available
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+# Cold import cost of the app shell and of each page, every module is imported in a fresh
+# interpreter with python -X importtime. Run from this directory:
+#   python import_times.py [--json]
+# Everything app.py imports on every run. frames brings pandas, which every page needs anyway.
+SHELL_MODULES = ["streamlit", "streamlit_option_menu", "instrumentation", "frames"]
+PAGE_MODULES = ["about", "visualization", "questionnaires", "performance", "allData", "masterData", "tranData", "refData", "search"]
+
+# Dependencies the shell should not pull in before a page needs them. Streamlit itself loads
+# parts of plotly to register its chart theme, plotly.express is what the pages add
+HEAVY_MODULES = ["pandas", "psycopg2", "pyarrow", "plotly.express", "toml"]
+
+
+def measure(modules):
+    # Cumulative import time in milliseconds and the heavy dependencies that came with it
+    script = "import sys\n" + "".join(f"import {module}\n" for module in modules) + \
+             f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    total = 0
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", top-level imports are not indented
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit() and not name.startswith("  "):
+                total += int(cumulative)
+    return total / 1000, result.stdout.split()
+
+
+def main():
+    shell_ms, shell_heavy = measure(SHELL_MODULES)
+    results = {"shell": {"ms": round(shell_ms, 1), "heavy": shell_heavy}, "pages": {}}
+    for module in PAGE_MODULES:
+        page_ms, page_heavy = measure(SHELL_MODULES + [module])
+        results["pages"][module] = {"ms": round(page_ms - shell_ms, 1), "heavy": page_heavy}
+
+    if "--json" in sys.argv:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'app shell':<15}{shell_ms:>10.1f} ms  {', '.join(shell_heavy) or '-'}")
+    for module, page in results["pages"].items():
+        print(f"{module:<15}{page['ms']:>+10.1f} ms  {', '.join(page['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import contextvars
+import functools
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+# Every query the app runs on a pooled connection (see database.InstrumentedCursor) and every
+# lookup of a cached function is kept as an event for the Performance page: latency, rows, bytes,
+# the page that asked and whether the cache answered. Events live in this process only.
+# The last MAX_EVENTS queries and cache lookups of the whole app process, newest last
+MAX_EVENTS = 5000
+
+# Statements are shown up to this many characters
+STATEMENT_LENGTH = 500
+
+# Result sizes are estimated from up to this many rows of a fetch
+SAMPLE_ROWS = 100
+
+_events = deque(maxlen=MAX_EVENTS)
+_lock = threading.Lock()
+
+# The page being rendered and the cached function being computed, set around the code that
+# runs the queries. Context variables follow the script thread and what is submitted with its context.
+_page = contextvars.ContextVar("page", default=None)
+_source = contextvars.ContextVar("source", default=None)
+
+# Cache misses counted per thread, a cached call that ran its function missed
+_misses = threading.local()
+
+
+def _record(event):
+    with _lock:
+        _events.append(event)
+    return event
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def clear():
+    with _lock:
+        _events.clear()
+
+
+@contextmanager
+def page(name):
+    # Attribute the queries run inside to a page
+    token = _page.set(name)
+    try:
+        yield
+    finally:
+        _page.reset(token)
+
+
+def _value_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, (bytes, memoryview)):
+        return len(value)
+    return len(str(value).encode("utf-8"))
+
+
+def estimate_bytes(rows):
+    # Size of the values of the rows in their text form, from an even sample of large fetches
+    if not rows:
+        return 0
+    step = max(1, len(rows) // SAMPLE_ROWS)
+    sample = rows[::step]
+    sampled = sum(_value_bytes(value) for row in sample for value in row)
+    return int(sampled * len(rows) / len(sample))
+
+
+class CountingFile:
+    # File wrapper for COPY that counts the bytes passing through
+    def __init__(self, file):
+        self.file = file
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        return self.file.write(data)
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.bytes += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.file.readline(size)
+        self.bytes += len(data)
+        return data
+
+
+def start_query(statement):
+    # A query event, the cursor that runs the statement fills in its time, rows and bytes
+    return _record({
+        "time": time.time(),
+        "kind": "query",
+        "page": _page.get(),
+        "source": _source.get(),
+        "statement": re.sub(r"\s+", " ", statement).strip()[:STATEMENT_LENGTH],
+        "seconds": 0.0,
+        "rows": 0,
+        "bytes": 0,
+        "cache": "miss" if _source.get() else None,
+        "error": None,
+    })
+
+
+def record_cache(source, cache, rows=0, seconds=0.0):
+    # A lookup of a cache, "hit" or "miss". Used directly by caches kept outside Streamlit's,
+    # e.g. the Custom SQL Query results.
+    return _record({
+        "time": time.time(),
+        "kind": "cache",
+        "page": _page.get(),
+        "source": source,
+        "statement": None,
+        "seconds": seconds,
+        "rows": rows,
+        "bytes": 0,
+        "cache": cache,
+        "error": None,
+    })
+
+
+def _cached(decorator, options):
+    # A Streamlit cache decorator that records every call as a hit or a miss. The queries a miss
+    # runs are attributed to the cached function.
+    def decorate(function):
+        name = f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            _misses.count = getattr(_misses, "count", 0) + 1
+            token = _source.set(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _source.reset(token)
+
+        cached = decorator(**options)(compute)
+
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            before = getattr(_misses, "count", 0)
+            started = time.perf_counter()
+            result = cached(*args, **kwargs)
+            record_cache(name, "miss" if getattr(_misses, "count", 0) > before else "hit",
+                         len(result) if hasattr(result, "columns") else 0, time.perf_counter() - started)
+            return result
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def cache_data(**options):
+    return _cached(st.cache_data, options)
+
+
+def cache_resource(**options):
+    return _cached(st.cache_resource, options)
@@ -0,0 +1,285 @@
+import hashlib
+from collections import deque, namedtuple
+
+import pandas as pd
+import psycopg2
+import streamlit as st
+from psycopg2 import sql
+
+import analytics
+import database
+import instrumentation
+import exports
+import frames
+import pagination
+import snapshots
+
+DEFAULT_ROW_LIMIT = 1000
+
+# Joins prepared on one pooled connection at most, the least recently prepared are deallocated
+MAX_PREPARED_JOINS = 16
+
+# Prepared joins of the connection beyond the newest ones that are kept
+STALE_JOINS_QUERY = """SELECT name FROM pg_prepared_statements
+                         WHERE name LIKE 'join\\_%%'
+                         ORDER BY prepare_time DESC
+                         OFFSET %s;"""
+
+# Tables that own a shared key column. Used to relate tables that have no foreign key
+# between them yet, the same way the hand-written joins did.
+KEY_OWNERS = {
+    "student_id": "student_info",
+    "professor_id": "professor",
+    "company_id": "company",
+    "address_id": "address_info",
+    "academy_id": "academy",
+    "officer_id": "officer",
+    "comment_id": "comment",
+}
+
+Relationship = namedtuple("Relationship", ["name", "table", "columns", "ref_table", "ref_columns"])
+
+FOREIGN_KEY_QUERY = """SELECT con.conname AS name,
+                              cl.relname AS table_name,
+                              ref.relname AS ref_table,
+                              array_agg(a.attname::text ORDER BY k.position) AS columns,
+                              array_agg(ra.attname::text ORDER BY k.position) AS ref_columns
+                       FROM pg_constraint AS con
+                       INNER JOIN pg_namespace AS n ON n.oid = con.connamespace
+                       INNER JOIN pg_class AS cl ON cl.oid = con.conrelid
+                       INNER JOIN pg_class AS ref ON ref.oid = con.confrelid
+                       CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, ref_attnum, position)
+                       INNER JOIN pg_attribute AS a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+                       INNER JOIN pg_attribute AS ra ON ra.attrelid = con.confrelid AND ra.attnum = k.ref_attnum
+                       WHERE con.contype = 'f' AND n.nspname = 'public'
+                       GROUP BY con.conname, cl.relname, ref.relname
+                       ORDER BY cl.relname, con.conname;"""
+
+COLUMNS_QUERY = """SELECT c.relname AS table_name, a.attname AS column_name
+                   FROM pg_attribute AS a
+                   INNER JOIN pg_class AS c ON c.oid = a.attrelid
+                   INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                   WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+                   ORDER BY c.relname, a.attnum;"""
+
+PRIMARY_KEYS_QUERY = """SELECT c.relname AS table_name, array_agg(a.attname::text) AS columns
+                        FROM pg_index AS i
+                        INNER JOIN pg_class AS c ON c.oid = i.indrelid
+                        INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                        INNER JOIN pg_attribute AS a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                        WHERE n.nspname = 'public' AND i.indisprimary
+                        GROUP BY c.relname;"""
+
+
+@instrumentation.cache_data(ttl=snapshots.SIGNATURE_TTL, show_spinner=False)
+def load_schema():
+    # Columns per table and every relationship between tables, read from the catalog
+    columns = {}
+    for row in database.read_sql(COLUMNS_QUERY).itertuples(index=False):
+        columns.setdefault(row.table_name, []).append(row.column_name)
+
+    relationships = [Relationship(row.name, row.table_name, tuple(row.columns), row.ref_table, tuple(row.ref_columns))
+                     for row in database.read_sql(FOREIGN_KEY_QUERY).itertuples(index=False)]
+
+    # Tables without a foreign key between them are related through the owner of a shared key column,
+    # the owner is the table with that column as its primary key, or the conventional owner above
+    owners = dict((column, table) for column, table in KEY_OWNERS.items() if column in columns.get(table, []))
+    for row in database.read_sql(PRIMARY_KEYS_QUERY).itertuples(index=False):
+        if len(row.columns) == 1:
+            owners.setdefault(row.columns[0], row.table_name)
+    related = {frozenset((rel.table, rel.ref_table)) for rel in relationships}
+    for table, table_columns in columns.items():
+        for column in table_columns:
+            owner = owners.get(column)
+            if owner and owner != table and frozenset((table, owner)) not in related:
+                relationships.append(Relationship(f"{table}.{column}", table, (column,), owner, (column,)))
+    return columns, relationships
+
+
+def _neighbours(relationships):
+    graph = {}
+    for rel in relationships:
+        graph.setdefault(rel.table, {}).setdefault(rel.ref_table, []).append(rel)
+        graph.setdefault(rel.ref_table, {}).setdefault(rel.table, []).append(rel)
+    return graph
+
+
+def plan_join(tables, relationships, choices=None):
+    # Connect the chosen tables with as few joins as possible: grow a tree from the first table,
+    # each time adding the shortest path to the nearest table that is not connected yet.
+    # Returns the join order as (table, relationship) steps and the tables pulled in to connect them.
+    choices = choices or {}
+    graph = _neighbours(relationships)
+    steps = [(tables[0], None)]
+    joined = {tables[0]}
+    remaining = [table for table in tables[1:] if table != tables[0]]
+    while remaining:
+        # Searched from the tables in join order, so ties between tables that are equally near
+        # resolve the same way in every process and the generated SQL does not change
+        parents = {table: None for table, _ in steps}
+        queue = deque(table for table, _ in steps)
+        target = None
+        while queue and target is None:
+            table = queue.popleft()
+            for neighbour in graph.get(table, {}):
+                if neighbour not in parents:
+                    parents[neighbour] = table
+                    if neighbour in remaining:
+                        target = neighbour
+                        break
+                    queue.append(neighbour)
+        if target is None:
+            raise ValueError(f"No relationship connects {', '.join(remaining)} to {', '.join(sorted(joined))}.")
+        path = []
+        while parents[target] is not None:
+            path.append((target, parents[target]))
+            target = parents[target]
+        for table, parent in reversed(path):
+            options = graph[parent][table]
+            rel = next((option for option in options if option.name == choices.get(frozenset((table, parent)))), options[0])
+            steps.append((table, rel))
+            joined.add(table)
+            if table in remaining:
+                remaining.remove(table)
+    return steps, [table for table, _ in steps if table not in tables]
+
+
+def ambiguous_pairs(steps, relationships):
+    # Table pairs in the plan that are related in more than one way (e.g. several school columns to academy)
+    graph = _neighbours(relationships)
+    pairs = []
+    for table, rel in steps[1:]:
+        other = rel.ref_table if rel.table == table else rel.table
+        if len(graph[table][other]) > 1:
+            pairs.append((table, other, graph[table][other]))
+    return pairs
+
+
+def output_columns(steps, selected, columns):
+    # Join conditions make columns equal, each group of equal columns is selected only once.
+    # Returns (table, column, output name) of the selected columns, names that repeat get the table as a prefix.
+    group = {}
+
+    def find(item):
+        while group.get(item, item) != item:
+            item = group[item]
+        return item
+
+    for table, rel in steps[1:]:
+        for column, ref_column in zip(rel.columns, rel.ref_columns):
+            group[find((rel.table, column))] = find((rel.ref_table, ref_column))
+
+    outputs, names, seen_groups = [], set(), set()
+    for table in selected:
+        for column in columns[table]:
+            key = find((table, column))
+            if key in seen_groups:
+                continue
+            seen_groups.add(key)
+            name = column if column not in names else f"{table}_{column}"
+            names.add(name)
+            outputs.append((table, column, name))
+    return outputs
+
+
+def build_join_query(steps, selected, columns):
+    joins = []
+    for table, rel in steps[1:]:
+        conditions = [sql.SQL("{} = {}").format(sql.Identifier(rel.table, column), sql.Identifier(rel.ref_table, ref_column))
+                      for column, ref_column in zip(rel.columns, rel.ref_columns)]
+        joins.append(sql.SQL("INNER JOIN {} ON {}").format(sql.Identifier(table), sql.SQL(" AND ").join(conditions)))
+    outputs = [sql.SQL("{} AS {}").format(sql.Identifier(table, column), sql.Identifier(name))
+               for table, column, name in output_columns(steps, selected, columns)]
+    return sql.SQL("SELECT {} FROM {} {}").format(
+        sql.SQL(", ").join(outputs), sql.Identifier(steps[0][0]), sql.SQL(" ").join(joins))
+
+
+def query_text(query):
+    # The text of a generated join, which is made of SQL and identifiers only. Rendered here
+    # instead of with as_string(), which needs a connection from the pool on every rerun.
+    if isinstance(query, sql.Composed):
+        return "".join(query_text(part) for part in query.seq)
+    if isinstance(query, sql.Identifier):
+        return ".".join('"' + part.replace('"', '""') + '"' for part in query.strings)
+    if isinstance(query, sql.SQL):
+        return query.string
+    raise TypeError(f"cannot render {query!r} without a connection")
+
+
+def run_join(join_sql, limit):
+    # Each generated statement is prepared once per pooled connection and executed from then on.
+    # Preparing one more deallocates those beyond MAX_PREPARED_JOINS, long-lived connections
+    # would otherwise keep every join ever run.
+    name = sql.Identifier("join_" + hashlib.md5(join_sql.encode("utf-8")).hexdigest()[:16])
+    execute = sql.SQL("EXECUTE {} (%s);").format(name)
+    with database.get_connection() as conn, conn.cursor() as cursor:
+        try:
+            cursor.execute(execute, (limit,))
+        except psycopg2.errors.InvalidSqlStatementName:
+            conn.rollback()
+            cursor.execute(STALE_JOINS_QUERY, (MAX_PREPARED_JOINS - 1,))
+            for stale, in cursor.fetchall():
+                cursor.execute(sql.SQL("DEALLOCATE {};").format(sql.Identifier(stale)))
+            cursor.execute(sql.SQL("PREPARE {} (bigint) AS {} LIMIT $1;").format(name, sql.SQL(join_sql)))
+            cursor.execute(execute, (limit,))
+        return frames.compact(pd.DataFrame(cursor.fetchall(), columns=[desc[0] for desc in cursor.description]))
+
+
+def run_analytics_join(join_sql, limit, tables):
+    # The same join on the analytics copies, refreshed first if one of the tables changed
+    engine = analytics.get_engine()
+    engine.refresh(snapshots.table_signatures(), tables)
+    with engine.cursor() as cursor:
+        return analytics.run(cursor, join_sql, limit)[0]
+
+
+def show_panel(table_names, analytics_mode=False):
+    selected_tables = st.multiselect("Select tables to join:", table_names, [], key="selected_tables")
+    if len(selected_tables) < 2:
+        st.warning("Please select at least two tables to join.")
+        return
+
+    columns, relationships = load_schema()
+    try:
+        steps, extra_tables = plan_join(selected_tables, relationships)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    # Let the user pick how to join tables that are related in more than one way
+    choices = {}
+    for table, other, options in ambiguous_pairs(steps, relationships):
+        labels = {option.name: f"{option.table}({', '.join(option.columns)}) → {option.ref_table}({', '.join(option.ref_columns)})" for option in options}
+        choices[frozenset((table, other))] = st.selectbox(f"Join {table} and {other} on:", list(labels), format_func=labels.get,
+                                                          key=f"join_choice_{table}_{other}")
+    if choices:
+        steps, extra_tables = plan_join(selected_tables, relationships, choices)
+
+    if extra_tables:
+        st.caption(f"Also joining {', '.join(extra_tables)} to connect the selected tables.")
+    query = build_join_query(steps, selected_tables, columns)
+    join_sql = query_text(query)
+    with st.expander("Generated SQL"):
+        st.code(join_sql, language="sql")
+
+    row_limit = st.number_input("Row limit:", min_value=1, max_value=100000, value=DEFAULT_ROW_LIMIT, step=100, key="join_row_limit")
+
+    # Button to run the join query
+    if st.button("Join Tables"):
+        try:
+            if analytics_mode:
+                with st.spinner("Running the join on the analytics copies..."):
+                    st.session_state.join_result = (join_sql, run_analytics_join(join_sql, int(row_limit), [table for table, _ in steps]))
+            else:
+                st.session_state.join_result = (join_sql, run_join(join_sql, int(row_limit)))
+        except (psycopg2.Error, *analytics.ERRORS) as e:
+            st.error(f"An error occurred: {e}")
+
+    result = st.session_state.get("join_result")
+    if result is not None and result[0] == join_sql:
+        st.caption(f"Showing up to {int(row_limit):,} rows, the download below contains the whole join.")
+        st.write(pagination.display_frame(result[1]))
+
+        # Download the whole join, streamed with COPY
+        st.subheader("Download📥: Join Result")
+        exports.download_section(query, "_".join(selected_tables), key="download_format_join")
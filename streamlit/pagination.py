@@ -0,0 +1,181 @@
+import json
+
+import pandas as pd
+import streamlit as st
+from psycopg2 import sql
+
+import database
+import instrumentation
+import snapshots
+
+PAGE_SIZES = [25, 50, 100, 500]
+
+# Filter operators pushed down to Postgres, "contains" compares the text form of the column
+OPERATORS = {
+    "=": "{} = %s",
+    "!=": "{} <> %s",
+    ">": "{} > %s",
+    ">=": "{} >= %s",
+    "<": "{} < %s",
+    "<=": "{} <= %s",
+    "contains": "{}::text ILIKE '%%' || %s || '%%'",
+    "is empty": "{} IS NULL",
+}
+
+# Column types without an ordering, they cannot be used as a sort key
+UNSORTABLE_TYPES = {"json", "jsonb"}
+
+# Tables without a primary key are paged on the physical row id instead
+CTID_KEY = "__ctid"
+
+COLUMNS_QUERY = """SELECT a.attname AS column_name,
+                          format_type(a.atttypid, a.atttypmod) AS data_type
+                   FROM pg_attribute AS a
+                   INNER JOIN pg_class AS c ON c.oid = a.attrelid
+                   INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                   WHERE n.nspname = 'public' AND c.relname = %(table)s AND a.attnum > 0 AND NOT a.attisdropped
+                   ORDER BY a.attnum;"""
+
+PRIMARY_KEY_QUERY = """SELECT a.attname AS column_name
+                       FROM pg_index AS i
+                       INNER JOIN pg_class AS c ON c.oid = i.indrelid
+                       INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                       CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, position)
+                       INNER JOIN pg_attribute AS a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                       WHERE n.nspname = 'public' AND c.relname = %(table)s AND i.indisprimary
+                       ORDER BY k.position;"""
+
+
+@instrumentation.cache_data(ttl=snapshots.SIGNATURE_TTL, show_spinner=False)
+def table_layout(table_name):
+    # Column names and types plus the keyset columns of a table
+    columns = database.read_sql(COLUMNS_QUERY, {"table": table_name})
+    key_columns = database.read_sql(PRIMARY_KEY_QUERY, {"table": table_name})["column_name"].tolist()
+    return columns, key_columns
+
+
+def build_page_query(table_name, key_columns, page_size, sort_column=None, descending=False, filters=(), after=None):
+    # Keyset pagination: instead of OFFSET, continue after the last row of the previous page,
+    # so every page costs the same no matter how deep the user has paged
+    keys = [sql.Identifier(column) if column != CTID_KEY else sql.SQL("ctid") for column in key_columns]
+    key_row = sql.SQL("({})").format(sql.SQL(", ").join(keys))
+    conditions, params = [], []
+
+    for column, operator, value in filters:
+        conditions.append(sql.SQL(OPERATORS[operator]).format(sql.Identifier(column)))
+        if operator != "is empty":
+            params.append(value)
+
+    if after is not None:
+        sort_value, key_values = after
+        key_placeholders = sql.SQL("({})").format(sql.SQL(", ").join(
+            sql.SQL("%s::tid") if column == CTID_KEY else sql.Placeholder() for column in key_columns))
+        key_after = sql.SQL("{} > {}").format(key_row, key_placeholders)
+        if sort_column is None:
+            conditions.append(key_after)
+            params.extend(key_values)
+        elif sort_value is None:
+            # NULLs sort last, so after a NULL only NULLs with a larger key remain
+            conditions.append(sql.SQL("({} IS NULL AND {})").format(sql.Identifier(sort_column), key_after))
+            params.extend(key_values)
+        else:
+            conditions.append(sql.SQL("({col} {cmp} %s OR ({col} = %s AND {key_after}) OR {col} IS NULL)").format(
+                col=sql.Identifier(sort_column), cmp=sql.SQL("<" if descending else ">"), key_after=key_after))
+            params.extend([sort_value, sort_value, *key_values])
+
+    order = [sql.SQL("{} {} NULLS LAST").format(sql.Identifier(sort_column), sql.SQL("DESC" if descending else "ASC"))] if sort_column else []
+    order.extend(keys)
+    select = sql.SQL("*, ctid::text AS {}").format(sql.Identifier(CTID_KEY)) if CTID_KEY in key_columns else sql.SQL("*")
+    query = sql.SQL("SELECT {select} FROM {table}{where} ORDER BY {order} LIMIT {limit};").format(
+        select=select,
+        table=sql.Identifier(table_name),
+        where=sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions) if conditions else sql.SQL(""),
+        order=sql.SQL(", ").join(order),
+        limit=sql.Literal(page_size + 1))
+    return query, params
+
+
+@instrumentation.cache_data(max_entries=256, show_spinner=False)
+def fetch_page(table_name, signature, key_columns, page_size, sort_column, descending, filters, after):
+    # The table signature is part of the cache key, so pages are re-read only after the table changes
+    query, params = build_page_query(table_name, key_columns, page_size, sort_column, descending, filters, after)
+    return database.read_sql(query, params)
+
+
+def _python_value(value):
+    # numpy scalars from the DataFrame cannot be passed back to psycopg2 as parameters
+    return value.item() if hasattr(value, "item") else value
+
+
+def display_frame(page):
+    # JSON values are turned into text for the rows on screen only
+    page = page.drop(columns=[CTID_KEY], errors="ignore")
+    json_columns = [column for column in page.columns
+                    if page[column].map(lambda value: isinstance(value, (dict, list))).any()]
+    if json_columns:
+        page = page.astype({column: object for column in json_columns})
+        for column in json_columns:
+            page[column] = page[column].map(lambda value: json.dumps(value, ensure_ascii=False) if isinstance(value, (dict, list)) else value)
+    return page
+
+
+def show_table(table_name, key=None):
+    key = key or f"table_view_{table_name}"
+    columns, key_columns = table_layout(table_name)
+    key_columns = tuple(key_columns) or (CTID_KEY,)
+    column_names = columns["column_name"].tolist()
+    sortable = [row.column_name for row in columns.itertuples() if row.data_type not in UNSORTABLE_TYPES]
+
+    # Sort and filter are applied by Postgres, only the visible page is transferred
+    with st.expander("Sort and filter"):
+        sort_col, order_col = st.columns([3, 1])
+        sort_choice = sort_col.selectbox("Sort by:", ["(table order)"] + sortable, key=f"{key}_sort")
+        descending = order_col.checkbox("Descending", key=f"{key}_desc")
+        filter_col, operator_col, value_col = st.columns([2, 1, 2])
+        filter_column = filter_col.selectbox("Filter column:", ["(no filter)"] + column_names, key=f"{key}_filter")
+        operator = operator_col.selectbox("Operator:", list(OPERATORS), key=f"{key}_operator")
+        filter_value = value_col.text_input("Value:", key=f"{key}_value")
+    page_size = st.selectbox("Rows per page:", PAGE_SIZES, index=1, key=f"{key}_page_size")
+
+    sort_column = None if sort_choice == "(table order)" else sort_choice
+    filters = ()
+    if filter_column != "(no filter)" and (filter_value or operator == "is empty"):
+        filters = ((filter_column, operator, filter_value),)
+
+    # Restart from the first page whenever the table, sort, filter or page size changes
+    view = (table_name, sort_column, descending, filters, page_size)
+    state = st.session_state.setdefault(key, {"view": None, "cursors": [None]})
+    if state["view"] != view:
+        state["view"], state["cursors"] = view, [None]
+
+    signature = snapshots.table_signatures().get(table_name)
+    try:
+        page = fetch_page(table_name, signature, key_columns, page_size, sort_column, descending, filters, state["cursors"][-1])
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+        return
+
+    has_next = len(page) > page_size
+    page = page.iloc[:page_size]
+    st.dataframe(display_frame(page))
+
+    # Position, the total is the planner estimate so no COUNT(*) is needed
+    page_number = len(state["cursors"])
+    info = f"Page {page_number}"
+    if not filters:
+        stats = snapshots.table_catalog().set_index("table_name")
+        if table_name in stats.index:
+            estimated_rows = int(stats.at[table_name, "estimated_rows"])
+            info += f" of ~{max(1, -(-estimated_rows // page_size)):,} (~{estimated_rows:,} rows)"
+
+    previous_col, info_col, next_col = st.columns([1, 3, 1])
+    info_col.caption(info)
+    if previous_col.button("◀ Previous", key=f"{key}_previous", disabled=page_number == 1):
+        state["cursors"].pop()
+        st.rerun()
+    if next_col.button("Next ▶", key=f"{key}_next", disabled=not has_next):
+        # Remember where this page ended, the next page starts right after it
+        last = {column: _python_value(page[column].iloc[-1]) for column in page.columns}
+        sort_value = None if sort_column is None or pd.isna(last[sort_column]) else last[sort_column]
+        state["cursors"].append((sort_value, tuple(last[column] for column in key_columns)))
+        st.rerun()
@@ -0,0 +1,121 @@
+import pandas as pd
+import psycopg2
+import streamlit as st
+
+import database
+import frames
+import instrumentation
+
+PERCENTILES = [0.5, 0.9, 0.95, 0.99]
+SLOWEST = 20
+
+# Statements of the whole server by total execution time, when pg_stat_statements is installed.
+# The timing columns were renamed in Postgres 13.
+EXTENSION_QUERY = "SELECT count(*) FROM pg_extension WHERE extname = 'pg_stat_statements';"
+STATEMENTS_QUERY = """SELECT left(regexp_replace(s.query, '\\s+', ' ', 'g'), 500) AS statement,
+                             s.calls,
+                             round(s.{total}::numeric, 1) AS total_ms,
+                             round(s.{mean}::numeric, 2) AS mean_ms,
+                             s.rows,
+                             round(100.0 * s.shared_blks_hit / NULLIF(s.shared_blks_hit + s.shared_blks_read, 0), 1) AS buffer_hit_pct
+                      FROM pg_stat_statements AS s
+                      INNER JOIN pg_database AS d ON d.oid = s.dbid
+                      WHERE d.datname = current_database()
+                      ORDER BY s.{total} DESC
+                      LIMIT %s;"""
+
+
+def latency_percentiles(queries, by):
+    # Latency in milliseconds at PERCENTILES and the slowest, per value of the by column
+    grouped = queries.groupby(by)["seconds"]
+    summary = grouped.quantile(PERCENTILES).unstack()
+    summary.columns = [f"p{int(p * 100)} ms" for p in PERCENTILES]
+    summary["max ms"] = grouped.max()
+    summary = (summary * 1000).round(1)
+    summary.insert(0, "queries", grouped.size())
+    return summary.sort_values("queries", ascending=False)
+
+
+def server_statements(limit=SLOWEST):
+    # None when the extension is not installed in this database
+    if not database.read_sql(EXTENSION_QUERY).iloc[0, 0]:
+        return None
+    version = int(database.read_sql("SELECT current_setting('server_version_num');").iloc[0, 0])
+    total, mean = ("total_exec_time", "mean_exec_time") if version >= 130000 else ("total_time", "mean_time")
+    return database.read_sql(STATEMENTS_QUERY.format(total=total, mean=mean), (limit,))
+
+
+def show_memory():
+    st.subheader("Memory")
+    active = pd.DataFrame(frames.sessions(), columns=["session", "seen", "frames", "rows", "bytes"])
+    compacted = frames.compacted()
+    rss = frames.process_rss()
+    process, sessions, per_session, saved = st.columns(4)
+    process.metric("Process RSS", f"{rss / 2 ** 20:,.0f} MB" if rss is not None else "n/a")
+    sessions.metric("Active sessions", f"{len(active):,}")
+    per_session.metric("Held per session", f"{active['bytes'].mean() / 2 ** 20:,.2f} MB" if len(active) else "n/a")
+    saved.metric("Loaded frames", f"{compacted['after'] / 2 ** 20:,.1f} MB",
+                 f"{compacted['before'] / 2 ** 20:,.1f} MB before compacting" if compacted["frames"] else None, delta_color="off")
+    st.caption(f"DataFrames kept in the session state between reruns, per session seen in the last "
+               f"{frames.SESSION_TTL // 60} minutes. Tables shown with Show Info are shared by all sessions and not counted.")
+    if len(active):
+        st.dataframe(active.assign(seen=pd.to_datetime(active["seen"], unit="s"), MB=(active["bytes"] / 2 ** 20).round(2))
+                     .drop(columns=["bytes"]), hide_index=True)
+
+
+def app():
+    st.title("Performance")
+    st.write("Queries and cache lookups of this app process since it started, up to the last "
+             f"{instrumentation.MAX_EVENTS:,}.")
+    if st.button("Clear the log"):
+        instrumentation.clear()
+
+    events = pd.DataFrame(instrumentation.events(), columns=["time", "kind", "page", "source", "statement",
+                                                              "seconds", "rows", "bytes", "cache", "error"])
+    events["page"] = events["page"].fillna("(none)")
+    events["source"] = events["source"].fillna("(uncached)")
+    queries = events[events["kind"] == "query"]
+    lookups = events[events["kind"] == "cache"]
+
+    if queries.empty:
+        st.info("No queries recorded yet, open the other pages first.")
+    else:
+        total, slow, rows, size = st.columns(4)
+        total.metric("Queries", f"{len(queries):,}")
+        slow.metric("p95 latency", f"{queries['seconds'].quantile(0.95) * 1000:,.1f} ms")
+        rows.metric("Rows", f"{int(queries['rows'].sum()):,}")
+        size.metric("Transferred", f"{queries['bytes'].sum() / 2 ** 20:,.1f} MB")
+
+        st.subheader("Latency by page")
+        st.dataframe(latency_percentiles(queries, "page"))
+        st.subheader("Latency by cached function")
+        st.dataframe(latency_percentiles(queries, "source"))
+
+        st.subheader("Slowest queries")
+        slowest = queries.nlargest(SLOWEST, "seconds").assign(
+            time=lambda frame: pd.to_datetime(frame["time"], unit="s"),
+            ms=lambda frame: (frame["seconds"] * 1000).round(1))
+        st.dataframe(slowest[["time", "page", "source", "ms", "rows", "bytes", "error", "statement"]], hide_index=True)
+
+    if not lookups.empty:
+        st.subheader("Cache hits")
+        hits = lookups.assign(hit=lookups["cache"] == "hit").groupby("source").agg(
+            lookups=("hit", "size"), hits=("hit", "sum"), ms=("seconds", "mean"))
+        hits["hit ratio"] = (hits["hits"] / hits["lookups"]).round(3)
+        hits["ms"] = (hits["ms"] * 1000).round(2)
+        st.dataframe(hits.rename(columns={"ms": "mean ms"}).sort_values("lookups", ascending=False))
+
+    show_memory()
+
+    st.subheader("Server statements (pg_stat_statements)")
+    try:
+        statements = server_statements()
+    except psycopg2.Error as e:
+        st.info(f"pg_stat_statements cannot be read: {str(e).strip()}")
+        return
+    if statements is None:
+        st.info("The pg_stat_statements extension is not installed in this database. Add it to "
+                "shared_preload_libraries and run CREATE EXTENSION pg_stat_statements; to see every "
+                "statement the server ran, from all clients.")
+    else:
+        st.dataframe(statements, hide_index=True)
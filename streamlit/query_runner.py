@@ -0,0 +1,305 @@
+import contextvars
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import psycopg2
+import streamlit as st
+
+import analytics
+import database
+import exports
+import frames
+import instrumentation
+import pagination
+import snapshots
+
+# Defaults for the Custom SQL Query panel
+DEFAULT_TIMEOUT = 30
+DEFAULT_ROW_CAP = 10000
+FETCH_SIZE = 1000
+MAX_WORKERS = 4
+
+# Identical queries within this many seconds reuse the earlier result
+RESULT_TTL = 60
+MAX_CACHED_RESULTS = 32
+
+# Statements that can be run through a server-side cursor and fetched incrementally, the only
+# ones the panel runs. Postgres refuses anything that writes inside a cursor (DECLARE ... FOR).
+CURSOR_STATEMENTS = {"select", "with", "values", "table"}
+
+# The first word of a statement, after comments and opening parentheses
+FIRST_WORD = re.compile(r"(?:\s+|--[^\n]*|/\*.*?\*/|\()*(\w+)", re.S)
+
+POLL_INTERVAL = 0.5
+
+
+class QueryJob:
+    def __init__(self, query, timeout, row_cap, analytics_mode=False):
+        self.query = query
+        self.analytics_mode = analytics_mode
+        self.timeout = timeout
+        self.row_cap = row_cap
+        self.status = "running"
+        self.rows_fetched = 0
+        self.truncated = False
+        self.result = None
+        self.error = None
+        self.from_cache = False
+        self.started = time.monotonic()
+        self.finished = None
+        self.conn = None
+        self.cursor = None
+        self.cancel_requested = False
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        # Called from the script thread, psycopg2 allows cancel() while another thread runs the query
+        self.cancel_requested = True
+        conn = self.conn
+        if conn is not None and not conn.closed:
+            try:
+                conn.cancel()
+            except psycopg2.Error:
+                pass
+        # DuckDB cursor of the analytics mode
+        cursor = self.cursor
+        if cursor is not None:
+            try:
+                cursor.interrupt()
+            except analytics.duckdb.Error:
+                pass
+
+    def stopped(self):
+        self.status = "cancelled"
+        self.error = "Query cancelled." if self.cancel_requested else f"Query stopped after the {self.timeout:g}s timeout."
+
+
+@st.cache_resource
+def get_executor():
+    # Queries run here, off the script thread, so a slow one never freezes the page
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="custom-query")
+
+
+@st.cache_resource
+def get_result_cache():
+    return {"lock": threading.Lock(), "entries": {}}
+
+
+def normalize_query(query):
+    # Collapse whitespace and case outside string constants, quoted identifiers and dollar quotes,
+    # which keep their case, drop comments and the trailing semicolons. Raises ValueError for an
+    # unterminated quote or comment.
+    parts, code = [], ""
+    for kind, piece in exports.tokens(query):
+        if kind == "quoted":
+            parts += [re.sub(r"\s+", " ", code).lower(), piece]
+            code = ""
+        else:
+            code += " " if kind == "comment" else piece
+    parts.append(re.sub(r"\s+", " ", code).lower())
+    return re.sub(r"[\s;]+$", "", "".join(parts)).lstrip()
+
+
+def check_query(query):
+    # The single read-only statement of the query, without the semicolon. A second statement would
+    # run after the READ ONLY transaction and the statement timeout are over, it is refused.
+    parts = exports.statements(query)
+    if len(parts) != 1:
+        raise ValueError("Enter a single query, without other statements after it.")
+    match = FIRST_WORD.match(parts[0])
+    if match is None or match.group(1).lower() not in CURSOR_STATEMENTS:
+        raise ValueError("The Custom SQL Query panel runs read-only queries (SELECT, WITH, VALUES or TABLE).")
+    return parts[0]
+
+
+def _reset(conn):
+    # The query ran on a pooled connection, settings it changed for the session are undone
+    # before the next user gets it
+    try:
+        conn.rollback()
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cursor:
+            cursor.execute("RESET ALL;")
+        conn.commit()
+    except psycopg2.Error:
+        pass
+
+
+def _cached_result(key):
+    cache = get_result_cache()
+    with cache["lock"]:
+        entry = cache["entries"].get(key)
+        if entry and time.monotonic() - entry[0] < RESULT_TTL:
+            return entry[1]
+        return None
+
+
+def _store_result(key, job):
+    cache = get_result_cache()
+    with cache["lock"]:
+        entries = cache["entries"]
+        entries[key] = (time.monotonic(), (job.result, job.truncated))
+        # Forget the oldest results once the cache is full
+        while len(entries) > MAX_CACHED_RESULTS:
+            entries.pop(min(entries, key=lambda k: entries[k][0]))
+
+
+def _execute(job, pool, cache_key):
+    conn = None
+    try:
+        # A full pool or a database that is down fails the job like any other error
+        conn = job.conn = pool.checkout()
+        if job.cancel_requested:
+            raise psycopg2.errors.QueryCanceled("canceling statement due to user request")
+        with conn.cursor() as cursor:
+            # Read-only, with a per-query timeout so a heavy query cannot hold locks indefinitely
+            cursor.execute("SET TRANSACTION READ ONLY;")
+            cursor.execute("SELECT set_config('statement_timeout', %s, true);", (f"{int(job.timeout * 1000)}",))
+
+        # Server-side cursor, rows are fetched in batches and never past the row cap
+        with conn.cursor(name=f"custom_query_{uuid.uuid4().hex}") as cursor:
+            cursor.execute(check_query(job.query))
+            rows, columns = [], None
+            while not job.cancel_requested:
+                batch = cursor.fetchmany(min(FETCH_SIZE, job.row_cap + 1 - len(rows)))
+                if columns is None:
+                    if cursor.description is None:
+                        raise ValueError("The query returned no rows to show.")
+                    columns = [desc[0] for desc in cursor.description]
+                rows.extend(batch)
+                job.rows_fetched = min(len(rows), job.row_cap)
+                if not batch or len(rows) > job.row_cap:
+                    break
+            if job.cancel_requested:
+                raise psycopg2.errors.QueryCanceled("canceling statement due to user request")
+
+        job.truncated = len(rows) > job.row_cap
+        job.result = frames.compact(pd.DataFrame(rows[:job.row_cap], columns=columns))
+        job.status = "done"
+        _store_result(cache_key, job)
+    except psycopg2.errors.QueryCanceled:
+        job.stopped()
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.conn = None
+        job.finished = time.monotonic()
+        if conn is not None:
+            _reset(conn)
+            pool.checkin(conn)
+
+
+def _execute_analytics(job, engine, signatures, cache_key):
+    timer = None
+    try:
+        engine.refresh(signatures)
+        if job.cancel_requested:
+            raise analytics.duckdb.InterruptException("canceling query due to user request")
+        with engine.cursor() as cursor:
+            job.cursor = cursor
+            # DuckDB has no statement timeout, the query is interrupted from a timer instead
+            timer = threading.Timer(job.timeout, cursor.interrupt)
+            timer.start()
+            job.result, job.truncated = analytics.run(cursor, job.query, job.row_cap)
+        job.rows_fetched = len(job.result)
+        job.status = "done"
+        _store_result(cache_key, job)
+    except analytics.duckdb.InterruptException:
+        job.stopped()
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        job.cursor = None
+        job.finished = time.monotonic()
+
+
+def submit(query, timeout=DEFAULT_TIMEOUT, row_cap=DEFAULT_ROW_CAP, analytics_mode=False):
+    # Raises ValueError for what the panel does not run, analytics mode checks the query on DuckDB
+    if not analytics_mode:
+        check_query(query)
+    job = QueryJob(query, timeout, row_cap, analytics_mode)
+    # Analytics results are cached per version of the tables, they were computed on copies
+    signatures = snapshots.table_signatures() if analytics_mode else None
+    cache_key = (normalize_query(query), row_cap, analytics_mode and tuple(sorted(signatures.items())))
+    cached = _cached_result(cache_key)
+    if cached is not None:
+        job.result, job.truncated = cached
+        job.rows_fetched = len(job.result)
+        job.status, job.from_cache, job.finished = "done", True, job.started
+        instrumentation.record_cache("query_runner.submit", "hit", len(job.result))
+        return job
+    instrumentation.record_cache("query_runner.submit", "miss")
+    # The worker runs in the caller's context, its queries are attributed to the calling page
+    if analytics_mode:
+        get_executor().submit(contextvars.copy_context().run, _execute_analytics, job, analytics.get_engine(), signatures, cache_key)
+    else:
+        get_executor().submit(contextvars.copy_context().run, _execute, job, database.get_pool(), cache_key)
+    return job
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _show_progress(job, key):
+    if not job.running:
+        # Done, the whole page runs again to show the result
+        st.rerun()
+    st.info(f"Running... {job.rows_fetched:,} rows fetched after {job.elapsed:.1f}s")
+    if st.button("Cancel", key=f"{key}_cancel"):
+        job.cancel()
+
+
+def show_panel(key="custom_query", analytics_mode=False):
+    st.subheader("Custom SQL Query")
+    sql_query = st.text_input("Enter your SQL query:", key=f"{key}_text")
+    timeout_col, cap_col = st.columns(2)
+    timeout = timeout_col.number_input("Timeout (seconds):", min_value=1, max_value=600, value=DEFAULT_TIMEOUT, key=f"{key}_timeout")
+    row_cap = cap_col.number_input("Row limit:", min_value=1, max_value=1000000, value=DEFAULT_ROW_CAP, step=1000, key=f"{key}_row_cap")
+
+    job = st.session_state.get(key)
+    if st.button("Run Query", key=f"{key}_run", disabled=job is not None and job.running):
+        if not sql_query.strip():
+            st.warning("Please enter a query to run.")
+        else:
+            try:
+                job = st.session_state[key] = submit(sql_query, timeout, int(row_cap), analytics_mode)
+            except ValueError as e:
+                st.error(str(e))
+
+    if job is None:
+        return
+
+    if job.running:
+        # Only the progress reruns while the query runs, the rest of the page is shown meanwhile
+        _show_progress(job, key)
+        return
+
+    if job.error:
+        st.error(f"An error occurred: {job.error}")
+        return
+
+    # Show custom query result
+    st.subheader("Custom Query Result")
+    source = "from cache" if job.from_cache else f"in {job.elapsed:.2f}s"
+    engine = " on the analytics copies (DuckDB)" if job.analytics_mode else ""
+    st.caption(f"{len(job.result):,} rows {source}{engine}" + (f", limited to the first {job.row_cap:,}" if job.truncated else ""))
+    st.write(pagination.display_frame(job.result))
+
+    # Download custom query result, the rows shown: the query is not run again
+    st.subheader("Download📥: Custom Query Result")
+    if job.truncated:
+        st.caption(f"The download contains the first {job.row_cap:,} rows, raise the row limit to get more.")
+    file_name_custom = st.text_input("Enter the file name:", key=f"{key}_file_name")
+    exports.download_frame_section(job.result, file_name_custom or "query_result", key="download_format_query")
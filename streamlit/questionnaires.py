@@ -0,0 +1,94 @@
+import plotly.express as px
+import streamlit as st
+
+import cube
+
+# Drill-down levels are kept in the session as (dimension, value, label)
+FILTERS_KEY = "cube_filters"
+
+
+def _label(value):
+    return "(none)" if value is None else str(value)
+
+
+def app():
+    st.title("Questionnaire Scores")
+    st.markdown("---")
+
+    # Every chart reads the questionnaire_cube rollup, refreshed when the questionnaires change
+    signature = cube.source_signature()
+    filters = st.session_state.setdefault(FILTERS_KEY, [])
+    rating = st.selectbox("Rating:", [None] + list(cube.RATINGS),
+                          format_func=lambda name: "All ratings" if name is None else cube.RATINGS[name])
+
+    # Where we are, each level can be clicked to go back up to it
+    levels = st.columns(len(filters) + 1)
+    if levels[0].button("All questionnaires", key="cube_level_0"):
+        del filters[:]
+        st.rerun()
+    for level, (dimension, value, label) in enumerate(filters, start=1):
+        if levels[level].button(f"{cube.DIMENSIONS[dimension].label}: {_label(label)}", key=f"cube_level_{level}"):
+            del filters[level:]
+            st.rerun()
+    cell = tuple((dimension, value) for dimension, value, _ in filters)
+
+    # All ratings of the current level
+    profile = cube.profile(signature, cell)
+    responses = int(profile["responses"].max()) if len(profile) else 0
+    st.subheader("Ratings")
+    if not responses:
+        st.warning("There are no questionnaires here.")
+        return
+    fig = px.bar(profile, x="mean", y="rating", orientation="h", range_x=[0, 5],
+                 title=f"Mean score per rating ({responses:,} questionnaires)",
+                 labels={"mean": "Mean score (1-5)", "rating": ""})
+    fig.update_layout(yaxis={"autorange": "reversed"})
+    st.plotly_chart(fig)
+
+    # Break the level down by one more dimension; a company already fixes its province
+    filtered = dict(cell)
+    options = [name for name in cube.DIMENSIONS
+               if name not in filtered and not (name == "province" and "company" in filtered)
+               and cube.grouping(set(filtered) | {name})]
+    if not options:
+        st.info("This is the most detailed level of the cube.")
+        return
+    dimension = st.selectbox("Break down by:", options, format_func=lambda name: cube.DIMENSIONS[name].label)
+    rows = cube.breakdown(signature, cell, dimension, rating)
+    if rows.empty:
+        st.warning("There are no questionnaires here.")
+        return
+    rows["label"] = rows["label"].map(_label)
+    total = int(rows["total_values"].iloc[0])
+    title = cube.RATINGS[rating] if rating else "All ratings"
+    dimension_label = cube.DIMENSIONS[dimension].label
+    st.caption(f"{total:,} values" + (f", showing the {len(rows)} with the most questionnaires" if total > len(rows) else ""))
+
+    fig = px.bar(rows, x="label", y="mean", hover_data=["responses", "rated"], range_y=[0, 5],
+                 title=f"{title}: mean score by {dimension_label.lower()}",
+                 labels={"label": dimension_label, "mean": "Mean score (1-5)"})
+    fig.update_layout(xaxis_tickangle=-45)
+    st.plotly_chart(fig)
+
+    # Share of each score, so a mean can be told apart from how the answers spread
+    scores = [f"score_{score}" for score in cube.SCORES]
+    shares = rows.melt(id_vars=["label"], value_vars=scores, var_name="score", value_name="answers")
+    shares["score"] = shares["score"].str.removeprefix("score_")
+    fig = px.bar(shares, x="label", y="answers", color="score",
+                 title=f"{title}: score distribution by {dimension_label.lower()}",
+                 labels={"label": dimension_label, "answers": "Share of answers (%)", "score": "Score"})
+    fig.update_layout(xaxis_tickangle=-45, barnorm="percent")
+    st.plotly_chart(fig)
+    st.dataframe(rows.drop(columns=["value", "total_values"]).rename(columns={"label": dimension_label}), hide_index=True)
+
+    # Drill into one of the values
+    choice = st.selectbox(f"Drill into a {dimension_label.lower()}:", rows.index, format_func=lambda index: rows.at[index, "label"])
+    if st.button("Drill down"):
+        filters.append((dimension, rows.at[choice, "value"], rows.at[choice, "label"]))
+        st.rerun()
+    st.markdown("---")
+
+
+# Run the app
+if __name__ == '__main__':
+    app()
@@ -0,0 +1,94 @@
+import json
+
+import psycopg2
+from psycopg2 import sql
+
+import database
+import instrumentation
+import snapshots
+
+# Interns per finish year and company, kept in a materialized view so the Visualization page
+# reads a handful of aggregated rows instead of joining the questionnaires on every run
+ROLLUP_NAME = "interns_per_company"
+SOURCE_TABLES = ("cooperative_student_questionnaire", "company", "student_final_project")
+
+ROLLUP_QUERY = """SELECT s.finish_year,
+                         c.company_id,
+                         cc.company_name,
+                         count(*) AS interns
+                  FROM cooperative_student_questionnaire AS c
+                  INNER JOIN company AS cc ON cc.company_id = c.company_id
+                  INNER JOIN student_final_project AS s ON s.student_id = c.student_id
+                  GROUP BY s.finish_year, c.company_id, cc.company_name"""
+
+# REFRESH ... CONCURRENTLY needs a unique index covering every row of the view
+ROLLUP_KEY = ("finish_year", "company_id", "company_name")
+
+STATE_QUERY = "SELECT to_regclass(%(name)s) IS NOT NULL AS present, obj_description(to_regclass(%(name)s), 'pg_class') AS signature;"
+
+
+def source_signature():
+    # Signatures of the tables behind the rollup, it is refreshed only when one of them changes
+    signatures = snapshots.table_signatures()
+    return tuple(signatures.get(table) for table in SOURCE_TABLES)
+
+
+def maintain(view_name, query, key_columns, signature):
+    # Create the view on first use and refresh it when the sources moved on. The source signature
+    # is stored as the view's comment, so other app processes and restarts skip an unneeded refresh.
+    # Returns False when the view cannot be maintained (e.g. a read-only role), the page then
+    # runs the same aggregation directly.
+    stamp = json.dumps(signature)
+    name = sql.Identifier(view_name)
+    try:
+        with database.get_connection() as conn:
+            with conn.cursor() as cursor:
+                # One maintainer at a time across processes
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s));", (view_name,))
+                cursor.execute(STATE_QUERY, {"name": view_name})
+                present, current = cursor.fetchone()
+                if not present:
+                    cursor.execute(sql.SQL("CREATE MATERIALIZED VIEW {} AS {};").format(name, sql.SQL(query)))
+                    cursor.execute(sql.SQL("CREATE UNIQUE INDEX {} ON {} ({});").format(
+                        sql.Identifier(view_name + "_key"), name, sql.SQL(", ").join(map(sql.Identifier, key_columns))))
+                elif current != stamp:
+                    # Readers keep seeing the previous rows while the new ones are computed,
+                    # only the rows that differ are written
+                    cursor.execute(sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {};").format(name))
+                if current != stamp:
+                    cursor.execute(sql.SQL("COMMENT ON MATERIALIZED VIEW {} IS {};").format(name, sql.Literal(stamp)))
+                    cursor.execute(sql.SQL("ANALYZE {};").format(name))
+            conn.commit()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@instrumentation.cache_resource(max_entries=16, show_spinner=False)
+def _ensure_rollup(signature, view_signature=None):
+    # The view's own signature is part of the cache key, a view that was dropped or re-created
+    # since is checked again. The stamp is the source signature alone.
+    return maintain(ROLLUP_NAME, ROLLUP_QUERY, ROLLUP_KEY, signature)
+
+
+def _source(signature):
+    if _ensure_rollup(signature, snapshots.view_signatures().get(ROLLUP_NAME)):
+        return sql.Identifier(ROLLUP_NAME)
+    return sql.SQL("({}) AS rollup").format(sql.SQL(ROLLUP_QUERY))
+
+
+@instrumentation.cache_data(max_entries=16, show_spinner=False)
+def finish_years(signature):
+    query = sql.SQL("SELECT DISTINCT finish_year FROM {} WHERE finish_year IS NOT NULL ORDER BY finish_year DESC;").format(_source(signature))
+    return database.read_sql(query)["finish_year"].tolist()
+
+
+@instrumentation.cache_data(max_entries=64, show_spinner=False)
+def interns_per_company(signature, year):
+    # Companies sharing a name are counted together, as value_counts() on the name did before
+    query = sql.SQL("""SELECT company_name, sum(interns)::bigint AS count
+                       FROM {}
+                       WHERE finish_year = %s
+                       GROUP BY company_name
+                       ORDER BY count DESC, company_name;""").format(_source(signature))
+    return database.read_sql(query, (year,))
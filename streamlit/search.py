@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+import pandas as pd
+import streamlit as st
+from psycopg2 import sql
+
+import database
+import instrumentation
+import snapshots
+
+# Global search over the people, companies and institutions of the database. The columns of
+# each target go through search_text() (pgsql/migrations/005_search.sql), which normalizes Thai
+# and Latin text, and are looked up in its full-text indexes by word prefix and, where pg_trgm
+# is installed, in its trigram indexes anywhere inside a word.
+DEFAULT_LIMIT = 10
+
+# Terms shorter than this match too much to be worth looking up
+MIN_LENGTH = 2
+
+# Matches of a target ranked per query, a prefix of a common word can match a large part of
+# student_info and only the first ones are ranked
+CANDIDATES = 500
+
+# columns is what the search matches, in the order of the index expression of the migration
+Target = namedtuple("Target", ["name", "label", "table", "key", "title", "detail", "columns"])
+
+TARGETS = [
+    Target("student", "Student", "student_info", "student_id", "concat_ws(' ', first_name, last_name)", "email",
+           ["student_id", "first_name", "last_name", "email"]),
+    Target("professor", "Professor", "professor", "professor_id",
+           "concat_ws(' ', professor_firstname, professor_lastname)", "email",
+           ["professor_firstname", "professor_lastname", "email"]),
+    Target("company", "Company", "company", "company_id", "company_name", "province", ["company_name"]),
+    Target("academy", "Institution", "academy", "academy_id", "institution_name", "province", ["institution_name"]),
+]
+
+CAPABILITIES_QUERY = """SELECT to_regprocedure('search_text(text[])') IS NOT NULL AS indexed,
+                               EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') AS trigram;"""
+
+# The normal form of the terms and their words as the full-text parser splits them
+TERMS_QUERY = """SELECT search_text(%s) AS text,
+                        tsvector_to_array(to_tsvector('simple', search_text(%s))) AS words;"""
+
+
+@instrumentation.cache_data(ttl=snapshots.SIGNATURE_TTL, show_spinner=False)
+def capabilities():
+    # (whether the search migration ran, whether pg_trgm is installed)
+    row = database.read_sql(CAPABILITIES_QUERY).iloc[0]
+    return bool(row["indexed"]), bool(row["trigram"])
+
+
+def source_signature():
+    signatures = snapshots.table_signatures()
+    return tuple(signatures.get(target.table) for target in TARGETS)
+
+
+def _document(target):
+    # The expression the indexes of the migration are built on
+    return sql.SQL("search_text({})").format(
+        sql.SQL(", ").join(sql.SQL("{}::text").format(sql.Identifier(column)) for column in target.columns))
+
+
+def ts_query(words, prefix=True):
+    # All the words, each one as a word prefix by default
+    def quote(word):
+        return "'" + word.replace("\\", "\\\\").replace("'", "''") + "'" + (":*" if prefix else "")
+    return " & ".join(quote(word) for word in words)
+
+
+def like_pattern(text):
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _indexed_query(target, trigram):
+    # Rows whose words start with the terms, or that contain them anywhere with pg_trgm. Words
+    # matching whole rank above prefixes, and shorter names above longer ones.
+    vector = sql.SQL("to_tsvector('simple', {})").format(_document(target))
+    match = sql.SQL("{} @@ to_tsquery('simple', %(prefix)s)").format(vector)
+    rank = sql.SQL("2 * ts_rank({vector}, to_tsquery('simple', %(exact)s), 1) + ts_rank({vector}, to_tsquery('simple', %(prefix)s), 1)").format(vector=vector)
+    if trigram:
+        match = sql.SQL("({} OR {} LIKE %(pattern)s)").format(match, _document(target))
+        rank = sql.SQL("{} + word_similarity(%(text)s, {})").format(rank, _document(target))
+    return match, rank
+
+
+def _fallback_query(target):
+    # Without the migration: a scan with ILIKE, good enough for the small databases that lack it
+    document = sql.SQL("concat_ws(' ', {})").format(sql.SQL(", ").join(map(sql.Identifier, target.columns)))
+    return sql.SQL("{} ILIKE %(pattern)s").format(document), sql.SQL("0.0")
+
+
+def search_query(indexed, trigram):
+    parts = []
+    for target in TARGETS:
+        match, rank = _indexed_query(target, trigram) if indexed else _fallback_query(target)
+        parts.append(sql.SQL("""(SELECT {kind} AS kind, {key}::text AS id, {title} AS name, {detail} AS detail,
+                                        {rank} + ({key}::text = %(text)s)::int AS rank
+                                 FROM (SELECT * FROM {table} WHERE {match} LIMIT {candidates}) AS candidate
+                                 ORDER BY rank DESC, name
+                                 LIMIT %(limit)s)""").format(
+            kind=sql.Literal(target.label), key=sql.Identifier(target.key), title=sql.SQL(target.title), detail=sql.Identifier(target.detail),
+            rank=rank, table=sql.Identifier(target.table), match=match, candidates=sql.Literal(CANDIDATES)))
+    return sql.SQL("SELECT * FROM ({}) AS results ORDER BY rank DESC, name LIMIT %(limit)s;").format(
+        sql.SQL("\nUNION ALL\n").join(parts))
+
+
+@instrumentation.cache_data(max_entries=256, show_spinner=False)
+def search(signature, terms, limit=DEFAULT_LIMIT):
+    # The best matches over all targets, with their kind, id, name, detail and rank
+    indexed, trigram = capabilities()
+    params = {"limit": limit}
+    if indexed:
+        normal = database.read_sql(TERMS_QUERY, (terms, terms)).iloc[0]
+        if not normal["words"] and not trigram:
+            return pd.DataFrame(columns=["kind", "id", "name", "detail", "rank"])
+        params.update(text=normal["text"], pattern=like_pattern(normal["text"]),
+                      prefix=ts_query(normal["words"]) or "''", exact=ts_query(normal["words"], prefix=False) or "''")
+    else:
+        params.update(text=terms, pattern=like_pattern(terms))
+    return database.read_sql(search_query(indexed, trigram), params)
+
+
+def show_results(terms, limit=DEFAULT_LIMIT):
+    terms = terms.strip()
+    if len(terms) < MIN_LENGTH:
+        st.caption(f"Type at least {MIN_LENGTH} characters to search.")
+        return
+    results = search(source_signature(), terms, limit)
+    if results.empty:
+        st.info(f'Nothing matches "{terms}".')
+        return
+    st.dataframe(results.drop(columns=["rank"]), hide_index=True)
+    if not capabilities()[0]:
+        st.caption("Search indexes are missing, run the migrations (python -m etl.migrate) to speed up the search.")
@@ -0,0 +1,110 @@
+import json
+
+import pandas as pd
+import streamlit as st
+
+import database
+import instrumentation
+import pagination
+import snapshots
+
+# jsonb columns of student_skills, each one is an array of objects with a GIN (jsonb_path_ops) index
+SKILL_COLUMNS = ["language_skills", "workshop", "work_exp", "award"]
+LANGUAGE_SKILLS = ["reading", "writing", "speaking", "listening"]
+SCORES = range(1, 6)
+DEFAULT_LIMIT = 100
+
+# Language names as entered in the form, some with stray whitespace, grouped by their trimmed form
+LANGUAGES_QUERY = """SELECT btrim(item->>'language') AS language,
+                            array_agg(DISTINCT item->>'language') AS spellings
+                     FROM student_skills
+                     CROSS JOIN LATERAL jsonb_array_elements(language_skills) AS item
+                     WHERE jsonb_typeof(language_skills) = 'array' AND btrim(item->>'language') <> ''
+                     GROUP BY 1
+                     ORDER BY 1;"""
+
+SEARCH_QUERY = """SELECT sk.student_id, si.first_name, si.last_name, sk.technical_skills
+                  FROM student_skills AS sk
+                  LEFT JOIN student_info AS si ON si.student_id = sk.student_id
+                  WHERE sk.language_skills @> ANY(%s::jsonb[])
+                  ORDER BY sk.student_id
+                  LIMIT %s;"""
+
+ROW_QUERY = "SELECT language_skills, workshop, work_exp, award FROM student_skills WHERE student_id = %s;"
+
+
+@instrumentation.cache_data(ttl=snapshots.SIGNATURE_TTL, show_spinner=False)
+def languages():
+    return {row.language: list(row.spellings) for row in database.read_sql(LANGUAGES_QUERY).itertuples(index=False)}
+
+
+def language_patterns(spellings, skill, minimum):
+    # "skill >= minimum" as containment patterns, one per spelling and accepted score, so the
+    # GIN index answers it. Scores are numbers when the pipeline loads them and strings in the seed CSVs.
+    patterns = []
+    for spelling in spellings:
+        for score in SCORES:
+            if score >= minimum:
+                patterns.append(json.dumps([{"language": spelling, skill: score}], ensure_ascii=False))
+                patterns.append(json.dumps([{"language": spelling, skill: str(score)}], ensure_ascii=False))
+    return patterns
+
+
+@instrumentation.cache_data(max_entries=64, show_spinner=False)
+def find_students(signature, spellings, skill, minimum, limit=DEFAULT_LIMIT):
+    return database.read_sql(SEARCH_QUERY, (language_patterns(spellings, skill, minimum), limit))
+
+
+def _unwrap(item):
+    # Workshops are stored as {"workshop1": {...}}, the numbered wrapper is dropped
+    if isinstance(item, dict) and len(item) == 1:
+        value = next(iter(item.values()))
+        if isinstance(value, dict):
+            return value
+    return item
+
+
+def flatten(value):
+    # One JSON array into a small table, one row per element
+    if not isinstance(value, list) or not value:
+        return pd.DataFrame()
+    return pd.json_normalize([_unwrap(item) for item in value])
+
+
+def show_row(student_id):
+    # Only the expanded student's JSON is fetched and flattened
+    row = database.read_sql(ROW_QUERY, (student_id,))
+    if row.empty:
+        st.warning(f"No skills recorded for {student_id}.")
+        return
+    for column in SKILL_COLUMNS:
+        st.write(f"**{column}**")
+        table = flatten(row.at[0, column])
+        if table.empty:
+            st.caption("(none)")
+        else:
+            st.dataframe(table, hide_index=True)
+
+
+def show_panel():
+    st.subheader("Search Skills")
+    known_languages = languages()
+    if not known_languages:
+        st.info("No language skills recorded yet.")
+        return
+
+    language_col, skill_col, minimum_col = st.columns([2, 1, 1])
+    language = language_col.selectbox("Language:", list(known_languages), key="skills_language")
+    skill = skill_col.selectbox("Skill:", LANGUAGE_SKILLS, key="skills_skill")
+    minimum = minimum_col.selectbox("At least:", list(SCORES), index=2, key="skills_minimum")
+
+    signature = snapshots.table_signatures().get("student_skills")
+    students = find_students(signature, tuple(known_languages[language]), skill, minimum)
+    st.caption(f"{len(students):,} students with {language} {skill} ≥ {minimum}"
+               + (f" (first {DEFAULT_LIMIT})" if len(students) == DEFAULT_LIMIT else ""))
+    st.dataframe(pagination.display_frame(students), hide_index=True)
+
+    # Expand one student's skills into columns
+    expanded = st.selectbox("Expand skills of:", ["(none)"] + students["student_id"].tolist(), key="skills_expand")
+    if expanded != "(none)":
+        show_row(expanded)
@@ -0,0 +1,84 @@
+from psycopg2 import sql
+
+import database
+import frames
+import instrumentation
+
+# How many seconds the change counters are trusted before Postgres is asked again
+SIGNATURE_TTL = 10
+
+# Old snapshots are evicted once this many (table, signature) pairs are cached
+MAX_SNAPSHOTS = 64
+
+# Relation kinds of the base tables (plain and partitioned) and of the materialized views
+TABLE_KINDS = ["r", "p"]
+VIEW_KINDS = ["m"]
+
+# A table's signature changes whenever rows are inserted, updated or deleted,
+# and when the table is truncated or re-created (new oid / relfilenode).
+# Writers report their counters when they commit and go idle, so a change can
+# take a few seconds (plus SIGNATURE_TTL) to show up in the dashboard.
+SIGNATURE_QUERY = """SELECT c.relname AS table_name,
+                            c.oid::bigint AS oid,
+                            c.relfilenode::bigint AS relfilenode,
+                            COALESCE(s.n_tup_ins, 0) AS n_tup_ins,
+                            COALESCE(s.n_tup_upd, 0) AS n_tup_upd,
+                            COALESCE(s.n_tup_del, 0) AS n_tup_del
+                     FROM pg_class AS c
+                     INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                     LEFT JOIN pg_stat_user_tables AS s ON s.relid = c.oid
+                     WHERE n.nspname = 'public' AND c.relkind = ANY(%(kinds)s);"""
+
+# Planner estimates and on-disk size, read from the catalog without touching the tables.
+# reltuples is -1 for a table that was never analyzed, fall back to the live tuple counter then
+CATALOG_QUERY = """SELECT c.relname AS table_name,
+                          CASE WHEN c.reltuples < 0 THEN COALESCE(s.n_live_tup, 0)
+                               ELSE c.reltuples END::bigint AS estimated_rows,
+                          pg_total_relation_size(c.oid) AS total_bytes,
+                          pg_size_pretty(pg_total_relation_size(c.oid)) AS total_size
+                   FROM pg_class AS c
+                   INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+                   LEFT JOIN pg_stat_user_tables AS s ON s.relid = c.oid
+                   WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p')
+                   ORDER BY c.relname;"""
+
+
+def _signatures(kinds):
+    signatures = database.read_sql(SIGNATURE_QUERY, {"kinds": kinds})
+    return {row[0]: tuple(int(value) for value in row[1:]) for row in signatures.itertuples(index=False)}
+
+
+@instrumentation.cache_data(ttl=SIGNATURE_TTL, show_spinner=False)
+def table_signatures():
+    # One cheap catalog query for every table, shared by all sessions for SIGNATURE_TTL seconds
+    return _signatures(TABLE_KINDS)
+
+
+@instrumentation.cache_data(ttl=SIGNATURE_TTL, show_spinner=False)
+def view_signatures():
+    # The same for the materialized views the dashboard maintains (rollups.py), which are not
+    # tables to browse, join or copy
+    return _signatures(VIEW_KINDS)
+
+
+def table_names():
+    # Public base tables, taken from the cached signatures instead of information_schema
+    return sorted(table_signatures())
+
+
+@instrumentation.cache_data(ttl=SIGNATURE_TTL, show_spinner=False)
+def table_catalog():
+    # Table list with estimated row counts and sizes, cheap enough to show before anything is loaded
+    return database.read_sql(CATALOG_QUERY)
+
+
+@instrumentation.cache_resource(max_entries=MAX_SNAPSHOTS, show_spinner=False)
+def _snapshot(table_name, signature):
+    # The signature is part of the cache key, so a changed table misses and is read again
+    query = sql.SQL("SELECT * FROM {};").format(sql.Identifier(table_name))
+    return frames.compact(database.read_sql(query))
+
+
+def load_table(table_name):
+    # Snapshots are shared between sessions, treat the returned DataFrame as read-only
+    return _snapshot(table_name, table_signatures().get(table_name))
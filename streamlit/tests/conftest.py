@@ -0,0 +1,38 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+# The dashboard modules import each other by file name, as streamlit runs them from this directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+@pytest.fixture
+def conn():
+    # A connection from the PGHOST, PGPORT, PGDATABASE, PGUSER and PGPASSWORD environment variables,
+    # the tests that need one are skipped without a server. Nothing is committed.
+    try:
+        connection = psycopg2.connect("")
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"no database: {e}")
+    try:
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def pooled(conn, monkeypatch):
+    # database.get_connection hands out the test connection instead of one from the pool of
+    # secrets.toml, temporary tables made on it are visible to the code under test
+    import database
+
+    @contextmanager
+    def get_connection():
+        yield conn
+
+    monkeypatch.setattr(database, "get_connection", get_connection)
+    return conn
@@ -0,0 +1,41 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import analytics
+
+
+@pytest.fixture
+def tables(pooled):
+    with pooled.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE empty_table (student_id character(10), gpax numeric(3,2), year integer);")
+        cursor.execute("CREATE TEMP TABLE filled_table AS SELECT 'a'::text AS name, 3 AS year;")
+    return pooled
+
+
+def test_empty_table_snapshot(tables, tmp_path):
+    path = analytics.snapshot_file("empty_table", [1, 2, 0, 0, 0], str(tmp_path))
+    table = pq.read_table(path)
+    assert table.num_rows == 0
+    assert table.schema.names == ["student_id", "gpax", "year"]
+    assert table.schema.field("year").type == pa.int32()
+
+
+def test_snapshot_replaces_older_signatures(tables, tmp_path):
+    old = analytics.snapshot_file("filled_table", [1, 2, 1, 0, 0], str(tmp_path))
+    new = analytics.snapshot_file("filled_table", [1, 2, 2, 0, 0], str(tmp_path))
+    assert old != new
+    assert [path.name for path in tmp_path.iterdir()] == [new.rsplit("/", 1)[1]]
+
+
+def test_engine_with_an_empty_table(tables, tmp_path):
+    # One empty table does not keep the others from being queried
+    pytest.importorskip("duckdb")
+    engine = analytics.Engine(str(tmp_path))
+    signatures = {"empty_table": [1, 2, 0, 0, 0], "filled_table": [3, 4, 1, 0, 0]}
+    assert engine.refresh(signatures) == ["empty_table", "filled_table"]
+    with engine.cursor() as cursor:
+        frame, truncated = analytics.run(cursor, "SELECT count(*) AS n FROM empty_table", 10)
+        assert frame["n"].tolist() == [0] and not truncated
+        frame, _ = analytics.run(cursor, "SELECT name FROM filled_table -- the name", 10)
+        assert frame["name"].tolist() == ["a"]
@@ -0,0 +1,47 @@
+import pytest
+
+import cube
+
+
+def test_grouping():
+    # A company is grouped with its province, companies by professor are not kept
+    assert cube.grouping(set()) == frozenset()
+    assert cube.grouping({"company"}) == frozenset({"province", "company"})
+    assert cube.grouping({"professor", "finish_year"}) == frozenset({"professor", "finish_year"})
+    assert cube.grouping({"company", "professor"}) is None
+    assert cube.grouping({"province", "professor"}) is None
+
+
+def test_rolled_up():
+    # GROUPING(province, company_id, finish_year, professor_id)
+    assert list(cube.DIMENSIONS) == ["province", "company", "finish_year", "professor"]
+    assert cube.rolled_up(frozenset(cube.DIMENSIONS)) == 0
+    assert cube.rolled_up(frozenset()) == 0b1111
+    assert cube.rolled_up(frozenset({"province", "company"})) == 0b0011
+    assert cube.rolled_up(frozenset({"professor", "finish_year"})) == 0b1100
+
+
+def test_cell():
+    conditions, params = cube._cell(frozenset({"province", "company"}), {"province": "Bangkok", "company": None})
+    assert params == [0b0011, "Bangkok"]
+
+
+@pytest.mark.parametrize("filters, dimension", [
+    ((("company", "0000000001"),), "professor"),
+    ((("professor", "0000000001"),), "province"),
+    ((("professor", "0000000001"), ("finish_year", 2567)), "company"),
+])
+def test_unsupported_breakdown(filters, dimension):
+    # Refused before the cube is read, no database is needed
+    with pytest.raises(ValueError, match="does not break down by"):
+        cube.breakdown.__wrapped__(None, filters, dimension)
+
+
+def test_unsupported_profile():
+    with pytest.raises(ValueError, match="company and professor"):
+        cube.profile.__wrapped__(None, (("company", "0000000001"), ("professor", "0000000001")))
+
+
+def test_unknown_dimension():
+    with pytest.raises(ValueError, match="Unknown dimension: student"):
+        cube.breakdown.__wrapped__(None, (), "student")
@@ -0,0 +1,66 @@
+import io
+import json
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import exports
+
+# (name, type oid) as cursor.description reports them: text, integer, numeric, jsonb
+COLUMNS = [("name", 25), ("year", 23), ("gpax", 1700), ("skills", 3802)]
+
+
+def write(download_format, columns, spool):
+    out = io.BytesIO()
+    exports.WRITERS[download_format](*exports._record_batches(columns, spool), out)
+    return out.getvalue()
+
+
+def copy(conn, query):
+    # What _copy_to_spool does on a pooled connection
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT * FROM ({query}\n) AS export LIMIT 0;")
+        columns = [(desc.name, desc.type_code) for desc in cursor.description]
+        spool = io.BytesIO()
+        cursor.copy_expert(f"COPY ({query}\n) TO STDOUT WITH (FORMAT csv, ENCODING 'UTF8');", spool)
+    spool.seek(0)
+    return columns, spool
+
+
+def test_empty_result_schema():
+    schema, batches, json_columns = exports._record_batches(COLUMNS, io.BytesIO(b""))
+    assert schema.names == ["name", "year", "gpax", "skills"]
+    assert schema.types == [pa.string(), pa.int32(), pa.float64(), pa.string()]
+    assert list(batches) == []
+    assert json_columns == ["skills"]
+
+
+@pytest.mark.parametrize("download_format", list(exports.WRITERS))
+def test_empty_result(download_format):
+    data = write(download_format, COLUMNS, io.BytesIO(b""))
+    if download_format == "Parquet":
+        table = pq.read_table(io.BytesIO(data))
+        assert table.num_rows == 0 and table.column_names == ["name", "year", "gpax", "skills"]
+    elif download_format == "Arrow":
+        table = pa.ipc.open_file(io.BytesIO(data)).read_all()
+        assert table.num_rows == 0 and table.schema.field("year").type == pa.int32()
+    elif download_format == "JSON":
+        assert json.loads(data) == []
+    else:
+        assert data == b"<?xml version='1.0' encoding='utf-8'?>\n<data>\n</data>\n"
+
+
+@pytest.mark.parametrize("download_format", list(exports.WRITERS))
+def test_empty_filter_result(conn, download_format):
+    columns, spool = copy(conn, "SELECT 'a'::text AS name, 2567 AS year, 3.25::numeric AS gpax, '[]'::jsonb AS skills WHERE false")
+    assert columns == COLUMNS
+    assert write(download_format, columns, spool)
+
+
+def test_rows(conn):
+    columns, spool = copy(conn, """SELECT * FROM (VALUES ('a', 2567, 3.25, '[{"language": "English"}]'::jsonb),
+                                                      (NULL, NULL, NULL, NULL)) AS rows (name, year, gpax, skills)""")
+    assert json.loads(write("JSON", columns, spool)) == [
+        {"name": "a", "year": 2567, "gpax": 3.25, "skills": [{"language": "English"}]},
+        {"name": None, "year": None, "gpax": None, "skills": None}]
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pandas as pd
+
+import frames
+
+
+def test_leading_zero_ids_stay_text():
+    ids = pd.Series(["0000000001", "0000000002", "0812345678"], dtype=object)
+    assert frames.compact_column(ids).tolist() == ["0000000001", "0000000002", "0812345678"]
+    assert frames.compact_column(pd.Series(["000001", "000002"])).tolist() == ["000001", "000002"]
+
+
+def test_digit_strings_become_integers():
+    column = frames.compact_column(pd.Series(["6400000001", "6400000002", None], dtype=object))
+    assert str(column.dtype) == "Int64"
+    assert column.tolist() == [6400000001, 6400000002, pd.NA]
+    # Longer than 15 digits they would not go through float64 exactly
+    long = pd.Series(["1234567890123456", "1234567890123457", None], dtype=object)
+    column = frames.compact_column(long)
+    assert column.iloc[:2].tolist() == ["1234567890123456", "1234567890123457"]
+    assert column.isna().iloc[2]
+
+
+def test_decimals():
+    gpax = frames.compact_column(pd.Series([Decimal("3.25"), Decimal("2.50"), None], dtype=object))
+    assert gpax.dtype == "float64"
+    assert gpax.tolist()[:2] == [3.25, 2.5]
+    scores = frames.compact_column(pd.Series([Decimal("1"), Decimal("5"), None], dtype=object))
+    assert str(scores.dtype) == "Int8"
+    precise = pd.Series([Decimal("1.0000000000000001"), Decimal("2")], dtype=object)
+    assert frames.compact_column(precise).tolist() == [Decimal("1.0000000000000001"), Decimal("2")]
+
+
+def test_smallest_integer_type():
+    assert frames.compact_column(pd.Series([1, 2, 3], dtype="int64")).dtype == "int8"
+    assert frames.compact_column(pd.Series([2564, 2567], dtype="int64")).dtype == "int16"
+    assert str(frames.compact_column(pd.Series([1.0, None, 3.0])).dtype) == "Int8"
+    assert frames.compact_column(pd.Series([1.5, 2.0])).dtype == "float64"
+
+
+def test_text():
+    provinces = pd.Series(["Bangkok", "Bangkok", "Pathum Thani", "Bangkok"], dtype=object)
+    assert isinstance(frames.compact_column(provinces).dtype, pd.CategoricalDtype)
+    names = frames.compact_column(pd.Series(["a", "b", "c"], dtype=object))
+    assert isinstance(names.dtype, pd.StringDtype)
+    assert names.tolist() == ["a", "b", "c"]
+
+
+def test_other_objects_unchanged():
+    skills = pd.Series([[{"language": "English"}], None], dtype=object)
+    assert frames.compact_column(skills) is skills
+    flags = frames.compact_column(pd.Series([True, None, False], dtype=object))
+    assert str(flags.dtype) == "boolean"
+
+
+def test_compact_frame():
+    frame = pd.DataFrame({
+        "student_id": ["6400000001", "6400000002"],
+        "tel": ["0812345678", "0898765432"],
+        "gpax": [Decimal("3.50"), Decimal("2.75")],
+        "province": ["Bangkok", "Bangkok"],
+    }, index=[5, 6])
+    compact = frames.compact(frame)
+    assert compact.index.tolist() == [5, 6]
+    assert compact["tel"].tolist() == ["0812345678", "0898765432"]
+    assert compact["gpax"].tolist() == [3.5, 2.75]
+    assert frames.memory_bytes(compact) < frames.memory_bytes(frame)
+    # Repeated column names, as a join can return, are left as they are
+    repeated = pd.DataFrame([[1, 2]], columns=["a", "a"])
+    assert frames.compact(repeated) is repeated
@@ -0,0 +1,122 @@
+import pytest
+from psycopg2 import sql
+
+import joins
+from joins import Relationship
+
+COLUMNS = {
+    "student_info": ["student_id", "first_name", "professor_id"],
+    "professor": ["professor_id", "professor_firstname"],
+    "student_address": ["student_id", "address_id"],
+    "address_info": ["address_id", "province"],
+    "student_emergency_contact": ["student_id", "first_name", "address_id"],
+    "student_education_history": ["student_id", "middle_school_id", "high_school_id"],
+    "academy": ["academy_id", "province"],
+    "officer": ["officer_id"],
+}
+
+RELATIONSHIPS = [
+    Relationship("student_info_professor_id_fkey", "student_info", ("professor_id",), "professor", ("professor_id",)),
+    Relationship("student_address_student_id_fkey", "student_address", ("student_id",), "student_info", ("student_id",)),
+    Relationship("student_address_address_id_fkey", "student_address", ("address_id",), "address_info", ("address_id",)),
+    Relationship("student_emergency_contact_student_id_fkey", "student_emergency_contact", ("student_id",), "student_info", ("student_id",)),
+    Relationship("student_education_history_student_id_fkey", "student_education_history", ("student_id",), "student_info", ("student_id",)),
+    Relationship("student_education_history_middle_school_id_fkey", "student_education_history", ("middle_school_id",), "academy", ("academy_id",)),
+    Relationship("student_education_history_high_school_id_fkey", "student_education_history", ("high_school_id",), "academy", ("academy_id",)),
+]
+
+
+def test_direct_relationship():
+    steps, extra = joins.plan_join(["student_info", "professor"], RELATIONSHIPS)
+    assert [table for table, _ in steps] == ["student_info", "professor"]
+    assert steps[1][1].name == "student_info_professor_id_fkey"
+    assert extra == []
+
+
+def test_tables_pulled_in_to_connect():
+    steps, extra = joins.plan_join(["professor", "address_info"], RELATIONSHIPS)
+    assert [table for table, _ in steps] == ["professor", "student_info", "student_address", "address_info"]
+    assert extra == ["student_info", "student_address"]
+
+
+def test_ambiguous_path():
+    # Two school columns relate student_education_history to academy, the first one is used
+    # unless another one is chosen
+    steps, _ = joins.plan_join(["student_education_history", "academy"], RELATIONSHIPS)
+    pairs = joins.ambiguous_pairs(steps, RELATIONSHIPS)
+    assert [(table, other, len(options)) for table, other, options in pairs] == [("academy", "student_education_history", 2)]
+    assert steps[1][1].name == "student_education_history_middle_school_id_fkey"
+
+    choices = {frozenset(("academy", "student_education_history")): "student_education_history_high_school_id_fkey"}
+    steps, _ = joins.plan_join(["student_education_history", "academy"], RELATIONSHIPS, choices)
+    assert steps[1][1].name == "student_education_history_high_school_id_fkey"
+
+
+def test_not_connected():
+    with pytest.raises(ValueError, match="officer"):
+        joins.plan_join(["student_info", "officer"], RELATIONSHIPS)
+
+
+def test_equal_columns_selected_once():
+    # student_id is equal across the three student tables and address_id between student_address
+    # and address_info, each is selected once. Columns that only share a name are kept with a
+    # table prefix.
+    tables = ["student_info", "student_address", "address_info", "student_emergency_contact"]
+    steps, _ = joins.plan_join(tables, RELATIONSHIPS)
+    assert [table for table, _ in steps] == ["student_info", "student_address", "student_emergency_contact", "address_info"]
+    assert joins.output_columns(steps, tables, COLUMNS) == [
+        ("student_info", "student_id", "student_id"),
+        ("student_info", "first_name", "first_name"),
+        ("student_info", "professor_id", "professor_id"),
+        ("student_address", "address_id", "address_id"),
+        ("address_info", "province", "province"),
+        ("student_emergency_contact", "first_name", "student_emergency_contact_first_name"),
+        ("student_emergency_contact", "address_id", "student_emergency_contact_address_id"),
+    ]
+
+
+def test_chained_groups():
+    # professor_id reaches professor through student_info, academy_id is equal to the school
+    # column it was joined on and not to the other one
+    tables = ["professor", "student_education_history", "academy"]
+    steps, extra = joins.plan_join(tables, RELATIONSHIPS)
+    assert [(table, rel and rel.name) for table, rel in steps] == [
+        ("professor", None),
+        ("student_info", "student_info_professor_id_fkey"),
+        ("student_education_history", "student_education_history_student_id_fkey"),
+        ("academy", "student_education_history_middle_school_id_fkey"),
+    ]
+    assert extra == ["student_info"]
+    assert [name for _, _, name in joins.output_columns(steps, tables + extra, COLUMNS)] == [
+        "professor_id", "professor_firstname", "student_id", "middle_school_id", "high_school_id", "province", "first_name"]
+
+
+def test_query_text():
+    tables = ["student_info", "professor"]
+    steps, _ = joins.plan_join(tables, RELATIONSHIPS)
+    assert joins.query_text(joins.build_join_query(steps, tables, COLUMNS)) == (
+        'SELECT "student_info"."student_id" AS "student_id", "student_info"."first_name" AS "first_name", '
+        '"student_info"."professor_id" AS "professor_id", "professor"."professor_firstname" AS "professor_firstname" '
+        'FROM "student_info" INNER JOIN "professor" ON "student_info"."professor_id" = "professor"."professor_id"')
+    assert joins.query_text(sql.SQL("SELECT {}").format(sql.Identifier('odd"name'))) == 'SELECT "odd""name"'
+
+
+def prepared(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name, prepare_time FROM pg_prepared_statements WHERE name LIKE 'join\\_%' ORDER BY prepare_time;")
+        return cursor.fetchall()
+
+
+def test_prepared_joins_are_bounded(pooled):
+    # A long-lived connection keeps the last MAX_PREPARED_JOINS joins it prepared, not every one
+    for number in range(joins.MAX_PREPARED_JOINS + 5):
+        result = joins.run_join(f"SELECT {number} AS number FROM generate_series(1, 3)", 2)
+        assert result["number"].tolist() == [number, number]
+    kept = prepared(pooled)
+    assert len(kept) == joins.MAX_PREPARED_JOINS
+
+    # A join that is still prepared runs without being prepared again
+    joins.run_join(f"SELECT {joins.MAX_PREPARED_JOINS + 4} AS number FROM generate_series(1, 3)", 1)
+    assert prepared(pooled) == kept
+    joins.run_join("SELECT 0 AS number", 1)
+    assert len(prepared(pooled)) == joins.MAX_PREPARED_JOINS
@@ -0,0 +1,80 @@
+import pytest
+
+import pagination
+
+ROWS = [(1, 20), (2, None), (3, 10), (4, 20), (5, None), (6, 10), (7, 30), (8, 20), (9, None)]
+
+
+@pytest.fixture
+def scores(conn):
+    with conn.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE scores (id integer PRIMARY KEY, score integer);")
+        cursor.executemany("INSERT INTO scores VALUES (%s, %s);", ROWS)
+        cursor.execute("CREATE TEMP TABLE scores_heap AS SELECT * FROM scores;")
+    return conn
+
+
+def read_all(conn, table, key_columns, page_size, sort_column=None, descending=False, filters=()):
+    # Every page in turn, continuing after the last row of each page the way show_table does
+    pages, after = [], None
+    with conn.cursor() as cursor:
+        while True:
+            query, params = pagination.build_page_query(table, key_columns, page_size, sort_column, descending, filters, after)
+            cursor.execute(query, params)
+            names = [desc[0] for desc in cursor.description]
+            rows = [dict(zip(names, row)) for row in cursor.fetchall()]
+            pages.append([row["id"] for row in rows[:page_size]])
+            if len(rows) <= page_size:
+                return pages
+            last = rows[page_size - 1]
+            after = (last[sort_column] if sort_column else None, tuple(last[column] for column in key_columns))
+
+
+def expected(sort_column=None, descending=False):
+    # NULLs last in both directions, ties in key order
+    if sort_column is None:
+        return [row[0] for row in sorted(ROWS)]
+    present = sorted((row for row in ROWS if row[1] is not None), key=lambda row: (-row[1] if descending else row[1], row[0]))
+    return [row[0] for row in present] + sorted(row[0] for row in ROWS if row[1] is None)
+
+
+def flatten(pages):
+    return [row for page in pages for row in page]
+
+
+@pytest.mark.parametrize("page_size", [1, 2, 3, 4, 9, 10])
+def test_key_order(scores, page_size):
+    pages = read_all(scores, "scores", ("id",), page_size)
+    assert flatten(pages) == expected()
+    assert all(len(page) == page_size for page in pages[:-1])
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("page_size", [1, 2, 3, 4])
+def test_sorted_with_ties_and_nulls(scores, page_size, descending):
+    # Pages ending on a repeated score, on the last score before the NULLs and inside the NULLs
+    assert flatten(read_all(scores, "scores", ("id",), page_size, "score", descending)) == expected("score", descending)
+
+
+def test_page_boundary(scores):
+    # A page that ends exactly on the last row has no next page
+    pages = read_all(scores, "scores", ("id",), 3)
+    assert pages == [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+
+def test_filters(scores):
+    pages = read_all(scores, "scores", ("id",), 2, "score", filters=(("score", ">=", 20),))
+    assert flatten(pages) == [1, 4, 8, 7]
+    pages = read_all(scores, "scores", ("id",), 2, filters=(("score", "is empty", ""),))
+    assert flatten(pages) == [2, 5, 9]
+
+
+@pytest.mark.parametrize("sort_column", [None, "score"])
+def test_ctid_without_primary_key(scores, sort_column):
+    # Every row once, in physical order within a score
+    pages = read_all(scores, "scores_heap", (pagination.CTID_KEY,), 2, sort_column)
+    assert sorted(flatten(pages)) == sorted(row[0] for row in ROWS)
+    if sort_column:
+        order = {row[0]: row[1] for row in ROWS}
+        values = [order[row] for row in flatten(pages)]
+        assert values == sorted(values, key=lambda value: (value is None, value or 0))
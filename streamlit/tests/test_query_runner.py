@@ -0,0 +1,72 @@
+import psycopg2.pool
+import pytest
+
+import query_runner
+
+
+class ExhaustedPool:
+    def __init__(self):
+        self.checked_in = []
+
+    def checkout(self):
+        raise psycopg2.pool.PoolError("no free database connection after 30s (pool size 10)")
+
+    def checkin(self, conn):
+        self.checked_in.append(conn)
+
+
+def test_failed_checkout_fails_the_job():
+    # The job finishes with the error instead of running forever, nothing is checked in
+    pool = ExhaustedPool()
+    job = query_runner.QueryJob("SELECT 1", 30, 100)
+    query_runner._execute(job, pool, ("select 1", 100, False))
+    assert not job.running
+    assert job.status == "failed"
+    assert "no free database connection" in job.error
+    assert job.finished is not None
+    assert pool.checked_in == []
+
+
+def test_query_on_a_pooled_connection(conn):
+    class Pool:
+        checked_in = []
+
+        def checkout(self):
+            return conn
+
+        def checkin(self, connection):
+            self.checked_in.append(connection)
+
+    pool = Pool()
+    job = query_runner.QueryJob("SELECT 1 AS a, 'x' AS b", 30, 100)
+    query_runner._execute(job, pool, ("select 1 as a, 'x' as b", 100, False))
+    assert job.status == "done", job.error
+    assert job.result.to_dict("records") == [{"a": 1, "b": "x"}]
+    assert pool.checked_in == [conn]
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT  *\nFROM student_info;", "select * from student_info"),
+    ("SELECT 1 /* why */ FROM t -- the end\n;;", "select 1 from t"),
+    ("SELECT 1 FROM t;  ", "SELECT 1 FROM t"),
+])
+def test_same_query(first, second):
+    assert query_runner.normalize_query(first) == query_runner.normalize_query(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("SELECT 'Foo'", "SELECT 'foo'"),
+    ("SELECT E'Foo\\''", "SELECT E'foo\\''"),
+    ('SELECT "Name" FROM t', 'SELECT "name" FROM t'),
+    ("SELECT $$Foo$$", "SELECT $$foo$$"),
+    ("SELECT $tag$Foo  Bar$tag$", "SELECT $tag$Foo Bar$tag$"),
+    ("SELECT '--Foo'", "SELECT '--foo'"),
+])
+def test_quoted_text_keeps_its_case(first, second):
+    assert query_runner.normalize_query(first) != query_runner.normalize_query(second)
+
+
+def test_normal_form():
+    assert query_runner.normalize_query("  SELECT $$A;b$$,  'C' AS \"D\" -- x\n FROM T;") == "select $$A;b$$, 'C' as \"D\" from t"
+    with pytest.raises(ValueError):
+        query_runner.normalize_query("SELECT $$open")